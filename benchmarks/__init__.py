@@ -0,0 +1,6 @@
+"""Reproducible performance benchmarks for OctoBrowse's pure helpers.
+
+Run a benchmark from the repository root, for example::
+
+    python -m benchmarks.filter_decisions
+"""
@@ -0,0 +1,89 @@
+"""Memory and lookup cost of hosts-file blocklists: ``set[str]`` vs DomainIndex.
+
+For each size the benchmark parses a synthetic hosts file, measures the
+resident size of the domain set with ``tracemalloc``, and times suffix
+lookups for listed subdomains and for unlisted hosts.  It also times the
+compiled-ruleset cache round trip, whose domain index is memory-mapped.
+
+    python -m benchmarks.domain_index [--sizes 100000,1000000] [--lookups N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from octobrowse.filter_cache import read_ruleset_cache, ruleset_cache_key, write_ruleset_cache
+from octobrowse.filtering import DomainIndex, FilterRuleSet, domain_suffix_match
+
+from .corpus import hosts_text
+
+
+def traced(build):  # type: ignore[no-untyped-def]
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+def lookup_ns(domains: set[str] | DomainIndex, hosts: list[str]) -> float:
+    start = time.perf_counter_ns()
+    for host in hosts:
+        domain_suffix_match(host, domains)
+    return (time.perf_counter_ns() - start) / len(hosts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--lookups", type=int, default=50_000)
+    args = parser.parse_args()
+
+    for size in (int(value) for value in args.sizes.split(",")):
+        text = hosts_text(size)
+        names = [line.split()[1] for line in text.splitlines()]
+        rnd = random.Random(size)
+        listed = [f"cdn.static.{rnd.choice(names)}" for _ in range(args.lookups)]
+        unlisted = [f"cdn.static.unlisted{index}.example.net" for index in range(args.lookups)]
+
+        plain, plain_bytes = traced(lambda: {name.lower() for name in names})
+        index, index_bytes = traced(lambda: DomainIndex(names))
+        len(index)  # compact before timing lookups
+
+        start = time.perf_counter()
+        rules = FilterRuleSet()
+        rules.parse_text(text)
+        rules.finalize()
+        parse_seconds = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "hosts.cache"
+            key = ruleset_cache_key([text])
+            write_ruleset_cache(path, key, rules)
+            start = time.perf_counter()
+            restored = read_ruleset_cache(path, key)
+            load_ms = (time.perf_counter() - start) * 1000
+            assert restored is not None and len(restored.blocked_domains) == len(index)
+            del restored
+
+        print(f"{size:,} domains  (hosts-file parse {parse_seconds * 1000:,.0f} ms, cache load {load_ms:,.1f} ms)")
+        print(
+            f"  set[str]     {plain_bytes / 2**20:7.1f} MiB   "
+            f"hit {lookup_ns(plain, listed):6,.0f} ns   miss {lookup_ns(plain, unlisted):6,.0f} ns"
+        )
+        print(
+            f"  DomainIndex  {index_bytes / 2**20:7.1f} MiB   "
+            f"hit {lookup_ns(index, listed):6,.0f} ns   miss {lookup_ns(index, unlisted):6,.0f} ns"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Token-bucket balance: longest-token versus rarest-token rule indexing.
+
+Every tokenized network rule is filed under one of its tokens; a request
+scans the buckets of each token in its URL.  ``$domain=`` rules live in
+per-domain buckets, so a request also scans the token buckets and the
+untokenized bucket of every first-party domain that has rules.  This
+benchmark rebuilds the historical longest-token index, where scoped rules
+shared the global buckets, next to the frequency-aware one and reports
+bucket sizes and the number of candidate rules a request has to scan.
+``--scoped`` adds that many ``$domain=`` rules for the corpus's publishers,
+since the synthetic list has none.
+
+    python -m benchmarks.filter_buckets [--rules N] [--requests N] [--scoped N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+from urllib.parse import urlsplit
+
+from octobrowse.filtering import FilterRuleSet, NetworkRule
+
+from .corpus import _BENIGN_WORDS, _WORDS, EASYLIST_SIZED_RULES, easylist_text, request_corpus
+
+Buckets = dict[str, list[NetworkRule]]
+Request = tuple[str, str]
+
+
+def scoped_rules_text(requests: list[Request], count: int, seed: int = 5) -> str:
+    """Return *count* ``$domain=`` block rules for the publishers in *requests*."""
+    rnd = random.Random(seed)
+    publishers = sorted({first_party.removeprefix("www.") for _url, first_party in requests if first_party})
+    lines = []
+    for index in range(count):
+        domain = rnd.choice(publishers)
+        if index % 3:
+            lines.append(f"/{rnd.choice(_WORDS)}/*-{rnd.choice(_BENIGN_WORDS)}.js$script,domain={domain}")
+        else:
+            lines.append(f"*$third-party,image,domain={domain}")
+    return "\n".join(lines)
+
+
+def longest_token_buckets(rules: FilterRuleSet) -> Buckets:
+    """Re-index the block rules of *rules* the way the parser used to.
+
+    ``$domain=`` rules are filed once, in the shared buckets; the ones
+    without a token go under ``""``, which every request scans.
+    """
+    buckets: Buckets = {}
+    seen: set[int] = set()
+    scoped = (bucket for domain_buckets in rules.domain_token_buckets.values() for bucket in domain_buckets.values())
+    for bucket in (*rules.token_buckets.values(), *scoped):
+        for rule in bucket:
+            if id(rule) in seen:
+                continue
+            seen.add(id(rule))
+            tokens = rules._candidate_tokens(rules._rule_body(rule.text))
+            buckets.setdefault(max(tokens, key=len) if tokens else "", []).append(rule)
+    return buckets
+
+
+def scanned_per_request(buckets: Buckets, scoped: dict[str, Buckets], requests: list[Request]) -> list[int]:
+    scanned = []
+    for url, first_party in requests:
+        tokens = set(FilterRuleSet._TOKEN_RE.findall(url.lower()))
+        count = sum(len(buckets.get(token, ())) for token in tokens) + len(buckets.get("", ()))
+        labels = first_party.split(".") if first_party else []
+        for domain in (".".join(labels[index:]) for index in range(len(labels))):
+            domain_buckets = scoped.get(domain)
+            if domain_buckets is not None:
+                count += sum(len(domain_buckets.get(token, ())) for token in tokens)
+                count += len(domain_buckets.get("", ()))
+        scanned.append(count)
+    return scanned
+
+
+def describe(name: str, buckets: Buckets, scoped: dict[str, Buckets], requests: list[Request]) -> None:
+    all_buckets = [*buckets.values(), *(bucket for domain in scoped.values() for bucket in domain.values())]
+    sizes = sorted(len(bucket) for bucket in all_buckets)
+    scanned = sorted(scanned_per_request(buckets, scoped, requests))
+    largest = max(buckets, key=lambda token: len(buckets[token]))
+    print(
+        f"{name:<8} buckets {len(sizes):>6,}  p50 {sizes[len(sizes) // 2]:>3}  "
+        f"p99 {sizes[int(0.99 * len(sizes))]:>4}  max {sizes[-1]:>4} ({largest!r})"
+    )
+    print(
+        f"{'':<8} scanned/request mean {statistics.fmean(scanned):6.1f}  "
+        f"p99 {scanned[int(0.99 * len(scanned))]:>4}  max {scanned[-1]:>4}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=EASYLIST_SIZED_RULES)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--scoped", type=int, default=2_000, help="$domain= rules to add")
+    args = parser.parse_args()
+
+    requests = [
+        (url, (urlsplit(first).hostname or "").lower())
+        for url, _kind, first in request_corpus(args.requests, args.rules)
+    ]
+    rules = FilterRuleSet()
+    rules.parse_text(easylist_text(args.rules) + "\n" + scoped_rules_text(requests, args.scoped))
+    rules.finalize()
+    print(
+        f"{sum(len(bucket) for domain in rules.domain_token_buckets.values() for bucket in domain.values()):,} "
+        f"$domain= block rules under {len(rules.domain_token_buckets):,} domains"
+    )
+    describe("longest", longest_token_buckets(rules), {}, requests)
+    describe("rarest", rules.token_buckets, rules.domain_token_buckets, requests)
+
+
+if __name__ == "__main__":
+    main()
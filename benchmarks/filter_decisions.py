@@ -0,0 +1,122 @@
+"""Nanoseconds per request for the interceptor's filter decision path.
+
+``two-call`` replays the pre-``evaluate`` interceptor sequence against today's
+buckets: ``allows_request`` and then ``should_block``, each mapping the
+resource type, lowering and tokenizing the URL, and deriving the third-party
+relation itself, with ``should_block`` scanning the exceptions a second time.
+``allows_request`` and ``should_block`` now wrap ``evaluate`` and its cache, so
+they cannot stand in for that path.  ``evaluate`` is the single-pass path the
+interceptor now uses, timed once with an empty decision cache and once
+replaying as many requests as the cache holds, as happens on reloads and
+across tabs.
+
+    python -m benchmarks.filter_decisions [--requests N] [--rules N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from urllib.parse import urlsplit
+
+from octobrowse.filtering import (
+    FilterRuleSet,
+    domain_suffix_match,
+    is_third_party_request,
+    resource_type_name,
+    url_authority,
+)
+
+from .corpus import EASYLIST_SIZED_RULES, easylist_text, request_corpus
+
+
+def prepared_requests(request_count: int, rule_count: int) -> list[tuple[str, str, str, str]]:
+    """Return ``(url, host, resource_type, first_party_host)`` tuples."""
+    return [
+        (url, urlsplit(url).hostname or "", resource_type, urlsplit(first_party).hostname or "")
+        for url, resource_type, first_party in request_corpus(request_count, rule_count)
+    ]
+
+
+def _scan(rules: FilterRuleSet, url: str, host: str, resource_type: str, first_party: str, exceptions: bool):
+    """One pre-``evaluate`` bucket scan, redoing its own per-request setup."""
+    request_type = resource_type_name(resource_type)
+    lowered = url.lower()
+    tokens = set(rules._TOKEN_RE.findall(lowered))
+    third_party = is_third_party_request(host, first_party)
+    domains, _option_domains, scoped_exceptions, scoped_blocks = rules._first_party_scope(first_party)
+    return rules._first_match(
+        url,
+        lowered,
+        url_authority(lowered),
+        tokens,
+        rules.exception_token_buckets if exceptions else rules.token_buckets,
+        scoped_exceptions if exceptions else scoped_blocks,
+        rules.generic_exceptions if exceptions else rules.generic_patterns,
+        request_type,
+        third_party,
+        domains,
+    )
+
+
+def old_allows_request(rules: FilterRuleSet, url: str, host: str, resource_type: str, first_party: str) -> bool:
+    if domain_suffix_match(host, rules.exception_domains) is not None:
+        return True
+    return _scan(rules, url, host, resource_type, first_party, exceptions=True) is not None
+
+
+def old_should_block(rules: FilterRuleSet, url: str, host: str, resource_type: str, first_party: str) -> bool:
+    if old_allows_request(rules, url, host, resource_type, first_party):
+        return False
+    if domain_suffix_match(host, rules.blocked_domains) is not None:
+        return True
+    return _scan(rules, url, host, resource_type, first_party, exceptions=False) is not None
+
+
+def time_two_call(rules: FilterRuleSet, requests: list[tuple[str, str, str, str]]) -> float:
+    start = time.perf_counter_ns()
+    for url, host, resource_type, first_party in requests:
+        if not old_allows_request(rules, url, host, resource_type, first_party):
+            old_should_block(rules, url, host, resource_type, first_party)
+    return (time.perf_counter_ns() - start) / len(requests)
+
+
+def time_evaluate(
+    rules: FilterRuleSet, requests: list[tuple[str, str, str, str]], warm_cache: bool = False
+) -> float:
+    if not warm_cache:
+        rules.decision_cache.clear()
+    evaluate = rules.evaluate
+    start = time.perf_counter_ns()
+    for url, host, resource_type, first_party in requests:
+        evaluate(url, host, resource_type, first_party)
+    return (time.perf_counter_ns() - start) / len(requests)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--rules", type=int, default=EASYLIST_SIZED_RULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rules = FilterRuleSet()
+    rules.parse_text(easylist_text(args.rules))
+    requests = prepared_requests(args.requests, args.rules)
+    time_evaluate(rules, requests)  # warm lazily compiled patterns
+
+    two_call = min(time_two_call(rules, requests) for _ in range(args.repeat))
+    single = min(time_evaluate(rules, requests) for _ in range(args.repeat))
+    replayed = requests[: rules.DECISION_CACHE_SIZE]
+    time_evaluate(rules, replayed)
+    cached = min(time_evaluate(rules, replayed, warm_cache=True) for _ in range(args.repeat))
+    blocked = sum(rules.evaluate(url, host, kind, first).blocked for url, host, kind, first in requests)
+    print(f"rules: {rules.rule_count}  requests: {len(requests)}  replayed: {len(replayed)}  blocked: {blocked}")
+    print(f"two-call (pre-evaluate sequence):        {two_call:,.0f} ns/request")
+    print(f"evaluate (single pass):                  {single:,.0f} ns/request")
+    print(f"evaluate, replayed requests (LRU warm):  {cached:,.0f} ns/request")
+    print(f"speed-up: {two_call / single:.2f}x cold, {two_call / cached:.2f}x warm")
+
+
+if __name__ == "__main__":
+    main()
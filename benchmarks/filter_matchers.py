@@ -0,0 +1,107 @@
+"""Parse and match cost of the specialized ABP pattern matchers.
+
+Each network rule is classified as a literal substring, ``|prefix``,
+``||host`` literal, or wildcard pattern.  This benchmark reports the kind mix
+of an EasyList-sized list, the parse time, and per-kind match cost against the
+regex every rule used to be compiled to.
+
+    python -m benchmarks.filter_matchers [--rules N] [--urls N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from octobrowse.filtering import FilterRuleSet, NetworkRule, url_authority
+
+from .corpus import EASYLIST_SIZED_RULES, easylist_text, request_corpus
+
+
+def all_rules(rules: FilterRuleSet) -> list[NetworkRule]:
+    collected: list[NetworkRule] = []
+    for buckets in (rules.token_buckets, rules.exception_token_buckets):
+        for bucket in buckets.values():
+            collected.extend(bucket)
+    collected.extend(rules.generic_patterns)
+    collected.extend(rules.generic_exceptions)
+    return collected
+
+
+def rule_body(rule: NetworkRule) -> str:
+    text = rule.text[2:] if rule.text.startswith("@@") else rule.text
+    return text.partition("$")[0]
+
+
+def time_rules(rules: list[NetworkRule], prepared: list[tuple[str, str, tuple[int, int] | None]]) -> float:
+    start = time.perf_counter_ns()
+    for url, lowered, authority in prepared:
+        for rule in rules:
+            rule.matches(url, lowered, authority, "other", None)
+    return (time.perf_counter_ns() - start) / (len(rules) * len(prepared))
+
+
+def time_patterns(
+    patterns: list[re.Pattern[str]], prepared: list[tuple[str, str, tuple[int, int] | None]]
+) -> float:
+    start = time.perf_counter_ns()
+    for url, _lowered, _authority in prepared:
+        for pattern in patterns:
+            pattern.search(url)
+    return (time.perf_counter_ns() - start) / (len(patterns) * len(prepared))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=EASYLIST_SIZED_RULES)
+    parser.add_argument("--urls", type=int, default=200)
+    parser.add_argument("--sample", type=int, default=400, help="rules timed per kind")
+    args = parser.parse_args()
+
+    text = easylist_text(args.rules)
+    parse_seconds = []
+    rules = FilterRuleSet()
+    for _ in range(3):
+        rules = FilterRuleSet()
+        start = time.perf_counter()
+        rules.parse_text(text)
+        parse_seconds.append(time.perf_counter() - start)
+    rules.finalize()
+    network_rules = all_rules(rules)
+    kinds = Counter(rule.kind for rule in network_rules)
+    print(f"parse: {min(parse_seconds) * 1000:,.0f} ms for {args.rules:,} lines")
+    print(
+        f"network pattern rules: {len(network_rules):,} "
+        + ", ".join(f"{kind}={count:,}" for kind, count in sorted(kinds.items()))
+    )
+
+    urls = [url for url, _kind, _first in request_corpus(args.urls, args.rules)]
+    prepared = [(url, url.lower(), url_authority(url.lower())) for url in urls]
+    print(f"match cost per (rule, URL) over {len(urls)} URLs, constraints stripped:")
+    for kind in sorted(kinds):
+        sample = [rule for rule in network_rules if rule.kind == kind][: args.sample]
+        unconstrained = [
+            NetworkRule(rule.kind, rule.source, text=rule.text, end_anchor=rule.end_anchor)
+            for rule in sample
+        ]
+        patterns = [NetworkRule("regex", rule_body(rule)).pattern for rule in sample]
+        specialized = min(time_rules(unconstrained, prepared) for _ in range(3))
+        regex_cost = min(time_patterns(patterns, prepared) for _ in range(3))
+        print(f"  {kind:<9} specialized {specialized:7,.0f} ns   regex {regex_cost:7,.0f} ns")
+
+    requests = [
+        (url, urlsplit(url).hostname or "", kind, urlsplit(first).hostname or "")
+        for url, kind, first in request_corpus(5_000, args.rules)
+    ]
+    rules.decision_cache.clear()
+    start = time.perf_counter_ns()
+    for url, host, kind, first in requests:
+        rules.evaluate(url, host, kind, first)
+    print(f"evaluate (cold cache): {(time.perf_counter_ns() - start) / len(requests):,.0f} ns/request")
+
+
+if __name__ == "__main__":
+    main()
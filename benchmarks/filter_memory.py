@@ -0,0 +1,74 @@
+"""Parse time and resident size of a parsed, EasyList-sized FilterRuleSet.
+
+Memory is measured with ``tracemalloc`` around the parse so it covers only
+objects owned by the rule set.  The report also shows how many wildcard
+rules have split their pattern into pieces after a realistic request stream;
+the rest never pay for it.
+
+    python -m benchmarks.filter_memory [--rules N] [--requests N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+from octobrowse.filtering import FilterRuleSet, NetworkRule
+
+from .corpus import EASYLIST_SIZED_RULES, easylist_text, request_corpus
+
+
+def network_rules(rules: FilterRuleSet) -> list[NetworkRule]:
+    collected: list[NetworkRule] = []
+    for buckets in (rules.token_buckets, rules.exception_token_buckets):
+        for bucket in buckets.values():
+            collected.extend(bucket)
+    collected.extend(rules.generic_patterns)
+    collected.extend(rules.generic_exceptions)
+    return collected
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=EASYLIST_SIZED_RULES)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    text = easylist_text(args.rules)
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        FilterRuleSet().parse_text(text)
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    rules = FilterRuleSet()
+    rules.parse_text(text)
+    rules.finalize()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    collected = network_rules(rules)
+    print(f"parse: {min(timings) * 1000:,.0f} ms for {args.rules:,} lines")
+    print(
+        f"resident: {current / 2**20:.1f} MiB (peak {peak / 2**20:.1f} MiB), "
+        f"{current / max(1, rules.rule_count):,.0f} bytes/rule over {rules.rule_count:,} rules"
+    )
+
+    for url, kind, first in request_corpus(args.requests, args.rules):
+        rules.evaluate(url, urlsplit(url).hostname or "", kind, urlsplit(first).hostname or "")
+    wildcard = [rule for rule in collected if rule.kind == "regex"]
+    prepared = sum(1 for rule in wildcard if rule.wildcard is not None)
+    print(
+        f"wildcard rules prepared after {args.requests:,} requests: "
+        f"{prepared:,} of {len(wildcard):,}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Wall-clock and calling-thread CPU time of serial versus process-pool parsing.
+
+Lists are written to a temporary directory and loaded with
+``stream_filter_rules``, as ``FilterParseWorker`` does, without a cache.
+The calling thread's CPU time approximates how long it holds the GIL, which
+is what the UI and the request interceptor wait on while lists are parsed.
+
+    python -m benchmarks.filter_parallel [--lists N] [--rules N] [--workers 1,2,4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from octobrowse.filter_cache import stream_filter_rules
+from octobrowse.parse_pool import filter_parse_pool
+
+from .corpus import easylist_text
+
+
+def timed(paths: list[Path], pool: ProcessPoolExecutor | None) -> tuple[float, float]:
+    wall, cpu = time.perf_counter(), time.thread_time()
+    for _rules, _segments in stream_filter_rules(paths, executor=pool):
+        pass
+    return time.perf_counter() - wall, time.thread_time() - cpu
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lists", type=int, default=5)
+    parser.add_argument("--rules", type=int, default=30_000, help="lines per list")
+    parser.add_argument("--workers", default="1,2,4")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [Path(directory) / f"list{index}.txt" for index in range(args.lists)]
+        for index, path in enumerate(paths):
+            path.write_text(easylist_text(args.rules, seed=index), encoding="utf-8")
+        print(
+            f"{args.lists} lists x {args.rules:,} lines, "
+            f"{sum(path.stat().st_size for path in paths) / 2**20:.1f} MiB, {os.cpu_count()} CPUs"
+        )
+        wall, cpu = min(timed(paths, None) for _ in range(3))
+        print(f"serial           wall {wall * 1000:7,.0f} ms   calling thread {cpu * 1000:7,.0f} ms")
+        for workers in (int(value) for value in args.workers.split(",")):
+            with filter_parse_pool(workers) as pool:
+                timed(paths[:1], pool)  # start the worker processes
+                wall, cpu = min(timed(paths, pool) for _ in range(3))
+            print(f"pool, {workers} workers wall {wall * 1000:7,.0f} ms   calling thread {cpu * 1000:7,.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Cost of preparing page context for the AI summary and Q&A prompts.
+
+A deterministic, article-shaped page is split into chunks.  ``rank`` times
+one follow-up question against a reused ``ChunkIndex`` and the previous
+per-question path, which re-scored every chunk with
+``lexical_relevance_score``.  ``coverage`` times the summary ordering of
+book-length pages against the previous farthest-point scan, which is cubic
+and therefore only run on its smallest size.  ``fit`` times truncating one
+chunk to a budget against the previous binary search, which re-rendered
+and re-escaped the chunk at every probe.  ``clean`` times normalizing the
+whole page, ASCII and with accented words, against the previous
+per-character ``unicodedata.category`` filter and line-by-line folding.
+
+    python -m benchmarks.page_context [--paragraphs N] [--questions N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+import unicodedata
+from dataclasses import replace
+
+from octobrowse.ai_context import (
+    ChunkIndex,
+    SourceChunk,
+    _broad_coverage_order,
+    _fit_chunk_to_budget,
+    clean_page_text,
+    delimit_untrusted_content,
+    lexical_relevance_score,
+    split_page_text,
+)
+
+_VOCABULARY = tuple(
+    f"{stem}{suffix}"
+    for stem in (
+        "octopus", "reef", "camouflage", "browser", "privacy", "header", "filter", "session",
+        "tab", "cache", "network", "request", "engine", "render", "memory", "thread",
+        "signal", "budget", "summary", "source", "page", "chunk", "index", "query",
+    )
+    for suffix in ("", "s", "ing", "ed", "er", "al")
+)
+_FILLER = ("the", "a", "of", "and", "to", "in", "is", "that", "for", "with", "on", "as")
+
+
+def page_text(paragraphs: int, seed: int = 11) -> str:
+    """Return *paragraphs* paragraphs of Zipf-ish synthetic prose."""
+    rnd = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(_VOCABULARY))]
+    blocks = []
+    for _ in range(paragraphs):
+        sentences = []
+        for _ in range(rnd.randrange(3, 7)):
+            words = rnd.choices(_VOCABULARY, weights, k=rnd.randrange(8, 18))
+            for position in range(0, len(words), 3):
+                words.insert(position, rnd.choice(_FILLER))
+            sentences.append(" ".join(words).capitalize() + ".")
+        blocks.append(" ".join(sentences))
+    return "\n\n".join(blocks)
+
+
+def questions(count: int, seed: int = 3) -> list[str]:
+    rnd = random.Random(seed)
+    return [
+        f"How does the {' '.join(rnd.sample(_VOCABULARY, rnd.randrange(1, 4)))} work?"
+        for _ in range(count)
+    ]
+
+
+def farthest_point_scan(chunks: list[SourceChunk]) -> list[SourceChunk]:
+    """The previous ``_broad_coverage_order``: rescan every candidate per pick."""
+    if len(chunks) < 2:
+        return list(chunks)
+    chosen = [0, len(chunks) - 1]
+    while len(chosen) < len(chunks):
+        chosen.append(
+            max(
+                (index for index in range(len(chunks)) if index not in chosen),
+                key=lambda index: (min(abs(index - other) for other in chosen), -index),
+            )
+        )
+    return [chunks[index] for index in chosen]
+
+
+def time_coverage() -> None:
+    for count in (500, 10_000, 100_000):
+        chunks = [SourceChunk(index + 1, "Book", "https://example.test/book", "text") for index in range(count)]
+        start = time.perf_counter()
+        order = _broad_coverage_order(chunks)
+        heap_ms = (time.perf_counter() - start) * 1000
+        line = f"  coverage order, {count:,} chunks: {heap_ms:,.1f} ms"
+        if count <= 500:
+            start = time.perf_counter()
+            assert farthest_point_scan(chunks) == order
+            line += f" (farthest-point scan {(time.perf_counter() - start) * 1000:,.0f} ms)"
+        print(line)
+
+
+def search_fit(chunk: SourceChunk, budget: int) -> SourceChunk | None:
+    """The previous ``_fit_chunk_to_budget``: render every binary-search probe."""
+    if len(delimit_untrusted_content(chunk)) <= budget:
+        return chunk
+    best = replace(chunk, text="")
+    if len(delimit_untrusted_content(best)) > budget:
+        return None
+    low, high = 0, len(chunk.text)
+    while low <= high:
+        midpoint = (low + high) // 2
+        text = chunk.text[:midpoint].rstrip()
+        if midpoint < len(chunk.text):
+            text += "\n[truncated]"
+        candidate = replace(chunk, text=text)
+        if len(delimit_untrusted_content(candidate)) <= budget:
+            best = candidate
+            low = midpoint + 1
+        else:
+            high = midpoint - 1
+    return best
+
+
+def time_fit(chunks: list[SourceChunk]) -> None:
+    sample = chunks[:200]
+    budgets = [len(delimit_untrusted_content(chunk)) // 2 for chunk in sample]
+    start = time.perf_counter()
+    fitted = [_fit_chunk_to_budget(chunk, budget) for chunk, budget in zip(sample, budgets)]
+    prefix_us = (time.perf_counter() - start) / len(sample) * 1e6
+    start = time.perf_counter()
+    searched = [search_fit(chunk, budget) for chunk, budget in zip(sample, budgets)]
+    search_us = (time.perf_counter() - start) / len(sample) * 1e6
+    assert [result and result[0] for result in fitted] == searched
+    print(f"  fit chunk to budget: {prefix_us:,.0f} us prefix sums, {search_us:,.0f} us binary search")
+
+
+def character_clean(text: str) -> str:
+    """The previous ``clean_page_text``: filter and fold one character and line at a time."""
+    normalized = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    normalized = "".join(
+        character
+        for character in normalized
+        if character in {"\n", "\t"} or unicodedata.category(character) not in {"Cc", "Cf"}
+    )
+    paragraphs: list[str] = []
+    current_lines: list[str] = []
+    for raw_line in normalized.split("\n"):
+        line = re.sub(r"[^\S\n]+", " ", raw_line).strip()
+        if line:
+            current_lines.append(line)
+        elif current_lines:
+            paragraphs.append(" ".join(current_lines))
+            current_lines = []
+    if current_lines:
+        paragraphs.append(" ".join(current_lines))
+    return "\n\n".join(paragraphs)
+
+
+def time_clean(text: str) -> None:
+    for label, page in (("ascii", text), ("accented", text.replace("reef", "r\u00e9cif"))):
+        start = time.perf_counter()
+        cleaned = clean_page_text(page)
+        fast_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        assert character_clean(page) == cleaned
+        slow_ms = (time.perf_counter() - start) * 1000
+        print(f"  clean {label} page: {fast_ms:,.0f} ms, per-character filter {slow_ms:,.0f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=2_000)
+    parser.add_argument("--questions", type=int, default=50)
+    args = parser.parse_args()
+
+    text = page_text(args.paragraphs)
+    chunks = split_page_text(text, title="Octopus browser field notes", url="https://example.test/notes")
+    print(f"page: {len(text) / 1024:,.0f} KiB, {len(chunks):,} chunks")
+
+    start = time.perf_counter()
+    index = ChunkIndex(chunks)
+    print(f"  index build: {(time.perf_counter() - start) * 1000:,.1f} ms")
+
+    asked = questions(args.questions)
+    start = time.perf_counter()
+    for question in asked:
+        index.rank(question)
+    indexed = (time.perf_counter() - start) / len(asked)
+    rescored_questions = asked[: max(1, len(asked) // 10)]
+    start = time.perf_counter()
+    for question in rescored_questions:
+        sorted(chunks, key=lambda chunk: (-lexical_relevance_score(chunk, question), chunk.source_id))
+    rescored = (time.perf_counter() - start) / len(rescored_questions)
+    print(
+        f"  rank per question: {indexed * 1000:,.2f} ms indexed, "
+        f"{rescored * 1000:,.1f} ms re-scoring every chunk ({rescored / indexed:,.0f}x)"
+    )
+    time_fit(chunks)
+    time_clean(text)
+    time_coverage()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Replay a request corpus through the interceptor's blocking decision.
+
+Every request goes through ``request_block_key``, the pure function behind
+``OctoRequestInterceptor.interceptRequest``.  The report covers filter-list
+parse time and traced peak memory, then p50/p99 latency per request and
+decisions per second, both with an empty decision cache ("cold") and when
+the same requests are replayed ("warm").  Each figure is the median of
+``--repeat`` runs.
+
+Lists (``--list``, repeatable) are ABP or hosts-file text.  A corpus is
+either tab-separated ``url<TAB>resource type<TAB>first-party url`` lines or
+a HAR file exported from browser developer tools.  Without them the
+synthetic EasyList-shaped corpora are used.
+
+``--json`` saves a run; ``--baseline`` compares against a saved run and
+exits with status 1 when a metric is worse by more than ``--tolerance`` or
+when the same inputs produce different block decisions.
+
+    python -m benchmarks.replay [--list PATH ...] [--corpus PATH] [--json OUT] [--baseline PATH]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+from octobrowse.filtering import DomainIndex, FilterRuleSet, request_block_key
+
+from .corpus import EASYLIST_SIZED_RULES, easylist_text, request_corpus
+
+
+Request = tuple[str, str, str, str]  # url, host, resource type, first-party host
+
+# Chrome's HAR ``_resourceType`` values mapped to ABP type options.
+HAR_RESOURCE_TYPES = {
+    "document": "document",
+    "stylesheet": "stylesheet",
+    "image": "image",
+    "media": "media",
+    "texttrack": "media",
+    "font": "font",
+    "script": "script",
+    "xhr": "xmlhttprequest",
+    "fetch": "xmlhttprequest",
+    "eventsource": "xmlhttprequest",
+    "websocket": "websocket",
+    "ping": "ping",
+}
+
+# Metrics where a larger value is better; every other metric is a cost.
+HIGHER_IS_BETTER = {"cold_decisions_per_s", "warm_decisions_per_s"}
+
+
+def load_har(data: dict[str, Any]) -> list[tuple[str, str, str]]:
+    """Return ``(url, resource_type, first_party_url)`` requests from a HAR log.
+
+    The first document request of each page is its first-party URL; entries
+    without a page fall back to their ``Referer`` header.
+    """
+    entries = data.get("log", {}).get("entries", [])
+    page_urls: dict[str, str] = {}
+    for entry in entries:
+        if entry.get("_resourceType") == "document" and entry.get("pageref"):
+            page_urls.setdefault(entry["pageref"], entry["request"]["url"])
+    requests = []
+    for entry in entries:
+        request = entry.get("request", {})
+        url = request.get("url", "")
+        if not url.startswith(("http:", "https:", "ws:", "wss:")):
+            continue
+        first_party = page_urls.get(entry.get("pageref", ""), "")
+        if not first_party:
+            headers = {header["name"].lower(): header["value"] for header in request.get("headers", [])}
+            first_party = headers.get("referer", "")
+        kind = HAR_RESOURCE_TYPES.get(str(entry.get("_resourceType", "")).lower(), "other")
+        requests.append((url, kind, first_party))
+    return requests
+
+
+def load_corpus(path: Path) -> list[tuple[str, str, str]]:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".har":
+        return load_har(json.loads(text))
+    requests = []
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        url, kind, first_party = (line.split("\t") + ["", ""])[:3]
+        requests.append((url, kind or "other", first_party))
+    return requests
+
+
+def prepared(corpus: list[tuple[str, str, str]]) -> list[Request]:
+    return [
+        (url, (urlsplit(url).hostname or "").lower(), kind, (urlsplit(first).hostname or "").lower())
+        for url, kind, first in corpus
+    ]
+
+
+def fingerprint(texts: list[str], block_list: list[str], corpus: list[tuple[str, str, str]]) -> str:
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(hashlib.sha256(text.encode("utf-8")).digest())
+    digest.update("\n".join(block_list).encode("utf-8"))
+    for request in corpus:
+        digest.update("\t".join(request).encode("utf-8") + b"\n")
+    return digest.hexdigest()[:16]
+
+
+def parse_lists(texts: list[str]) -> FilterRuleSet:
+    """Parse like ``FilterParseWorker``: one rule set per list, merged and optimized."""
+    parts = []
+    for text in texts:
+        part = FilterRuleSet()
+        part.parse_text(text)
+        parts.append(part)
+    rules = FilterRuleSet.merge(parts)
+    rules.optimize()
+    return rules
+
+
+def percentile(sorted_values: list[int], fraction: float) -> int:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def replay_latency(rules: FilterRuleSet, block_list: DomainIndex, requests: list[Request]) -> tuple[list[int], int]:
+    clock = time.perf_counter_ns
+    timings = []
+    blocked = 0
+    for url, host, kind, first in requests:
+        start = clock()
+        key = request_block_key(rules, block_list, url, host, kind, first)
+        timings.append(clock() - start)
+        blocked += key is not None
+    timings.sort()
+    return timings, blocked
+
+
+def replay_throughput(rules: FilterRuleSet, block_list: DomainIndex, requests: list[Request]) -> float:
+    start = time.perf_counter()
+    for url, host, kind, first in requests:
+        request_block_key(rules, block_list, url, host, kind, first)
+    return len(requests) / (time.perf_counter() - start)
+
+
+def measure(
+    texts: list[str], block_list: DomainIndex, requests: list[Request], repeat: int
+) -> tuple[dict[str, float], int, int]:
+    runs: dict[str, list[float]] = {}
+
+    def record(name: str, value: float) -> None:
+        runs.setdefault(name, []).append(value)
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_lists(texts)
+        record("parse_ms", (time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    rules = parse_lists(texts)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    replay_throughput(rules, block_list, requests)  # compile the regexes the corpus reaches
+    blocked = 0
+    for _ in range(repeat):
+        for phase in ("cold", "warm"):
+            if phase == "cold":
+                rules.decision_cache.clear()
+            timings, blocked = replay_latency(rules, block_list, requests)
+            record(f"{phase}_p50_ns", percentile(timings, 0.50))
+            record(f"{phase}_p99_ns", percentile(timings, 0.99))
+            if phase == "cold":
+                rules.decision_cache.clear()
+            record(f"{phase}_decisions_per_s", replay_throughput(rules, block_list, requests))
+    metrics = {name: statistics.median(values) for name, values in runs.items()}
+    metrics["peak_mib"] = peak / 2**20
+    metrics["resident_mib"] = current / 2**20
+    return metrics, rules.rule_count, blocked
+
+
+def compare(result: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Print a comparison table and return the names of regressed metrics."""
+    failures = []
+    if baseline["inputs"]["fingerprint"] != result["inputs"]["fingerprint"]:
+        print("warning: baseline used different lists or corpus; deltas are not like-for-like")
+    elif baseline["inputs"]["blocked"] != result["inputs"]["blocked"]:
+        print(f"decisions changed: {baseline['inputs']['blocked']:,} -> {result['inputs']['blocked']:,} blocked")
+        failures.append("blocked")
+    print(f"{'metric':<24}{'baseline':>14}{'current':>14}{'change':>9}")
+    for name, value in result["metrics"].items():
+        before = baseline["metrics"].get(name)
+        if not before:
+            continue
+        change = (value - before) / before
+        worse = -change if name in HIGHER_IS_BETTER else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        print(f"{name:<24}{before:>14,.1f}{value:>14,.1f}{change:>+9.1%}{flag}")
+        if flag:
+            failures.append(name)
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--list", action="append", type=Path, default=[], help="filter list or hosts file")
+    parser.add_argument("--block-list", type=Path, help="built-in blocklist stand-in, one domain per line")
+    parser.add_argument("--corpus", type=Path, help="TSV or .har request log")
+    parser.add_argument("--rules", type=int, default=EASYLIST_SIZED_RULES, help="synthetic list lines")
+    parser.add_argument("--requests", type=int, default=20_000, help="synthetic corpus size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--baseline", type=Path, help="compare against a --json file")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed fractional regression")
+    args = parser.parse_args()
+
+    if args.list:
+        texts = [path.read_text(encoding="utf-8", errors="replace") for path in args.list]
+    else:
+        texts = [easylist_text(args.rules)]
+    corpus = load_corpus(args.corpus) if args.corpus else request_corpus(args.requests, args.rules)
+    domains = []
+    if args.block_list:
+        domains = [line.strip() for line in args.block_list.read_text(encoding="utf-8").splitlines()]
+        domains = [domain for domain in domains if domain and not domain.startswith("#")]
+    requests = prepared(corpus)
+    if not requests:
+        parser.error("the corpus contains no http(s) requests")
+
+    metrics, rule_count, blocked = measure(texts, DomainIndex(domains), requests, max(1, args.repeat))
+    result = {
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "inputs": {
+            "fingerprint": fingerprint(texts, domains, corpus),
+            "rules": rule_count,
+            "requests": len(requests),
+            "blocked": blocked,
+        },
+        "metrics": metrics,
+    }
+
+    print(
+        f"{rule_count:,} rules, {len(requests):,} requests ({blocked:,} blocked), "
+        f"inputs {result['inputs']['fingerprint']}"
+    )
+    print(
+        f"parse {metrics['parse_ms']:,.0f} ms, peak {metrics['peak_mib']:.1f} MiB, "
+        f"resident {metrics['resident_mib']:.1f} MiB"
+    )
+    for phase in ("cold", "warm"):
+        print(
+            f"{phase}: p50 {metrics[f'{phase}_p50_ns']:,.0f} ns  p99 {metrics[f'{phase}_p99_ns']:,.0f} ns  "
+            f"{metrics[f'{phase}_decisions_per_s']:,.0f} decisions/s"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    if args.baseline:
+        failures = compare(result, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        if failures:
+            print(f"regressed: {', '.join(failures)}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Size and lookup cost of the hash-prefix malicious-URL list.
+
+A synthetic list of a few million entries is imported into a memory-mapped
+file.  The benchmark reports the file size and load time, the cost of one
+32-bit prefix probe with its confirmation, a full page-URL lookup (about a
+dozen SHA-256 expressions), and the per-request cost the interceptor adds
+for subresources, which only check their resource type.
+
+    python -m benchmarks.url_blocklist [--entries N] [--lookups N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from octobrowse.url_blocklist import (
+    build_url_hash_list,
+    expression_hash,
+    frame_request_match,
+    load_url_hash_list,
+)
+
+from .corpus import request_corpus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=3_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rnd = random.Random(5)
+    with tempfile.TemporaryDirectory() as directory:
+        source = Path(directory) / "urls.txt"
+        with source.open("w", encoding="utf-8") as handle:
+            for index in range(args.entries):
+                # Mostly whole hosts, some single phishing paths, as real lists.
+                if index % 4:
+                    handle.write(f"bad{index}.example/\n")
+                else:
+                    handle.write(f"site{index}.example/login/{rnd.randrange(10**6)}.html\n")
+        start = time.perf_counter()
+        path, count = build_url_hash_list(source, Path(directory) / "lists")
+        import_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        hashes = load_url_hash_list(path.parent)
+        load_ms = (time.perf_counter() - start) * 1000
+        assert hashes is not None and len(hashes) == count
+        print(
+            f"{count:,} entries: {path.stat().st_size / 2**20:.1f} MiB file, "
+            f"import {import_seconds:.1f} s, load {load_ms:.1f} ms"
+        )
+
+        listed = [expression_hash(f"bad{rnd.randrange(args.entries) | 1}.example/") for _ in range(args.lookups)]
+        unlisted = [rnd.getrandbits(64) for _ in range(args.lookups)]
+        for label, values in (("listed", listed), ("unlisted", unlisted)):
+            start = time.perf_counter_ns()
+            found = sum(hashes.contains_hash(value) for value in values)
+            elapsed = (time.perf_counter_ns() - start) / len(values)
+            print(f"  prefix probe ({label}): {elapsed:,.0f} ns, {found:,} found")
+
+        requests = request_corpus(args.lookups)
+        frames = [(url, "document") for url, _kind, _first in requests]
+        subresources = [(url, kind) for url, kind, _first in requests if kind != "subdocument"]
+        blocked = 0
+        start = time.perf_counter_ns()
+        for url, kind in frames:
+            blocked += frame_request_match(hashes, url, kind) is not None
+        elapsed = (time.perf_counter_ns() - start) / len(frames)
+        print(f"  page load lookup: {elapsed / 1000:,.1f} us ({blocked:,} of {len(frames):,} listed)")
+        start = time.perf_counter_ns()
+        for url, kind in subresources:
+            frame_request_match(hashes, url, kind)
+        elapsed = (time.perf_counter_ns() - start) / len(subresources)
+        print(f"  subresource request: {elapsed:,.0f} ns")
+        del hashes
+
+
+if __name__ == "__main__":
+    main()
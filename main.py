@@ -13,6 +13,7 @@ import ast
 import hashlib
 import ipaddress
 import json
+import multiprocessing
 import os
 import re
 import socket
@@ -22,20 +23,57 @@ import sys
 import tempfile
 import time
 import html
+import itertools
 from collections import Counter
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
 from urllib.parse import quote_plus
 
 from octobrowse.filtering import (
+    DomainIndex,
     FilterRuleSet,
-    domain_suffix_match as _domain_suffix_match,
+    request_block_key,
     resource_type_name,
+    set_quarantine_listener,
 )
-from octobrowse.ai_context import build_qa_prompt, build_summary_prompt, split_page_text
+from octobrowse.filter_cache import FilterListSegment, stream_filter_rules
+from octobrowse.page_text import PageText, PageTextCache
+from octobrowse.parse_pool import filter_parse_pool
+from octobrowse.public_suffix import public_suffix_trie
+from octobrowse.rule_stats import (
+    RULE_STATS_FILE,
+    personal_filter_list,
+    read_rule_stats,
+    rule_report,
+    write_rule_stats,
+)
+from octobrowse.ai_context import build_qa_prompt, build_summary_prompt
 from octobrowse.session import make_session_snapshot, normalize_session_snapshot
-from octobrowse.urls import can_dispatch_octo_command, is_internal_url as classify_internal_url
+from octobrowse.subscriptions import (
+    SUBSCRIPTION_STATE_FILE,
+    Subscription,
+    SubscriptionError,
+    download_subscription,
+    read_subscriptions,
+    subscription_due,
+    subscription_file_name,
+    subscription_summary,
+    write_subscriptions,
+)
+from octobrowse.url_blocklist import (
+    FRAME_TYPES,
+    URL_BLOCKLIST_DIR,
+    UrlHashList,
+    build_url_hash_list,
+    load_url_hash_list,
+)
+from octobrowse.urls import (
+    INTERNAL_HTTPS_HOST,
+    can_dispatch_octo_command,
+    is_internal_url as classify_internal_url,
+)
 from octobrowse.version import __version__
 from octobrowse.workspaces import make_workspace, normalize_workspaces, workspace_to_markdown
 
@@ -71,7 +109,20 @@ try:
 except ImportError:  # pragma: no cover - optional runtime feature
     sr = None
 
-from PyQt6.QtCore import QSize, QStandardPaths, QStringListModel, QThread, QTimer, QUrl, Qt, pyqtSignal
+from PyQt6.QtCore import (
+    QFile,
+    QIODevice,
+    QObject,
+    QSize,
+    QStandardPaths,
+    QStringListModel,
+    QThread,
+    QTimer,
+    QUrl,
+    Qt,
+    pyqtSignal,
+    pyqtSlot,
+)
 from PyQt6.QtGui import QAction, QColor, QDesktopServices, QIcon
 from PyQt6.QtWebEngineCore import (
     QWebEnginePage,
@@ -83,6 +134,7 @@ from PyQt6.QtWebEngineCore import (
     qWebEngineChromiumSecurityPatchVersion,
     qWebEngineChromiumVersion,
 )
+from PyQt6.QtWebChannel import QWebChannel
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWidgets import (
     QApplication,
@@ -668,6 +720,71 @@ class HistoryDatabase:
 SAFE_LINK_SCHEMES = {"http", "https", "file", "ftp", "mailto", "octo"}
 
 
+# Runs in the application world after qwebchannel.js.  New ids and classes
+# are batched and reported to the page's CosmeticSurveyBridge, which answers
+# with the CSS keyed by them; a web page's own scripts cannot see the bridge.
+COSMETIC_SURVEYOR_SCRIPT = """
+(() => {
+  if (window.__octoSurveyor || typeof QWebChannel === "undefined" || !window.qt) return;
+  const seen = new Set();
+  let pending = [];
+  let bridge = null;
+  let scheduled = false;
+  const inject = (css) => {
+    const style = document.createElement("style");
+    style.className = "octo-cosmetic-surveyed";
+    style.textContent = css;
+    (document.head || document.documentElement).appendChild(style);
+  };
+  const flush = () => {
+    scheduled = false;
+    if (!bridge || !pending.length) return;
+    const keys = pending;
+    pending = [];
+    bridge.report(keys, (css) => {
+      if (css) inject(css);
+    });
+  };
+  const note = (key) => {
+    if (!seen.has(key)) {
+      seen.add(key);
+      pending.push(key);
+      if (!scheduled) {
+        scheduled = true;
+        setTimeout(flush, 16);
+      }
+    }
+  };
+  const survey = (element) => {
+    if (element.id) note("#" + element.id);
+    for (const name of element.classList) note("." + name);
+  };
+  const scan = (node) => {
+    if (node.nodeType !== 1) return;
+    survey(node);
+    for (const element of node.querySelectorAll("[id],[class]")) survey(element);
+  };
+  new MutationObserver((records) => {
+    for (const record of records) {
+      if (record.type === "attributes") survey(record.target);
+      else for (const node of record.addedNodes) scan(node);
+    }
+  }).observe(document, {
+    childList: true,
+    subtree: true,
+    attributes: true,
+    attributeFilter: ["id", "class"],
+  });
+  if (document.documentElement) scan(document.documentElement);
+  new QWebChannel(qt.webChannelTransport, (channel) => {
+    bridge = channel.objects.octoSurveyor;
+    flush();
+  });
+  window.__octoSurveyor = { inject };
+})();
+"""
+
+
 def safe_link_href(url: str) -> str:
     """Return an attribute-safe href, blanking out dangerous URL schemes."""
     text = str(url).strip()
@@ -709,20 +826,96 @@ def is_blocked_fetch_host(host: str) -> bool:
 
 
 class FilterParseWorker(QThread):
-    parsed = pyqtSignal(object)
+    """Build the active rule set from per-list segments, reparsing only changed lists.
+
+    Changed lists are streamed from disk and each larger partial rule set is
+    emitted through ``progress`` so blocking ramps up while parsing continues;
+    ``parsed`` carries the complete, optimized rules and segments.  Given a
+    *pool*, the pattern lines of large lists are parsed on its worker
+    processes.  The hostname pass, unmarshalling their results, ``merge`` and
+    ``optimize`` still run on this thread and hold the GIL the UI and the
+    request interceptor need.
+    """
+
+    progress = pyqtSignal(object)
+    parsed = pyqtSignal(object, object)
 
-    def __init__(self, texts: list[str], parent: QWidget | None = None) -> None:
+    def __init__(
+        self,
+        list_paths: list[Path],
+        segments: dict[str, FilterListSegment],
+        parent: QWidget | None = None,
+        cache_dir: Path | None = None,
+        pool: ProcessPoolExecutor | None = None,
+    ) -> None:
         super().__init__(parent)
-        self.texts = texts
+        self.list_paths = list_paths
+        self.segments = segments
+        self.cache_dir = cache_dir
+        self.pool = pool
 
     def run(self) -> None:
-        rules = FilterRuleSet()
-        for text in self.texts:
+        public_suffix_trie()  # load here rather than on the first intercepted request
+        try:
+            self._load(self.pool)
+        except BrokenExecutor:  # pragma: no cover - a worker process died; parse in this thread instead
+            self._load(None)
+
+    def _load(self, pool: ProcessPoolExecutor | None) -> None:
+        for rules, segments in stream_filter_rules(self.list_paths, self.segments, self.cache_dir, pool):
+            if segments is None:
+                self.progress.emit(rules)
+            else:
+                self.parsed.emit(rules, segments)
+
+
+class FilterSubscriptionWorker(QThread):
+    """Check filter-list subscriptions and stream changed lists to disk off the UI thread."""
+
+    checked = pyqtSignal(object, object)
+
+    def __init__(
+        self,
+        subscriptions: dict[str, Subscription],
+        list_dir: Path,
+        parent: QWidget | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.subscriptions = subscriptions
+        self.list_dir = list_dir
+
+    def run(self) -> None:
+        results = {}
+        errors = {}
+        for name, subscription in self.subscriptions.items():
+            if self.isInterruptionRequested():
+                break
             try:
-                rules.parse_text(text)
-            except Exception:  # pragma: no cover - malformed list defensive guard
-                continue
-        self.parsed.emit(rules)
+                results[name] = download_subscription(
+                    subscription, self.list_dir / name, user_agent=f"OctoBrowse/{OCTO_BROWSER_VERSION}"
+                )
+            except SubscriptionError as exc:
+                errors[name] = str(exc)
+        self.checked.emit(results, errors)
+
+
+class UrlBlocklistImportWorker(QThread):
+    """Hash a local malicious-URL list into a memory-mapped file off the UI thread."""
+
+    imported = pyqtSignal(object, int, str)
+
+    def __init__(self, source: Path, directory: Path, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.source = source
+        self.directory = directory
+
+    def run(self) -> None:
+        try:
+            path, count = build_url_hash_list(self.source, self.directory)
+        except OSError as exc:
+            self.imported.emit(None, 0, str(exc))
+            return
+        self.imported.emit(UrlHashList.open(path), count, "")
 
 
 class ApiFetchWorker(QThread):
@@ -829,15 +1022,19 @@ class SpeechWorker(QThread):
 
 
 class OctoRequestInterceptor(QWebEngineUrlRequestInterceptor):
-    """Single request interceptor handling ad blocking, HTTPS-only upgrades, and GPC.
+    """Single request interceptor handling URL and ad blocking, HTTPS-only upgrades, and GPC.
 
-    Domain matching walks the host's label suffixes against a set, so each
-    request costs O(host labels) instead of O(blocklist size).
+    Domain matching walks the host's label suffixes against a DomainIndex, so
+    each request costs O(host labels) instead of O(blocklist size).  Page and
+    frame loads are also checked against the local malicious-URL hash list.
     """
 
+    # Emitted on the matching thread; connections queue it to the UI thread.
+    rule_quarantined = pyqtSignal(str)
+
     def __init__(self, block_list: set[str]) -> None:
         super().__init__()
-        self.block_list = {domain.lower() for domain in block_list}
+        self.block_list = DomainIndex(block_list)
         self.blocked_by_domain: Counter[str] = Counter()
         self.ad_block_enabled = False
         self.https_only = False
@@ -845,31 +1042,33 @@ class OctoRequestInterceptor(QWebEngineUrlRequestInterceptor):
         self.dnt_enabled = False
         self.https_upgrades = 0
         self.filter_rules: FilterRuleSet | None = None
+        self.url_blocklist: UrlHashList | None = None
+        self.malicious_blocked: Counter[str] = Counter()
 
     def interceptRequest(self, info: Any) -> None:
         url = info.requestUrl()
+        url_text = url.toString()
         host = url.host().lower()
+        request_type = resource_type_name(info.resourceType())
+        if self.url_blocklist is not None and request_type in FRAME_TYPES:
+            listed = self.url_blocklist.match(url_text)
+            if listed is not None:
+                self.malicious_blocked[listed] += 1
+                info.block(True)
+                return
         if self.ad_block_enabled:
-            rules = self.filter_rules
-            request_type = resource_type_name(info.resourceType())
-            first_party_host = info.firstPartyUrl().host().lower()
-            excepted = (
-                rules.allows_request(url.toString(), host, request_type, first_party_host)
-                if rules is not None
-                else False
+            blocked_by = request_block_key(
+                self.filter_rules,
+                self.block_list,
+                url_text,
+                host,
+                request_type,
+                info.firstPartyUrl().host().lower(),
             )
-            if not excepted:
-                match = self._matching_domain(host)
-                if match:
-                    self.blocked_by_domain[match] += 1
-                    info.block(True)
-                    return
-                if rules is not None and rules.should_block(
-                    url.toString(), host, request_type, first_party_host
-                ):
-                    self.blocked_by_domain[host or "pattern-rule"] += 1
-                    info.block(True)
-                    return
+            if blocked_by is not None:
+                self.blocked_by_domain[blocked_by] += 1
+                info.block(True)
+                return
         if self.https_only and url.scheme() == "http" and self._upgradable_host(host):
             if info.resourceType() == QWebEngineUrlRequestInfo.ResourceType.ResourceTypeMainFrame:
                 secure = QUrl(url)
@@ -884,14 +1083,12 @@ class OctoRequestInterceptor(QWebEngineUrlRequestInterceptor):
 
     def reset_stats(self) -> None:
         self.blocked_by_domain.clear()
+        self.malicious_blocked.clear()
         self.https_upgrades = 0
 
     def total_blocked(self) -> int:
         return sum(self.blocked_by_domain.values())
 
-    def _matching_domain(self, host: str) -> str | None:
-        return _domain_suffix_match(host, self.block_list)
-
     @staticmethod
     def _upgradable_host(host: str) -> bool:
         if not host or host == "localhost" or host.endswith(".local"):
@@ -1052,6 +1249,8 @@ class OctoPluginAPI:
         return self._browser.tabs.tabText(index) if index >= 0 else ""
 
     def get_page_text(self, callback: Any) -> None:
+        # Plugins get the raw text, exactly as the page reports it; the
+        # cleaned, cached form is internal to the built-in page tools.
         self._require("page")
         browser = self._browser.current_browser()
         if browser:
@@ -1131,11 +1330,28 @@ class OctoPluginAPI:
         return response.text[:PLUGIN_FETCH_LIMIT]
 
 
+class CosmeticSurveyBridge(QObject):
+    """Answers a page's cosmetic surveyor with the CSS for its new ids and classes."""
+
+    def __init__(self, browser_window: "OctoBrowse", page: QWebEnginePage) -> None:
+        super().__init__(page)
+        self.browser_window = browser_window
+        self.page = page
+
+    @pyqtSlot(list, result=str)
+    def report(self, keys: list) -> str:
+        return self.browser_window.surveyed_selector_css(self.page.url().toString(), keys)
+
+
 class OctoWebPage(QWebEnginePage):
     def __init__(self, browser_window: "OctoBrowse", profile: QWebEngineProfile, private: bool, parent: QWidget) -> None:
         super().__init__(profile, parent)
         self.browser_window = browser_window
         self.private = private
+        # Only the application world, where the surveyor runs, gets the channel.
+        channel = QWebChannel(self)
+        channel.registerObject("octoSurveyor", CosmeticSurveyBridge(browser_window, self))
+        self.setWebChannel(channel, QWebEngineScript.ScriptWorldId.ApplicationWorld)
 
     def createWindow(self, _window_type: QWebEnginePage.WebWindowType) -> QWebEnginePage:
         view = self.browser_window.add_tab(QUrl("about:blank"), "New Window", private=self.private)
@@ -1417,7 +1633,9 @@ class OctoBrowse(QMainWindow):
         self.vpn_enabled = False
         self.default_user_agent = ""
 
-        self.network_workers: list[ApiFetchWorker] = []
+        self.network_workers: list[QThread] = []
+        self.page_text_cache = PageTextCache()
+        self.page_text_keys = itertools.count(1)
         self.ai_workers: list[OpenAIWorker] = []
         self.speech_workers: list[SpeechWorker] = []
         self.ai_task_metadata: dict[str, dict[str, str]] = {}
@@ -1433,16 +1651,38 @@ class OctoBrowse(QMainWindow):
         self.profile.downloadRequested.connect(
             lambda download: self.handle_download_requested(download, private=False)
         )
+        self.qwebchannel_source = self.read_qwebchannel_source()
         self.request_interceptor = OctoRequestInterceptor(AD_BLOCK_LIST)
         self.request_interceptor.ad_block_enabled = self.ad_block_enabled
         self.request_interceptor.https_only = self.settings.https_only
         self.request_interceptor.gpc_enabled = self.settings.gpc_enabled
         self.request_interceptor.dnt_enabled = self.settings.dnt_enabled
+        self.request_interceptor.rule_quarantined.connect(self.handle_rule_quarantined)
+        set_quarantine_listener(self.request_interceptor.rule_quarantined.emit)
         self.profile.setUrlRequestInterceptor(self.request_interceptor)
         self.install_privacy_script(self.profile)
 
         self.filter_workers: list[FilterParseWorker] = []
         self.filter_list_dir = self.store.directory / "filterlists"
+        self.filter_cache_dir = self.store.directory / "filter-cache"
+        try:
+            # Single-file cache used before lists were cached as segments.
+            (self.store.directory / "filter-rules.cache").unlink(missing_ok=True)
+        except OSError:
+            pass
+        self.filter_segments: dict[str, FilterListSegment] = {}
+        self.filter_subscriptions_path = self.filter_list_dir / SUBSCRIPTION_STATE_FILE
+        self.filter_subscriptions = read_subscriptions(self.filter_subscriptions_path) or {
+            "easylist.txt": Subscription(EASYLIST_URL)
+        }
+        self.subscription_worker: FilterSubscriptionWorker | None = None
+        self.url_blocklist_dir = self.store.directory / URL_BLOCKLIST_DIR
+        self.url_blocklist_worker: UrlBlocklistImportWorker | None = None
+        self.request_interceptor.url_blocklist = load_url_hash_list(self.url_blocklist_dir)
+        self.filter_rule_stats_path = self.store.directory / RULE_STATS_FILE
+        self.filter_rule_stats_enabled, self.filter_rule_stats = read_rule_stats(self.filter_rule_stats_path)
+        # Created by each reload and shut down once its parse finishes.
+        self.filter_parse_pool: ProcessPoolExecutor | None = None
         QTimer.singleShot(0, self.reload_filter_lists)
         QTimer.singleShot(5_000, self.refresh_stale_filter_lists)
 
@@ -1620,8 +1860,11 @@ class OctoBrowse(QMainWindow):
         self._add_menu_action(tools_menu, "Privacy Report", "Show ad-block and privacy state", self.show_privacy_report)
         self._add_menu_action(tools_menu, "Site Permissions", "Review saved per-site permissions", self.open_site_permissions)
         self._add_menu_action(tools_menu, "Site Controls", "Per-site JavaScript and image toggles", self.open_site_controls)
-        self._add_menu_action(tools_menu, "Update EasyList", "Download and apply the EasyList filter list", self.update_easylist)
+        self._add_menu_action(tools_menu, "Update Filter Lists", "Check filter list subscriptions for newer versions", self.update_filter_subscriptions)
+        self._add_menu_action(tools_menu, "Add Filter Subscription...", "Subscribe to an Adblock-format filter list URL", self.add_filter_subscription)
         self._add_menu_action(tools_menu, "Load Filter List...", "Import an Adblock-format filter list file", self.load_filter_list_file)
+        self._add_menu_action(tools_menu, "Import Malicious URL List...", "Block pages listed in a local URL or SHA-256 hash list", self.import_url_blocklist)
+        self._add_menu_action(tools_menu, "Filter Rule Report", "Show which filter rules match and which never do", self.open_filter_rule_report)
         self._add_menu_action(tools_menu, "Hibernate Background Tabs", "Free memory used by background tabs", self.hibernate_background_tabs_now)
         self._add_menu_action(tools_menu, "Mute/Unmute Tab", "Toggle audio for the current tab", self.toggle_mute_current_tab, "Ctrl+M")
         self._add_menu_action(tools_menu, "Feature Audit", "Show implemented feature checklist", self.open_feature_audit)
@@ -1997,8 +2240,10 @@ class OctoBrowse(QMainWindow):
             BrowserCommand("Privacy report", "blocked requests", self.show_privacy_report),
             BrowserCommand("Site permissions", "camera mic location decisions", self.open_site_permissions),
             BrowserCommand("Site controls", "per-site javascript images", self.open_site_controls),
-            BrowserCommand("Update EasyList", "download ad-block filter list", self.update_easylist),
+            BrowserCommand("Update filter lists", "download ad-block filter list subscriptions easylist", self.update_filter_subscriptions),
+            BrowserCommand("Add filter subscription", "subscribe to ad-block filter list url", self.add_filter_subscription),
             BrowserCommand("Load filter list", "import adblock rules file", self.load_filter_list_file),
+            BrowserCommand("Filter rule report", "ad-block rule hits unused rules personal list", self.open_filter_rule_report),
             BrowserCommand("Hibernate background tabs", "free memory now", self.hibernate_background_tabs_now),
             BrowserCommand("Mute tab", "toggle tab audio", self.toggle_mute_current_tab),
             BrowserCommand("Pin tab", "protect from automatic hibernation", self.toggle_pin_current_tab),
@@ -2047,6 +2292,7 @@ class OctoBrowse(QMainWindow):
             "octo:permissions",
             "octo:plugins",
             "octo:settings",
+            "octo:filters",
             "!ddg ",
             "!yt ",
             "!gh ",
@@ -2463,7 +2709,9 @@ li {{ margin: 7px 0; }}
                 "Ad-block interceptor with fast suffix matching and privacy report",
                 "EasyList-compatible filters with resource-type, third-party, and exception semantics",
                 "Cosmetic element-hiding rules injected per page",
-                "Automatic weekly EasyList refresh",
+                "Filter list subscriptions with weekly conditional (ETag/Last-Modified) refresh",
+                "Filter rule hit report with a trimmed personal-list export",
+                "Local malicious-URL hash list checked on every page and frame load",
                 "Per-site content controls (JavaScript and image toggles)",
                 "HTTPS-only mode with automatic page upgrades",
                 "Global Privacy Control through Sec-GPC and navigator.globalPrivacyControl",
@@ -2628,6 +2876,7 @@ code, pre {{
             self.private_profile = QWebEngineProfile(self)
             self.apply_browser_identity(self.private_profile)
             self.install_privacy_script(self.private_profile)
+            self.install_cosmetic_script(self.private_profile)
             self.apply_cookie_policy(self.private_profile)
             self.private_profile.downloadRequested.connect(
                 lambda download: self.handle_download_requested(download, private=True)
@@ -2671,6 +2920,102 @@ code, pre {{
             script.setWorldId(0)
         scripts.insert(script)
 
+    def install_cosmetic_script(self, profile: QWebEngineProfile) -> None:
+        """Register the generic element-hiding scripts that load with each document.
+
+        Unindexed generic selectors are injected at DocumentCreation so they
+        hide ad slots before the page paints them.  Selectors keyed by an id or
+        class wait for the surveyor to report that id or class in the page (see
+        ``surveyed_selector_css``); site-specific rules are added after each
+        navigation.
+        """
+        scripts = profile.scripts()
+        try:
+            for name in ("OctoCosmeticFilters", "OctoCosmeticSurveyor"):
+                for old_script in scripts.findScripts(name):
+                    scripts.remove(old_script)
+        except Exception:
+            pass
+        rules = self.request_interceptor.filter_rules
+        if not self.ad_block_enabled or rules is None:
+            return
+        css = rules.generic_cosmetic_css()
+        sources = []
+        if css:
+            sources.append(
+                (
+                    "OctoCosmeticFilters",
+                    self._cosmetic_style_script("octo-cosmetic-style", css, skip_internal_pages=True),
+                    True,
+                )
+            )
+        if rules.generic_selector_index and self.qwebchannel_source:
+            sources.append(("OctoCosmeticSurveyor", self.qwebchannel_source + COSMETIC_SURVEYOR_SCRIPT, False))
+        for name, source, sub_frames in sources:
+            script = QWebEngineScript()
+            script.setName(name)
+            script.setSourceCode(source)
+            script.setRunsOnSubFrames(sub_frames)
+            script.setInjectionPoint(QWebEngineScript.InjectionPoint.DocumentCreation)
+            try:
+                script.setWorldId(QWebEngineScript.ScriptWorldId.ApplicationWorld)
+            except AttributeError:
+                script.setWorldId(1)
+            scripts.insert(script)
+
+    def surveyed_selector_css(self, url: str, keys: list) -> str:
+        """Return the generic selectors keyed by ids and classes new to a page.
+
+        Called by each page's surveyor as elements appear, in background tabs
+        too, so nothing polls while pages are idle.
+        """
+        rules = self.request_interceptor.filter_rules
+        if not self.ad_block_enabled or rules is None or self.is_internal_url(url):
+            return ""
+        return rules.generic_cosmetic_css_for(key for key in keys if isinstance(key, str))
+
+    @staticmethod
+    def read_qwebchannel_source() -> str:
+        resource = QFile(":/qtwebchannel/qwebchannel.js")
+        if not resource.open(QIODevice.OpenModeFlag.ReadOnly):
+            return ""
+        try:
+            return bytes(resource.readAll()).decode("utf-8")
+        finally:
+            resource.close()
+
+    @staticmethod
+    def _cosmetic_style_script(style_id: str, css: str, skip_internal_pages: bool = False) -> str:
+        # At DocumentCreation there may be no root element yet; wait for one.
+        guard = (
+            'if (["about:", "data:", "octo:"].includes(location.protocol) '
+            f"|| location.hostname === {json.dumps(INTERNAL_HTTPS_HOST)}) return;"
+            if skip_internal_pages
+            else ""
+        )
+        return f"""
+(() => {{
+  {guard}
+  const apply = () => {{
+    const root = document.head || document.documentElement;
+    if (!root) return false;
+    let style = document.getElementById({json.dumps(style_id)});
+    if (!style) {{
+      style = document.createElement("style");
+      style.id = {json.dumps(style_id)};
+      root.appendChild(style);
+    }}
+    style.textContent = {json.dumps(css)};
+    return true;
+  }};
+  if (!apply()) {{
+    new MutationObserver((_records, observer) => {{
+      if (apply()) observer.disconnect();
+    }}).observe(document, {{ childList: true, subtree: true }});
+  }}
+}})();
+"""
+
     def apply_cookie_policy(self, profile: QWebEngineProfile) -> None:
         block_third_party = self.settings.block_third_party_cookies
         profile.cookieStore().setCookieFilter(
@@ -2684,24 +3029,35 @@ code, pre {{
         self.request_interceptor.gpc_enabled = self.settings.gpc_enabled
         self.request_interceptor.dnt_enabled = self.settings.dnt_enabled
         self.install_privacy_script(self.profile)
+        self.install_cosmetic_script(self.profile)
         self.apply_cookie_policy(self.profile)
         if self.private_profile is not None:
             self.install_privacy_script(self.private_profile)
+            self.install_cosmetic_script(self.private_profile)
             self.apply_cookie_policy(self.private_profile)
 
     def reload_filter_lists(self) -> None:
-        """Parse every cached filter list off the UI thread."""
-        texts: list[str] = []
-        if self.filter_list_dir.is_dir():
-            for list_path in sorted(self.filter_list_dir.glob("*.txt")):
-                try:
-                    texts.append(list_path.read_text(encoding="utf-8", errors="replace"))
-                except OSError:
-                    continue
-        if not texts:
+        """Rebuild the active rules off the UI thread; unchanged lists are not reparsed."""
+        list_paths = sorted(self.filter_list_dir.glob("*.txt")) if self.filter_list_dir.is_dir() else []
+        if not list_paths:
             self.request_interceptor.filter_rules = None
+            self.filter_segments = {}
+            self.install_cosmetic_script(self.profile)
+            if self.private_profile is not None:
+                self.install_cosmetic_script(self.private_profile)
             return
-        worker = FilterParseWorker(texts, self)
+        parse_processes = min(8, (os.cpu_count() or 1) - 1)
+        if self.filter_parse_pool is None and parse_processes > 1:
+            # Worker processes start only if a large list actually needs parsing.
+            self.filter_parse_pool = filter_parse_pool(parse_processes)
+        worker = FilterParseWorker(
+            list_paths,
+            dict(self.filter_segments),
+            self,
+            cache_dir=self.filter_cache_dir,
+            pool=self.filter_parse_pool,
+        )
+        worker.progress.connect(self.handle_filter_rules_progress)
         worker.parsed.connect(self.handle_filter_rules_parsed)
         worker.finished.connect(lambda worker=worker: self.cleanup_filter_worker(worker))
         self.filter_workers.append(worker)
@@ -2710,16 +3066,51 @@ code, pre {{
     def cleanup_filter_worker(self, worker: FilterParseWorker) -> None:
         if worker in self.filter_workers:
             self.filter_workers.remove(worker)
+        if not self.filter_workers:
+            self.shutdown_filter_parse_pool()
+
+    def shutdown_filter_parse_pool(self) -> None:
+        if self.filter_parse_pool is not None:
+            self.filter_parse_pool.shutdown(wait=False, cancel_futures=True)
+            self.filter_parse_pool = None
+
+    def is_stale_filter_worker(self, worker: object) -> bool:
+        # A reload started later wins even if an older worker finishes after it.
+        return worker in self.filter_workers and worker is not self.filter_workers[-1]
 
-    def handle_filter_rules_parsed(self, rules: object) -> None:
-        if not isinstance(rules, FilterRuleSet):
+    def handle_filter_rules_progress(self, rules: object) -> None:
+        """Apply a partial rule set while the lists are still being parsed."""
+        if not isinstance(rules, FilterRuleSet) or self.is_stale_filter_worker(self.sender()):
             return
+        # Profile-wide cosmetic scripts are rebuilt once, from the complete set.
+        rules.hit_stats = self.filter_rule_stats if self.filter_rule_stats_enabled else None
         self.request_interceptor.filter_rules = rules
+        self.set_status(f"Loading filter lists: {rules.rule_count} rules active")
+
+    def handle_filter_rules_parsed(self, rules: object, segments: object) -> None:
+        if not isinstance(rules, FilterRuleSet) or not isinstance(segments, list):
+            return
+        if self.is_stale_filter_worker(self.sender()):
+            return
+        self.filter_segments = {segment.name: segment for segment in segments}
+        # The decision cache lives on the rule set, so this single assignment
+        # also retires every decision made against the previous lists.
+        rules.hit_stats = self.filter_rule_stats if self.filter_rule_stats_enabled else None
+        self.request_interceptor.filter_rules = rules
+        self.install_cosmetic_script(self.profile)
+        if self.private_profile is not None:
+            self.install_cosmetic_script(self.private_profile)
+        notes = ""
+        if rules.optimization is not None and rules.optimization.removed_rules:
+            notes = f", {rules.optimization.removed_rules} redundant rules removed"
         self.set_status(
             f"Filter lists loaded: {rules.rule_count} rules "
-            f"({len(rules.blocked_domains)} domains, {rules.skipped_count} unsupported skipped)"
+            f"({len(rules.blocked_domains)} domains, {rules.skipped_count} unsupported skipped{notes})"
         )
 
+    def handle_rule_quarantined(self, text: str) -> None:
+        self.set_status(f"Filter rule quarantined as too slow: {text} (see octo:filters)")
+
     def load_filter_list_file(self) -> None:
         file_path, _ = QFileDialog.getOpenFileName(
             self, "Load Filter List", "", "Filter Lists (*.txt);;All Files (*)"
@@ -2738,22 +3129,226 @@ code, pre {{
         self.reload_filter_lists()
         self.set_status(f"Imported filter list {source.name}")
 
-    def update_easylist(self) -> None:
-        self.set_status("Downloading EasyList...")
-        self.start_api_worker("filterlist", EASYLIST_URL, as_json=False)
+    def import_url_blocklist(self) -> None:
+        if self.url_blocklist_worker is not None:
+            self.set_status("A malicious URL list is already being imported")
+            return
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Import Malicious URL List", "", "URL Lists (*.txt);;All Files (*)"
+        )
+        if not file_path:
+            return
+        self.set_status(f"Importing malicious URL list {Path(file_path).name}...")
+        worker = UrlBlocklistImportWorker(Path(file_path), self.url_blocklist_dir, self)
+        worker.imported.connect(self.handle_url_blocklist_imported)
+        worker.finished.connect(lambda worker=worker: self.cleanup_url_blocklist_worker(worker))
+        self.network_workers.append(worker)
+        self.url_blocklist_worker = worker
+        worker.start()
+
+    def cleanup_url_blocklist_worker(self, worker: UrlBlocklistImportWorker) -> None:
+        if worker in self.network_workers:
+            self.network_workers.remove(worker)
+        if self.url_blocklist_worker is worker:
+            self.url_blocklist_worker = None
+
+    def handle_url_blocklist_imported(self, hashes: object, count: int, error: str) -> None:
+        if not isinstance(hashes, UrlHashList):
+            QMessageBox.critical(
+                self, "Malicious URL List", f"Could not import the list: {error or 'the written file is unreadable'}"
+            )
+            return
+        self.request_interceptor.url_blocklist = hashes
+        self.set_status(f"Malicious URL list imported: {count} entries")
+
+    def update_filter_subscriptions(self) -> None:
+        self.check_filter_subscriptions(list(self.filter_subscriptions))
+
+    def check_filter_subscriptions(self, names: Iterable[str]) -> None:
+        """Check the named subscriptions with conditional requests on a worker thread."""
+        if self.subscription_worker is not None:
+            self.set_status("Filter lists are already being updated")
+            return
+        subscriptions = {
+            name: self.filter_subscriptions[name] for name in names if name in self.filter_subscriptions
+        }
+        if not subscriptions:
+            return
+        self.set_status("Checking filter list subscriptions...")
+        worker = FilterSubscriptionWorker(subscriptions, self.filter_list_dir, self)
+        worker.checked.connect(self.handle_filter_subscriptions_checked)
+        worker.finished.connect(lambda worker=worker: self.cleanup_subscription_worker(worker))
+        self.network_workers.append(worker)
+        self.subscription_worker = worker
+        worker.start()
+
+    def cleanup_subscription_worker(self, worker: FilterSubscriptionWorker) -> None:
+        if worker in self.network_workers:
+            self.network_workers.remove(worker)
+        if self.subscription_worker is worker:
+            self.subscription_worker = None
+
+    def handle_filter_subscriptions_checked(self, results: object, errors: object) -> None:
+        if not isinstance(results, dict) or not isinstance(errors, dict):
+            return
+        for name, result in results.items():
+            if name in self.filter_subscriptions:
+                self.filter_subscriptions[name] = result.subscription
+        write_subscriptions(self.filter_subscriptions_path, self.filter_subscriptions)
+        # A 304 leaves the list file untouched, so there is nothing to reparse.
+        if any(result.changed for result in results.values()):
+            self.reload_filter_lists()
+        self.set_status(subscription_summary(results, errors))
+
+    def add_filter_subscription(self) -> None:
+        url, ok = QInputDialog.getText(self, "Add Filter Subscription", "Filter list URL (http or https):")
+        url = url.strip()
+        if not ok or not url:
+            return
+        if QUrl(url).scheme().lower() not in {"http", "https"}:
+            QMessageBox.warning(self, "Filter Subscription", "Enter an http:// or https:// filter list URL.")
+            return
+        if any(subscription.url == url for subscription in self.filter_subscriptions.values()):
+            self.set_status("Already subscribed to that filter list")
+            return
+        existing = {path.name for path in self.filter_list_dir.glob("*.txt")} if self.filter_list_dir.is_dir() else set()
+        name = subscription_file_name(url, existing | set(self.filter_subscriptions))
+        self.filter_subscriptions[name] = Subscription(url)
+        write_subscriptions(self.filter_subscriptions_path, self.filter_subscriptions)
+        self.check_filter_subscriptions([name])
 
     def refresh_stale_filter_lists(self) -> None:
-        """Re-download EasyList automatically when the cached copy is over a week old."""
-        cache_path = self.filter_list_dir / "easylist.txt"
+        """Check subscriptions that have not been checked for over a week."""
+        due = [
+            name
+            for name, subscription in self.filter_subscriptions.items()
+            if (self.filter_list_dir / name).exists()
+            and subscription_due(subscription, self.filter_list_dir / name, 7 * 86400)
+        ]
+        if due:
+            self.check_filter_subscriptions(due)
+
+    def open_filter_rule_report(self) -> None:
+        """Show hot, never-hit, and regex-heavy filter rules from the hit counters."""
+        rules = self.request_interceptor.filter_rules
+        if rules is None:
+            body = "<p>No filter lists are loaded.</p>"
+        else:
+            report = rule_report(rules, self.filter_rule_stats)
+            hot_rows = "".join(
+                f"<tr><td>{count:,}</td><td><code>{html.escape(text)}</code></td></tr>"
+                for text, count in report.hot_rules
+            ) or "<tr><td colspan='2'>No rule has matched yet.</td></tr>"
+            bucket_rows = "".join(
+                f"<tr><td><code>{html.escape(cost.token or '(generic)')}</code></td><td>{cost.probes:,}</td>"
+                f"<td>{cost.rules:,}</td><td>{cost.regex_rules:,}</td><td>{cost.regex_tests:,}</td></tr>"
+                for cost in report.expensive_buckets
+            ) or "<tr><td colspan='5'>No wildcard rule has been scanned yet.</td></tr>"
+            optimized = ""
+            if rules.optimization is not None:
+                saved = rules.optimization
+                optimized = (
+                    f"<p>Optimizer: {saved.duplicate_rules:,} duplicate, {saved.shadowed_rules:,} host-shadowed, "
+                    f"and {saved.covered_domains:,} subdomain rules plus {saved.duplicate_selectors:,} repeated "
+                    f"selectors removed from the active lists (about {saved.bytes_saved // 1024:,} KiB).</p>"
+                )
+            quarantine_panel = ""
+            quarantined = "\n".join(html.escape(text) for text in rules.quarantined_rules())
+            if quarantined:
+                quarantine_panel = (
+                    "<section class=\"panel\"><h2>Quarantined rules</h2>"
+                    "<p>These wildcard rules overran the per-match time budget several times in a row and are skipped "
+                    f"until the filter lists are next loaded.</p><pre>{quarantined}</pre></section>"
+                )
+            never_hit = "\n".join(html.escape(text) for text in report.never_hit[:500])
+            if len(report.never_hit) > 500:
+                never_hit += f"\n... and {len(report.never_hit) - 500:,} more"
+            body = f"""<p>Network rules: {report.hit_network_rules:,} of {report.network_rules:,} matched at least once.
+Hostname rules: {report.hit_hostname_rules:,} of {report.hostname_rules:,} matched.</p>
+{optimized}
+{quarantine_panel}
+<section class="panel"><h2>Hot rules</h2>
+<table><thead><tr><th>Requests</th><th>Rule</th></tr></thead><tbody>{hot_rows}</tbody></table></section>
+<section class="panel"><h2>Regex-heavy buckets</h2>
+<table><thead><tr><th>Token</th><th>Scans</th><th>Rules</th><th>Wildcard rules</th><th>Worst-case regex tests</th></tr></thead>
+<tbody>{bucket_rows}</tbody></table></section>
+<section class="panel"><h2>Never-hit network rules ({len(report.never_hit):,})</h2>
+<pre>{never_hit}</pre></section>"""
+        state = "on" if self.filter_rule_stats_enabled else "off"
+        report_html = f"""<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Filter Rule Report</title>
+<style>
+body {{ margin: 0; font-family: Segoe UI, Arial, sans-serif; background: #f6f8fb; color: #142033; }}
+main {{ max-width: 1100px; margin: 0 auto; padding: 34px 24px 56px; }}
+h1 {{ margin: 0 0 6px; }}
+.sub {{ color: #64748b; margin-bottom: 20px; }}
+.panel {{ background: #fff; border: 1px solid #dbe3ef; border-radius: 8px; padding: 16px; margin: 14px 0; }}
+table {{ width: 100%; border-collapse: collapse; }}
+th, td {{ border-bottom: 1px solid #e2e8f0; padding: 6px 10px; text-align: left; vertical-align: top; }}
+code, pre {{ white-space: pre-wrap; overflow-wrap: anywhere; }}
+pre {{ max-height: 420px; overflow: auto; background: #eef3f8; border-radius: 6px; padding: 10px; }}
+a {{ color: #0f5dcc; margin-right: 16px; }}
+</style>
+</head>
+<body>
+<main>
+<h1>Filter Rule Report</h1>
+<div class="sub">Rule hit counting is {state}. Counts persist across sessions.</div>
+<p><a href="octo:filters-counting">Turn counting {"off" if self.filter_rule_stats_enabled else "on"}</a>
+<a href="octo:filters-export">Save personal list...</a>
+<a href="octo:filters-reset">Reset counters</a></p>
+{body}
+</main>
+</body>
+</html>"""
+        self.add_html_tab(report_html, "Filter Rule Report", private=False, internal_page="filters")
+
+    def toggle_filter_rule_counting(self) -> None:
+        self.filter_rule_stats_enabled = not self.filter_rule_stats_enabled
+        rules = self.request_interceptor.filter_rules
+        if rules is not None:
+            rules.hit_stats = self.filter_rule_stats if self.filter_rule_stats_enabled else None
+        write_rule_stats(self.filter_rule_stats_path, self.filter_rule_stats, self.filter_rule_stats_enabled)
+        self.open_filter_rule_report()
+
+    def reset_filter_rule_stats(self) -> None:
+        self.filter_rule_stats.hits.clear()
+        self.filter_rule_stats.bucket_probes.clear()
+        write_rule_stats(self.filter_rule_stats_path, self.filter_rule_stats, self.filter_rule_stats_enabled)
+        self.open_filter_rule_report()
+
+    def export_personal_filter_list(self) -> None:
+        """Save the loaded rules that ever matched as a trimmed Adblock-format list."""
+        rules = self.request_interceptor.filter_rules
+        if rules is None or not self.filter_rule_stats.hits:
+            QMessageBox.information(
+                self, "Personal Filter List", "Turn on rule hit counting and browse for a while first."
+            )
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Save Personal Filter List", "personal.txt", "Filter Lists (*.txt);;All Files (*)"
+        )
+        if not file_path:
+            return
         try:
-            if cache_path.exists() and time.time() - cache_path.stat().st_mtime > 7 * 86400:
-                self.update_easylist()
-        except OSError:
-            pass
+            Path(file_path).write_text(personal_filter_list(rules, self.filter_rule_stats), encoding="utf-8")
+        except OSError as exc:
+            QMessageBox.critical(self, "Personal Filter List", f"Could not save the list: {exc}")
+            return
+        self.set_status(f"Saved personal filter list to {file_path}")
 
     def _wire_browser(self, browser: QWebEngineView) -> None:
         """Connections and engine settings shared by every tab."""
         browser.setProperty("last_active", time.time())
+        # Page text is cached per tab until it navigates or finishes a load.
+        text_key = next(self.page_text_keys)
+        browser.setProperty("page_text_key", text_key)
+        browser.urlChanged.connect(lambda _url, key=text_key: self.page_text_cache.invalidate(key))
+        browser.loadFinished.connect(lambda _ok, key=text_key: self.page_text_cache.invalidate(key))
+        browser.destroyed.connect(lambda _object=None, key=text_key: self.page_text_cache.discard(key))
         page = browser.page()
         settings = browser.settings()
         for attr_name, value in (
@@ -3012,6 +3607,10 @@ code, pre {{
             "permissions": self.open_site_permissions,
             "plugins": self.open_plugin_manager,
             "settings": self.open_settings,
+            "filters": self.open_filter_rule_report,
+            "filters-counting": self.toggle_filter_rule_counting,
+            "filters-export": self.export_personal_filter_list,
+            "filters-reset": self.reset_filter_rule_stats,
         }
         action = actions.get(target)
         if action is None:
@@ -3234,14 +3833,39 @@ li {{ margin: 8px 0; }}
             items.append(f'<li><a href="{safe_url}">{label}</a></li>')
         return f"<ul>{''.join(items)}</ul>"
 
+    def with_page_text(self, browser: QWebEngineView, callback: Any) -> None:
+        """Call *callback* with *browser*'s ``PageText``, fetching it only when stale.
+
+        A fetch that completes after the tab was closed or navigated away is
+        dropped rather than cached under the wrong page.
+        """
+        key = browser.property("page_text_key")
+        url = browser.url().toString()
+        private = bool(browser.property("private"))
+        cached = self.page_text_cache.get(key, url, private)
+        if cached is not None:
+            callback(cached)
+            return
+
+        def store(text: str) -> None:
+            try:
+                if browser.url().toString() != url:
+                    return
+            except RuntimeError:
+                return
+            callback(self.page_text_cache.store(key, url, private, text))
+
+        browser.page().toPlainText(store)
+
     def open_reader_view(self) -> None:
         browser = self.current_browser()
         if not browser:
             return
-        browser.page().toPlainText(lambda text: self.show_reader_tab(text, browser.url().toString(), bool(browser.property("private"))))
+        self.with_page_text(
+            browser, lambda page: self.show_reader_tab(page.cleaned, page.url, bool(browser.property("private")))
+        )
 
-    def show_reader_tab(self, text: str, url: str, private: bool) -> None:
-        cleaned = self.clean_page_text(text)
+    def show_reader_tab(self, cleaned: str, url: str, private: bool) -> None:
         if not cleaned:
             QMessageBox.information(self, "Reader View", "There is no readable text on this page.")
             return
@@ -3289,10 +3913,9 @@ p {{ margin: 0 0 20px; }}
         browser = self.current_browser()
         if not browser:
             return
-        browser.page().toPlainText(lambda text: self.display_page_insights(text, browser.url().toString()))
+        self.with_page_text(browser, lambda page: self.display_page_insights(page.cleaned, page.url))
 
-    def display_page_insights(self, text: str, url: str) -> None:
-        cleaned = self.clean_page_text(text)
+    def display_page_insights(self, cleaned: str, url: str) -> None:
         words = cleaned.split()
         minutes = max(1, round(len(words) / 220)) if words else 0
         keywords = ", ".join(self.extract_keywords(cleaned, limit=10)) or "None"
@@ -3305,20 +3928,6 @@ p {{ margin: 0 0 20px; }}
         ]
         QMessageBox.information(self, "Page Insights", "\n".join(lines))
 
-    def clean_page_text(self, text: str) -> str:
-        lines = [line.strip() for line in text.splitlines()]
-        blocks: list[str] = []
-        buffer: list[str] = []
-        for line in lines:
-            if line:
-                buffer.append(line)
-            elif buffer:
-                blocks.append(" ".join(buffer))
-                buffer = []
-        if buffer:
-            blocks.append(" ".join(buffer))
-        return "\n\n".join(blocks)
-
     def extract_keywords(self, text: str, limit: int = 8) -> list[str]:
         stop_words = {
             "about", "after", "again", "also", "because", "before", "between", "could", "every",
@@ -3510,31 +4119,22 @@ p {{ margin: 0 0 20px; }}
         self.inject_cosmetic_filters(browser)
 
     def inject_cosmetic_filters(self, browser: QWebEngineView) -> None:
-        """Apply element-hiding rules from loaded filter lists to the page."""
+        """Add the site-specific element-hiding rules for the loaded page.
+
+        Generic rules are already in place from ``install_cosmetic_script``.
+        """
         if not self.ad_block_enabled:
             return
         rules = self.request_interceptor.filter_rules
-        if rules is None or (not rules.generic_selectors and not rules.domain_selectors):
+        if rules is None or not rules.domain_selectors:
             return
         url = browser.url()
         if self.is_internal_url(url.toString()):
             return
-        css = rules.cosmetic_css_for(url.host().lower())
+        css = rules.site_cosmetic_css(url.host().lower())
         if not css:
             return
-        script = f"""
-(() => {{
-  const id = "octo-cosmetic-style";
-  let style = document.getElementById(id);
-  if (!style) {{
-    style = document.createElement("style");
-    style.id = id;
-    (document.head || document.documentElement).appendChild(style);
-  }}
-  style.textContent = {json.dumps(css)};
-}})();
-"""
-        browser.page().runJavaScript(script)
+        browser.page().runJavaScript(self._cosmetic_style_script("octo-cosmetic-site-style", css))
 
     def toggle_dark_mode(self) -> None:
         self.set_theme("default" if self.dark_mode else "dark")
@@ -3694,7 +4294,7 @@ p {{ margin: 0 0 20px; }}
         browser = self.current_browser()
         if browser and self.confirm_cloud_speech(browser):
             self.set_status("Preparing speech without blocking browsing...")
-            browser.page().toPlainText(lambda text: self.speak_text(text[:1500]))
+            self.with_page_text(browser, lambda page: self.speak_text(page.cleaned[:1500]))
 
     def confirm_cloud_speech(self, browser: QWebEngineView) -> bool:
         """Require explicit consent before private-page text is sent to gTTS."""
@@ -3763,10 +4363,34 @@ p {{ margin: 0 0 20px; }}
             if rules is not None
             else "built-in list only"
         )
+        url_blocklist = self.request_interceptor.url_blocklist
+        url_blocklist_summary = (
+            f"{len(url_blocklist)} entries, "
+            f"{sum(self.request_interceptor.malicious_blocked.values())} page loads blocked this session"
+            if url_blocklist is not None
+            else "none imported"
+        )
+        decision_cache = (
+            f"{rules.decision_cache.hits} hits, {rules.decision_cache.misses} misses "
+            f"({rules.decision_cache.hit_rate():.0%} hit rate)"
+            if rules is not None
+            else "inactive"
+        )
+        if rules is not None:
+            stats = rules.bucket_stats()
+            bucket_summary = (
+                f"{stats['buckets']} buckets (median {stats['p50']}, p99 {stats['p99']}, "
+                f"largest {stats['max']} rules; {stats['generic']} unindexed)"
+            )
+        else:
+            bucket_summary = "inactive"
         lines = [
             f"Ad block: {'on' if self.ad_block_enabled else 'off'}",
             f"Blocked requests this session: {blocked}",
+            f"Malicious URL list: {url_blocklist_summary}",
             f"Filter lists: {filter_summary}",
+            f"Filter decision cache: {decision_cache}",
+            f"Filter token index: {bucket_summary}",
             f"Site content overrides: {len(self.site_content)}",
             f"HTTPS-only mode: {'on' if self.settings.https_only else 'off'}",
             f"HTTPS upgrades this session: {self.request_interceptor.https_upgrades}",
@@ -3789,11 +4413,8 @@ p {{ margin: 0 0 20px; }}
         browser = self.current_browser()
         if browser and self.confirm_cloud_ai(browser):
             title = browser.page().title() or self.tabs.tabText(self.tabs.currentIndex())
-            url = browser.url().toString()
             self.set_status("Preparing cited page summary...")
-            browser.page().toPlainText(
-                lambda text, title=title, url=url: self.generate_summary(text, title, url)
-            )
+            self.with_page_text(browser, lambda page, title=title: self.generate_summary(page, title))
 
     def confirm_cloud_ai(self, browser: QWebEngineView) -> bool:
         """Require explicit consent before private-page text leaves the device."""
@@ -3827,14 +4448,15 @@ p {{ margin: 0 0 20px; }}
         self.save_settings()
         return True
 
-    def generate_summary(self, text: str, title: str, url: str) -> None:
-        chunks = split_page_text(text, title=title, url=url)
+    def generate_summary(self, page: PageText, title: str) -> None:
+        chunks = page.chunks(title)
+        self.page_text_cache.trim()
         if not chunks:
             QMessageBox.information(self, "Summary", "There is no readable text on this page.")
             return
         prompt = build_summary_prompt(chunks)
         self.start_openai_worker(
-            "summary", prompt, max_output_tokens=520, source_url=url, source_title=title
+            "summary", prompt, max_output_tokens=520, source_url=page.url, source_title=title
         )
 
     def open_chatbot(self) -> None:
@@ -3901,26 +4523,26 @@ p {{ margin: 0 0 20px; }}
         browser = self.current_browser()
         if browser and self.confirm_cloud_ai(browser):
             title = browser.page().title() or self.tabs.tabText(self.tabs.currentIndex())
-            url = browser.url().toString()
             output = getattr(self, "page_chat_output", None)
             if output is not None:
                 output.appendPlainText("OctoBrowse: selecting relevant source passages...\n")
-            browser.page().toPlainText(
-                lambda text, query=query, title=title, url=url: self.generate_chatbot_response(
-                    query, text, title, url
-                )
+            self.with_page_text(
+                browser,
+                lambda page, query=query, title=title: self.generate_chatbot_response(query, page, title),
             )
 
-    def generate_chatbot_response(self, query: str, page_text: str, title: str, url: str) -> None:
-        chunks = split_page_text(page_text, title=title, url=url)
-        if not chunks:
+    def generate_chatbot_response(self, query: str, page: PageText, title: str) -> None:
+        # Follow-up questions about an unchanged page reuse its cached chunk index.
+        index = page.index(title)
+        self.page_text_cache.trim()
+        if not len(index):
             output = getattr(self, "page_chat_output", None)
             if output is not None:
                 output.appendPlainText("OctoBrowse: no readable page text was found.\n")
             return
-        prompt = build_qa_prompt(chunks, query)
+        prompt = build_qa_prompt(index.chunks, query, index=index)
         self.start_openai_worker(
-            "chat", prompt, max_output_tokens=640, source_url=url, source_title=title
+            "chat", prompt, max_output_tokens=640, source_url=page.url, source_title=title
         )
 
     def start_openai_worker(
@@ -4101,15 +4723,6 @@ p {{ margin: 0 0 20px; }}
             self.network_workers.remove(worker)
 
     def handle_api_data(self, kind: str, data: object) -> None:
-        if kind == "filterlist" and isinstance(data, str):
-            try:
-                self.filter_list_dir.mkdir(parents=True, exist_ok=True)
-                (self.filter_list_dir / "easylist.txt").write_text(data, encoding="utf-8")
-            except OSError as exc:
-                QMessageBox.warning(self, "EasyList", f"Could not cache EasyList: {exc}")
-                return
-            self.reload_filter_lists()
-            return
         if kind == "weather" and isinstance(data, dict):
             try:
                 temp = data["main"]["temp"]
@@ -4137,8 +4750,6 @@ p {{ margin: 0 0 20px; }}
         elif kind == "news":
             self.news_sidebar.clear()
             self.news_sidebar.addItem(QListWidgetItem("News: Unavailable"))
-        elif kind == "filterlist":
-            self.set_status(f"EasyList download failed: {error}")
 
     def load_news_url(self, item: QListWidgetItem) -> None:
         url = item.data(Qt.ItemDataRole.UserRole)
@@ -5259,13 +5870,20 @@ p {{ margin: 0 0 20px; }}
             QTimer.singleShot(250, self.close)
             return
         self.save_settings()
+        if self.filter_rule_stats_enabled or self.filter_rule_stats.hits:
+            write_rule_stats(self.filter_rule_stats_path, self.filter_rule_stats, self.filter_rule_stats_enabled)
         self.history_db.close()
+        self.shutdown_filter_parse_pool()
+        set_quarantine_listener(None)
         for path in list(self.ephemeral_paths):
             self.cleanup_ephemeral_path(path)
         super().closeEvent(event)
 
 
 def main() -> int:
+    # Filter parse workers are spawned processes; frozen builds must hand
+    # them off here before any Qt startup.
+    multiprocessing.freeze_support()
     if "--version" in sys.argv:
         print(f"OctoBrowse {OCTO_BROWSER_VERSION}")
         return 0
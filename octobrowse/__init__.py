@@ -5,6 +5,7 @@ from .ai_context import (
     DEFAULT_CHUNK_OVERLAP,
     DEFAULT_CONTEXT_CHAR_BUDGET,
     MAX_CONTEXT_CHAR_BUDGET,
+    ChunkIndex,
     ResponsesPrompt,
     SourceChunk,
     build_qa_prompt,
@@ -23,6 +24,7 @@ __all__ = [
     "DEFAULT_CHUNK_OVERLAP",
     "DEFAULT_CONTEXT_CHAR_BUDGET",
     "MAX_CONTEXT_CHAR_BUDGET",
+    "ChunkIndex",
     "ResponsesPrompt",
     "SourceChunk",
     "build_qa_prompt",
@@ -7,11 +7,16 @@ and ``input`` keyword arguments accepted by ``client.responses.create``.
 
 from __future__ import annotations
 
+import heapq
 import html
+import math
 import re
 import unicodedata
+from bisect import bisect_right
 from collections import Counter
 from dataclasses import dataclass, replace
+from functools import lru_cache
+from itertools import accumulate
 from typing import Literal, Sequence, TypedDict
 
 
@@ -24,7 +29,17 @@ DEFAULT_MAX_CHUNKS = 8
 _MIN_CHUNK_CHARS = 256
 _MIN_CONTEXT_CHAR_BUDGET = 512
 _TOKEN_RE = re.compile(r"[^\W_]+(?:['\u2019][^\W_]+)?", re.UNICODE)
-_WHITESPACE_RE = re.compile(r"[^\S\n]+")
+_PARAGRAPH_BREAK_RE = re.compile(r"\n\n+")
+# Control (Cc) and format (Cf) characters other than newline and tab.
+_ASCII_CONTROLS = {code: None for code in (*range(0x00, 0x09), *range(0x0B, 0x20), 0x7F)}
+# Tab is the only ASCII whitespace besides space and newline left after them.
+_ASCII_CLEANING = {**_ASCII_CONTROLS, 0x09: " "}
+_TRUNCATION_SUFFIX = "\n[truncated]"
+# Okapi BM25 parameters; the weight puts a rare term's text score near the
+# old capped ``3 * count`` so title, URL, and phrase boosts keep their pull.
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_BM25_TEXT_WEIGHT = 6.0
 
 _STOP_WORDS = frozenset(
     {
@@ -85,6 +100,112 @@ class SourceChunk:
         return f"[S{self.source_id}]"
 
 
+class ChunkIndex:
+    """Chunks of one page tokenized once and ranked against questions with BM25.
+
+    Text terms are scored with Okapi BM25 over the indexed chunks and combined
+    with the title, URL, term-coverage, and exact-phrase boosts of
+    ``lexical_relevance_score``. A question only visits the postings of its own
+    terms, so follow-up questions about the same page do not re-tokenize it.
+    """
+
+    __slots__ = ("chunks", "_postings", "_length_norms", "_phrase_texts", "_fields", "_field_keys")
+
+    def __init__(self, chunks: Sequence[SourceChunk]) -> None:
+        self.chunks = _deduplicate_chunks(chunks)
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._phrase_texts: list[str] = []
+        self._fields: dict[tuple[str, str], tuple[Counter[str], Counter[str], str]] = {}
+        self._field_keys: list[tuple[str, str]] = []
+        lengths: list[int] = []
+        for position, chunk in enumerate(self.chunks):
+            tokens = _tokenize(chunk.text)
+            for term, count in Counter(tokens).items():
+                self._postings.setdefault(term, []).append((position, count))
+            lengths.append(len(tokens))
+            # Padded so a phrase only matches on whole tokens.
+            self._phrase_texts.append(f" {' '.join(tokens)} ")
+            key = (chunk.title, chunk.url)
+            if key not in self._fields:
+                # Every chunk of a page shares its title and URL: tokenize them once.
+                title_tokens = _tokenize(chunk.title)
+                self._fields[key] = (
+                    Counter(title_tokens),
+                    Counter(_tokenize(chunk.url)),
+                    f" {' '.join(title_tokens)} ",
+                )
+            self._field_keys.append(key)
+        average = sum(lengths) / len(lengths) if lengths else 0.0
+        self._length_norms = [
+            _BM25_K1 * (1 - _BM25_B + _BM25_B * length / average) if average else _BM25_K1
+            for length in lengths
+        ]
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def scores(self, query: str) -> list[float]:
+        """Return the relevance of every chunk to *query*, in ``chunks`` order."""
+
+        query_terms = _meaningful_terms(query)
+        if not query_terms:
+            return [0.0] * len(self.chunks)
+        phrase = " ".join(_tokenize(query))
+        padded_phrase = f" {phrase} " if len(phrase) >= 4 else None
+
+        field_scores: dict[tuple[str, str], tuple[float, frozenset[str]]] = {}
+        for key, (title_terms, url_terms, title_text) in self._fields.items():
+            field_score = 0.0
+            for term in query_terms:
+                field_score += min(title_terms.get(term, 0), 3) * 9 + min(url_terms.get(term, 0), 3) * 5
+            if padded_phrase is not None and padded_phrase in title_text:
+                field_score += 36
+            matched = frozenset(term for term in query_terms if term in title_terms or term in url_terms)
+            field_scores[key] = (field_score, matched)
+        # Chunks without a text match score on their title and URL alone.
+        field_only = {
+            key: _coverage_score(field_score, len(matched), len(query_terms))
+            for key, (field_score, matched) in field_scores.items()
+        }
+        scores = [field_only[key] for key in self._field_keys]
+
+        document_count = len(self.chunks)
+        text_scores: dict[int, float] = {}
+        text_matches: dict[int, list[str]] = {}
+        for term in query_terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            frequency = len(postings)
+            idf = math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+            for position, count in postings:
+                text_scores[position] = text_scores.get(position, 0.0) + idf * count * (_BM25_K1 + 1) / (
+                    count + self._length_norms[position]
+                )
+                text_matches.setdefault(position, []).append(term)
+
+        for position, text_score in text_scores.items():
+            field_score, field_matched = field_scores[self._field_keys[position]]
+            matched = len(field_matched.union(text_matches[position]))
+            score = _coverage_score(field_score + _BM25_TEXT_WEIGHT * text_score, matched, len(query_terms))
+            # A phrase can only occur where all of its meaningful terms do.
+            if (
+                matched == len(query_terms)
+                and padded_phrase is not None
+                and padded_phrase in self._phrase_texts[position]
+            ):
+                score += 24
+            scores[position] = score
+        return scores
+
+    def rank(self, query: str) -> list[SourceChunk]:
+        """Return the chunks from most to least relevant, ties in source order."""
+
+        scores = self.scores(query)
+        order = sorted(range(len(self.chunks)), key=lambda position: (-scores[position], position))
+        return [self.chunks[position] for position in order]
+
+
 class ResponsesPrompt(TypedDict):
     """Keyword arguments for the Responses API text input surface."""
 
@@ -100,25 +221,27 @@ def clean_page_text(text: str) -> str:
     adjacent non-empty lines are joined into readable paragraphs.
     """
 
-    normalized = unicodedata.normalize("NFKC", str(text)).replace("\r\n", "\n").replace("\r", "\n")
-    normalized = "".join(
-        character
-        for character in normalized
-        if character in {"\n", "\t"} or unicodedata.category(character) not in {"Cc", "Cf"}
-    )
-
-    paragraphs: list[str] = []
-    current_lines: list[str] = []
-    for raw_line in normalized.split("\n"):
-        line = _WHITESPACE_RE.sub(" ", raw_line).strip()
-        if line:
-            current_lines.append(line)
-        elif current_lines:
-            paragraphs.append(" ".join(current_lines))
-            current_lines = []
-    if current_lines:
-        paragraphs.append(" ".join(current_lines))
-    return "\n\n".join(paragraphs)
+    text = str(text)
+    if text.isascii():
+        # ASCII text is already in NFKC form.
+        normalized = text.replace("\r\n", "\n").replace("\r", "\n").translate(_ASCII_CLEANING)
+    else:
+        normalized = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+        # Pages use few distinct characters; only those present are removed or replaced.
+        characters = set(normalized)
+        normalized = _remove_controls(normalized, characters)
+        for character in characters:
+            if character not in " \n" and character.isspace() and not _is_control(character):
+                normalized = normalized.replace(character, " ")
+    while "  " in normalized:
+        normalized = normalized.replace("  ", " ")
+
+    # Whitespace within lines is now single spaces, so trimming a line
+    # removes at most one space from each end.
+    folded = normalized.replace(" \n", "\n").replace("\n ", "\n").strip(" \n")
+    # Blank lines separate paragraphs and other line breaks join lines. NUL
+    # marks paragraph breaks meanwhile; it was removed with the controls.
+    return _PARAGRAPH_BREAK_RE.sub("\0", folded).replace("\n", " ").replace("\0", "\n\n")
 
 
 def split_page_text(
@@ -129,12 +252,14 @@ def split_page_text(
     max_chunk_chars: int = DEFAULT_CHUNK_CHARS,
     overlap_chars: int = DEFAULT_CHUNK_OVERLAP,
     start_source_id: int = 1,
+    pre_cleaned: bool = False,
 ) -> list[SourceChunk]:
     """Split page text into bounded, overlapping, source-labelled chunks.
 
     Breaks prefer paragraph, sentence, and word boundaries in that order.
     ``start_source_id`` allows callers to concatenate chunks from several pages
-    without duplicate citation labels.
+    without duplicate citation labels. Pass ``pre_cleaned=True`` when *text*
+    is already the output of ``clean_page_text``.
     """
 
     if max_chunk_chars < _MIN_CHUNK_CHARS:
@@ -144,7 +269,7 @@ def split_page_text(
     if start_source_id < 1:
         raise ValueError("start_source_id must be a positive integer")
 
-    cleaned = clean_page_text(text)
+    cleaned = text if pre_cleaned else clean_page_text(text)
     if not cleaned:
         return []
 
@@ -220,13 +345,15 @@ def select_context_chunks(
     query: str = "",
     max_context_chars: int = DEFAULT_CONTEXT_CHAR_BUDGET,
     max_chunks: int = DEFAULT_MAX_CHUNKS,
+    index: ChunkIndex | None = None,
 ) -> list[SourceChunk]:
     """Select chunks within a rendered character budget.
 
-    Q&A selection ranks chunks with ``lexical_relevance_score``. Summary
-    selection instead uses farthest-point sampling so the beginning, end, and
-    middle of long pages receive broad coverage. Returned chunks retain their
-    original labels and are ordered by source ID for readable context.
+    Q&A selection ranks chunks with a ``ChunkIndex``; pass *index*, built from
+    the same chunks, to reuse one across questions. Summary selection instead
+    uses farthest-point sampling so the beginning, end, and middle of long
+    pages receive broad coverage. Returned chunks retain their original labels
+    and are ordered by source ID for readable context.
     """
 
     _validate_context_budget(max_context_chars)
@@ -238,13 +365,12 @@ def select_context_chunks(
         raise ValueError("query is required for Q&A context selection")
 
     unique_chunks = _deduplicate_chunks(chunks)
+    if index is not None and index.chunks != unique_chunks:
+        raise ValueError("index was built from different chunks")
     if mode == "summary":
         candidate_order = _broad_coverage_order(unique_chunks)
     else:
-        candidate_order = sorted(
-            unique_chunks,
-            key=lambda chunk: (-lexical_relevance_score(chunk, query), chunk.source_id),
-        )
+        candidate_order = (index or ChunkIndex(unique_chunks)).rank(query)
 
     selected: list[SourceChunk] = []
     used = 0
@@ -256,9 +382,10 @@ def select_context_chunks(
         fitted = _fit_chunk_to_budget(chunk, remaining)
         if fitted is None:
             continue
-        selected.append(fitted)
-        used += separator_cost + len(delimit_untrusted_content(fitted))
-        if fitted.text != chunk.text:
+        fitted_chunk, rendered_length = fitted
+        selected.append(fitted_chunk)
+        used += separator_cost + rendered_length
+        if fitted_chunk.text != chunk.text:
             break
 
     return sorted(selected, key=lambda chunk: chunk.source_id)
@@ -267,12 +394,7 @@ def select_context_chunks(
 def escape_untrusted_content(value: str) -> str:
     """Escape page-controlled text so it cannot close prompt delimiters."""
 
-    safe_value = "".join(
-        character
-        for character in str(value)
-        if character in {"\n", "\t"} or unicodedata.category(character) not in {"Cc", "Cf"}
-    )
-    return html.escape(safe_value, quote=True)
+    return html.escape(_remove_controls(str(value)), quote=True)
 
 
 def delimit_untrusted_content(chunk: SourceChunk) -> str:
@@ -296,6 +418,7 @@ def build_responses_prompt(
     question: str = "",
     max_context_chars: int = DEFAULT_CONTEXT_CHAR_BUDGET,
     max_chunks: int = DEFAULT_MAX_CHUNKS,
+    index: ChunkIndex | None = None,
 ) -> ResponsesPrompt:
     """Build Responses API ``instructions`` and ``input`` for page research.
 
@@ -315,6 +438,7 @@ def build_responses_prompt(
         query=question,
         max_context_chars=max_context_chars,
         max_chunks=max_chunks,
+        index=index,
     )
     if not selected:
         raise ValueError("at least one non-empty source chunk is required")
@@ -362,6 +486,7 @@ def build_qa_prompt(
     *,
     max_context_chars: int = DEFAULT_CONTEXT_CHAR_BUDGET,
     max_chunks: int = DEFAULT_MAX_CHUNKS,
+    index: ChunkIndex | None = None,
 ) -> ResponsesPrompt:
     """Build a cited page-question-answering prompt for ``responses.create``."""
 
@@ -371,6 +496,7 @@ def build_qa_prompt(
         question=question,
         max_context_chars=max_context_chars,
         max_chunks=max_chunks,
+        index=index,
     )
 
 
@@ -387,6 +513,28 @@ def _base_instructions(task: Literal["summary", "qa"]) -> str:
     )
 
 
+def _remove_controls(text: str, characters: set[str] | None = None) -> str:
+    """Drop control and format characters, keeping newlines and tabs.
+
+    *characters*, the distinct characters of *text*, may be passed when the
+    caller already has them.
+    """
+
+    if text.isascii():
+        return text.translate(_ASCII_CONTROLS)
+    # str.translate leaves its fast path on non-ASCII text; deleting just the
+    # controls present is several times faster.
+    controls = [character for character in characters or set(text) if _is_control(character)]
+    if not controls:
+        return text
+    return re.sub(f"[{''.join(map(re.escape, controls))}]+", "", text)
+
+
+@lru_cache(maxsize=8_192)
+def _is_control(character: str) -> bool:
+    return character not in "\n\t" and unicodedata.category(character) in {"Cc", "Cf"}
+
+
 def _preferred_break(text: str, start: int, hard_end: int) -> int:
     minimum = start + max(_MIN_CHUNK_CHARS // 2, int((hard_end - start) * 0.55))
     window = text[start:hard_end]
@@ -409,6 +557,13 @@ def _meaningful_terms(query: str) -> tuple[str, ...]:
     return tuple(dict.fromkeys(chosen))
 
 
+def _coverage_score(score: float, matched: int, term_count: int) -> float:
+    score += matched * 12
+    if matched == term_count:
+        score += 24
+    return score
+
+
 def _validate_context_budget(max_context_chars: int) -> None:
     if not _MIN_CONTEXT_CHAR_BUDGET <= max_context_chars <= MAX_CONTEXT_CHAR_BUDGET:
         raise ValueError(
@@ -427,46 +582,61 @@ def _deduplicate_chunks(chunks: Sequence[SourceChunk]) -> list[SourceChunk]:
 
 
 def _broad_coverage_order(chunks: Sequence[SourceChunk]) -> list[SourceChunk]:
-    """Return beginning/end/midpoint-first order via farthest-point sampling."""
+    """Return beginning/end/midpoint-first order via farthest-point sampling.
+
+    The farthest unchosen index always sits at the midpoint of the widest gap
+    between chosen neighbours (the lower midpoint for an odd gap), so gaps are
+    kept in a heap keyed by ``(-distance, midpoint)``. That reproduces the
+    largest-distance, lowest-index choice in O(n log n).
+    """
 
     if len(chunks) < 2:
         return list(chunks)
-    chosen_indices = [0, len(chunks) - 1]
     order = [chunks[0], chunks[-1]]
-    while len(order) < len(chunks):
-        candidates = [index for index in range(len(chunks)) if index not in chosen_indices]
-        next_index = max(
-            candidates,
-            key=lambda index: (min(abs(index - chosen) for chosen in chosen_indices), -index),
-        )
-        chosen_indices.append(next_index)
-        order.append(chunks[next_index])
+    gaps: list[tuple[int, int, int, int]] = []
+
+    def push_gap(low: int, high: int) -> None:
+        if high - low >= 2:
+            half = (high - low) // 2
+            heapq.heappush(gaps, (-half, low + half, low, high))
+
+    push_gap(0, len(chunks) - 1)
+    while gaps:
+        _distance, midpoint, low, high = heapq.heappop(gaps)
+        order.append(chunks[midpoint])
+        push_gap(low, midpoint)
+        push_gap(midpoint, high)
     return order
 
 
-def _fit_chunk_to_budget(chunk: SourceChunk, budget: int) -> SourceChunk | None:
+def _fit_chunk_to_budget(chunk: SourceChunk, budget: int) -> tuple[SourceChunk, int] | None:
+    """Return *chunk*, or its longest truncation that fits *budget*, and its rendered length.
+
+    Escaping works character by character, so the rendered length of any
+    truncation is the empty frame plus a prefix sum of escaped character
+    widths, and the cut point is a single bisection of those sums.
+    """
+
     if budget <= 0:
         return None
-    rendered = delimit_untrusted_content(chunk)
-    if len(rendered) <= budget:
-        return chunk
-
-    empty = replace(chunk, text="")
-    if len(delimit_untrusted_content(empty)) > budget:
+    frame = len(delimit_untrusted_content(replace(chunk, text="")))
+    if frame > budget:
         return None
+    escaped = list(accumulate(map(_escaped_width, chunk.text), initial=0))
+    if frame + escaped[-1] <= budget:
+        return chunk, frame + escaped[-1]
+
+    allowance = budget - frame - len(_TRUNCATION_SUFFIX)
+    if allowance < 0:
+        return replace(chunk, text=""), frame
+    # The longest prefix whose escaped form fits; rstrip() only shortens it.
+    kept = chunk.text[: bisect_right(escaped, allowance) - 1].rstrip()
+    return (
+        replace(chunk, text=kept + _TRUNCATION_SUFFIX),
+        frame + escaped[len(kept)] + len(_TRUNCATION_SUFFIX),
+    )
+
 
-    suffix = "\n[truncated]"
-    low, high = 0, len(chunk.text)
-    best = empty
-    while low <= high:
-        midpoint = (low + high) // 2
-        candidate_text = chunk.text[:midpoint].rstrip()
-        if midpoint < len(chunk.text):
-            candidate_text += suffix
-        candidate = replace(chunk, text=candidate_text)
-        if len(delimit_untrusted_content(candidate)) <= budget:
-            best = candidate
-            low = midpoint + 1
-        else:
-            high = midpoint - 1
-    return best
+@lru_cache(maxsize=4_096)
+def _escaped_width(character: str) -> int:
+    return len(escape_untrusted_content(character))
@@ -0,0 +1,380 @@
+"""Versioned, memory-mapped cache of parsed filter rulesets.
+
+Parsing EasyList-sized lists is dominated by ABP grammar handling.  After a
+successful parse the rule set is written as a small binary header followed by
+a ``marshal`` payload of plain builtins, keyed by the SHA-256 of every list it
+was built from.  On the next start the file is memory-mapped, validated, and
+restored without touching the ABP parser.  Any mismatch or corruption simply
+reports a miss so callers fall back to parsing.  Caches written by another
+``CACHE_FORMAT_VERSION`` are deleted on the first load after an upgrade.
+
+Each filter list is cached as its own segment, tagged with the hash of its
+text, so refreshing one list reparses only that list and the active rule set
+is rebuilt with ``FilterRuleSet.merge``.  The pattern lines of large
+reparses can be sharded across a process pool; the hostname pass and the
+unmarshalling, merging and optimizing of the results stay in the calling
+process.
+
+``stream_filter_rules`` reads changed lists from disk in growing batches and
+yields progressively larger rule sets along the way, so blocking starts long
+before a large list is fully parsed and no list is ever held as one string.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import marshal
+import mmap
+import struct
+import sys
+import zlib
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Literal, Mapping, Sequence
+
+from .filtering import FilterRuleSet
+
+
+CACHE_FORMAT_VERSION = 10
+# Lists are parsed in shards of about this many characters on a process pool,
+# but only when a reload has at least PARALLEL_MIN_CHARS of text to parse.
+PARALLEL_SHARD_CHARS = 512 * 1024
+PARALLEL_MIN_CHARS = 256 * 1024
+# Streamed lists read at most this many shards ahead of the pool's results.
+PARALLEL_SHARDS_IN_FLIGHT = 16
+# Streamed lists are parsed in batches starting at this many lines and growing
+# by this factor after every published snapshot, so a list of n lines is
+# published O(log n) times and re-indexed about 1.3 times in total.
+STREAM_FIRST_BATCH_LINES = 4096
+STREAM_BATCH_GROWTH = 4
+STREAM_READ_CHARS = 1024 * 1024
+
+_MAGIC = b"OCTORULE"
+# magic, format version, marshal version, cache key, payload length, the two
+# domain-index section lengths, CRC-32 of everything after the header
+_HEADER = struct.Struct("<8sHH32sQQQI")
+# Domain indexes follow the marshal payload as raw, 8-byte aligned sections so
+# they are probed straight from the mapping instead of being copied.
+_DOMAIN_SECTIONS = ("blocked_domains", "exception_domains")
+
+
+def ruleset_cache_key(texts: Iterable[str]) -> bytes:
+    """Return the cache key for an ordered sequence of filter-list texts.
+
+    The key covers each list's content hash, the cache format, and the running
+    interpreter so a Python upgrade never reads an incompatible payload.
+    """
+    return _combined_key(hashlib.sha256(text.encode("utf-8", errors="replace")).digest() for text in texts)
+
+
+def filter_list_key(path: Path) -> bytes:
+    """Return ``ruleset_cache_key`` of the list at *path*, reading it in chunks.
+
+    The file is decoded exactly like ``Path.read_text(errors="replace")``, so
+    the key matches the one for the list's full text.
+    """
+    digest = hashlib.sha256()
+    with path.open(encoding="utf-8", errors="replace") as handle:
+        while chunk := handle.read(STREAM_READ_CHARS):
+            digest.update(chunk.encode("utf-8", errors="replace"))
+    return _combined_key([digest.digest()])
+
+
+def _combined_key(text_digests: Iterable[bytes]) -> bytes:
+    digest = hashlib.sha256()
+    digest.update(f"{CACHE_FORMAT_VERSION}:{sys.implementation.cache_tag}".encode())
+    for text_digest in text_digests:
+        digest.update(text_digest)
+    return digest.digest()
+
+
+def _padding(length: int) -> int:
+    return -length % 8
+
+
+def write_ruleset_cache(path: Path, key: bytes, rules: FilterRuleSet) -> bool:
+    """Atomically write *rules* to *path*; return ``False`` on I/O failure."""
+    state = rules.to_state()
+    sections = [state.pop(name) for name in _DOMAIN_SECTIONS]
+    payload = marshal.dumps(state)
+    chunks = [payload, bytes(_padding(len(payload)))]
+    for section in sections:
+        chunks += [section, bytes(_padding(len(section)))]
+    crc = 0
+    for chunk in chunks:
+        crc = zlib.crc32(chunk, crc)
+    header = _HEADER.pack(
+        _MAGIC,
+        CACHE_FORMAT_VERSION,
+        marshal.version,
+        key,
+        len(payload),
+        *(len(section) for section in sections),
+        crc,
+    )
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("wb") as handle:
+            handle.write(header)
+            handle.writelines(chunks)
+        tmp_path.replace(path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def read_ruleset_cache(path: Path, key: bytes) -> FilterRuleSet | None:
+    """Return the cached rule set for *key*, or ``None`` if stale or corrupt.
+
+    The returned rule set's domain indexes keep using the mapping, which is
+    released when the rule set is garbage collected.
+    """
+    try:
+        with path.open("rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) < _HEADER.size:
+            return None
+        magic, version, marshal_version, cached_key, length, *section_lengths, crc = (
+            _HEADER.unpack_from(mapped)
+        )
+        offsets = [_HEADER.size, _HEADER.size + length + _padding(length)]
+        for section_length in section_lengths:
+            offsets.append(offsets[-1] + section_length + _padding(section_length))
+        if (
+            magic != _MAGIC
+            or version != CACHE_FORMAT_VERSION
+            or marshal_version != marshal.version
+            or cached_key != key
+            or len(mapped) != offsets[-1]
+        ):
+            return None
+        view = memoryview(mapped)
+        if zlib.crc32(view[_HEADER.size :]) != crc:
+            return None
+        state = marshal.loads(view[_HEADER.size : _HEADER.size + length])
+        for name, start, section_length in zip(_DOMAIN_SECTIONS, offsets[1:], section_lengths):
+            state[name] = view[start : start + section_length]
+        return FilterRuleSet.from_state(state)
+    except (OSError, ValueError, EOFError, TypeError, KeyError):
+        return None
+
+
+@dataclass(frozen=True)
+class FilterListSegment:
+    """One filter list's parsed rules, tagged with the hash of its text."""
+
+    name: str
+    digest: bytes
+    rules: FilterRuleSet
+
+
+def read_filter_shards(path: Path, shard_chars: int = PARALLEL_SHARD_CHARS) -> Iterator[str]:
+    """Yield line-aligned shards of roughly *shard_chars* characters from *path*."""
+    with path.open(encoding="utf-8", errors="replace") as handle:
+        lines: list[str] = []
+        size = 0
+        for line in handle:
+            lines.append(line)
+            size += len(line)
+            if size >= shard_chars:
+                yield "".join(lines)
+                lines, size = [], 0
+        if lines:
+            yield "".join(lines)
+
+
+def parse_filter_state(text: str, section: Literal["all", "domains", "patterns"] = "all") -> bytes:
+    """Parse one list or shard in a worker process into a ``marshal`` payload."""
+    rules = FilterRuleSet()
+    rules.parse_lines(text.splitlines(), section)
+    return marshal.dumps(rules.to_state())
+
+
+def stream_filter_rules(
+    paths: Sequence[Path],
+    previous: Mapping[str, FilterListSegment] | None = None,
+    cache_dir: Path | None = None,
+    executor: Executor | None = None,
+    first_batch_lines: int = STREAM_FIRST_BATCH_LINES,
+) -> Iterator[tuple[FilterRuleSet, list[FilterListSegment] | None]]:
+    """Load the lists at *paths*, parsing only changed ones, yielding as rules arrive.
+
+    Every item is ``(rules, segments)``: a finished, immutable rule set that is
+    safe to publish while loading continues.  ``segments`` is ``None`` until the
+    last item, which is the complete result with one segment per readable list
+    (segments are named after the file).  When any list must be parsed,
+    snapshots grow in this order:
+
+    1. unchanged and cached lists, plus the hostname rules of every changed
+       list from a quick ``section="domains"`` pass;
+    2. the remaining rules of the changed lists, streamed in batches that
+       grow by ``STREAM_BATCH_GROWTH``, or in shards parsed on *executor*
+       once there is at least ``PARALLEL_MIN_CHARS`` to parse.  Batches
+       that add no rules, such as the rest of a hosts file, publish nothing.
+
+    Lists with nothing but hostname rules are not read a second time.
+    Lists that cannot be read, including ones removed or locked partway
+    through loading, are skipped.  Only the complete result is passed through
+    ``FilterRuleSet.optimize``; cached segments keep every rule of their list.
+    """
+    previous = previous or {}
+    if cache_dir is not None:
+        _remove_outdated_caches(cache_dir)
+    segments: list[FilterListSegment | None] = []
+    misses: list[tuple[int, Path, bytes]] = []
+    for path in paths:
+        try:
+            digest = filter_list_key(path)
+        except OSError:
+            continue
+        segment = _reusable_segment(path.name, digest, previous, cache_dir)
+        if segment is None:
+            misses.append((len(segments), path, digest))
+        segments.append(segment)
+    if misses:
+        ready = [segment.rules for segment in segments if segment is not None]
+        hostnames: list[FilterRuleSet] = []
+        patterns: list[Path] = []
+        readable: list[tuple[int, Path, bytes]] = []
+        for miss in misses:
+            rules = FilterRuleSet()
+            try:
+                with miss[1].open(encoding="utf-8", errors="replace") as handle:
+                    if rules.parse_lines(handle, section="domains"):
+                        patterns.append(miss[1])
+            except OSError:
+                continue
+            readable.append(miss)
+            hostnames.append(rules)
+        yield FilterRuleSet.merge([*ready, *hostnames]), None
+        if sum(_file_size(path) for path in patterns) < PARALLEL_MIN_CHARS:
+            executor = None
+        for position, (index, path, digest) in enumerate(readable):
+            parts = [hostnames[position]]
+            if path in patterns:
+                stream = _stream_list_parts(path, hostnames[position], executor, first_batch_lines)
+                try:
+                    for parts, complete in stream:
+                        if not complete:
+                            yield FilterRuleSet.merge([*ready, *parts, *hostnames[position + 1 :]]), None
+                except OSError:
+                    continue
+            rules = parts[0] if len(parts) == 1 else FilterRuleSet.merge(parts)
+            segments[index] = _store_segment(path.name, digest, rules, cache_dir)
+            ready.append(rules)
+    loaded = [segment for segment in segments if segment is not None]
+    merged = FilterRuleSet.merge(segment.rules for segment in loaded)
+    merged.optimize()
+    yield merged, loaded
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _stream_list_parts(
+    path: Path, rules: FilterRuleSet, executor: Executor | None, first_batch_lines: int
+) -> Iterator[tuple[list[FilterRuleSet], bool]]:
+    # Adds the patterns of *path* to its hostname *rules*, yielding the parts
+    # parsed so far and whether they make up the whole list.
+    if executor is not None:
+        yield from _stream_list_shards(path, rules, executor)
+        return
+    batch_lines = max(1, first_batch_lines)
+    published = rules.rule_count + rules.cosmetic_count
+    with path.open(encoding="utf-8", errors="replace") as handle:
+        lines = list(islice(handle, batch_lines))
+        while lines:
+            rules.parse_lines(lines, section="patterns")
+            batch_lines *= STREAM_BATCH_GROWTH
+            lines = list(islice(handle, batch_lines))
+            if lines and rules.rule_count + rules.cosmetic_count > published:
+                published = rules.rule_count + rules.cosmetic_count
+                yield [rules], False
+    rules.finalize()
+    yield [rules], True
+
+
+def _stream_list_shards(
+    path: Path, rules: FilterRuleSet, executor: Executor
+) -> Iterator[tuple[list[FilterRuleSet], bool]]:
+    # Results are taken in file order, so publication never depends on which
+    # worker finishes first.
+    pending: deque[Future[bytes]] = deque()
+    parts = [rules]
+    for shard in read_filter_shards(path, PARALLEL_SHARD_CHARS):
+        pending.append(executor.submit(parse_filter_state, shard, "patterns"))
+        if len(pending) >= PARALLEL_SHARDS_IN_FLIGHT:
+            parts.append(FilterRuleSet.from_state(marshal.loads(pending.popleft().result())))
+            yield parts, False
+    while pending:
+        parts.append(FilterRuleSet.from_state(marshal.loads(pending.popleft().result())))
+        yield parts, not pending
+    if len(parts) == 1:
+        yield parts, True
+
+
+def _reusable_segment(
+    name: str, digest: bytes, previous: Mapping[str, FilterListSegment], cache_dir: Path | None
+) -> FilterListSegment | None:
+    prior = previous.get(name)
+    if prior is not None and prior.digest == digest:
+        return prior
+    rules = read_ruleset_cache(_segment_cache_path(cache_dir, name, digest), digest) if cache_dir else None
+    return None if rules is None else FilterListSegment(name, digest, rules)
+
+
+def _store_segment(name: str, digest: bytes, rules: FilterRuleSet, cache_dir: Path | None) -> FilterListSegment:
+    if cache_dir is not None:
+        cache_path = _segment_cache_path(cache_dir, name, digest)
+        if write_ruleset_cache(cache_path, digest, rules):
+            _remove_stale_segment_caches(cache_path)
+    return FilterListSegment(name, digest, rules)
+
+
+def _segment_cache_path(cache_dir: Path, name: str, digest: bytes) -> Path:
+    # The digest is part of the name so a new cache never replaces a file that
+    # may still be memory-mapped, which Windows does not allow.
+    return cache_dir / f"{Path(name).stem}-{digest.hex()[:16]}.cache"
+
+
+def _remove_outdated_caches(cache_dir: Path) -> None:
+    # Segment file names include a digest of the format version, so files from
+    # an older version are never read or replaced again.  A marker records the
+    # version the directory holds.
+    marker = cache_dir / "format-version"
+    expected = f"{CACHE_FORMAT_VERSION}\n"
+    try:
+        if marker.read_text(encoding="ascii") == expected:
+            return
+    except (OSError, ValueError):
+        pass
+    for stale in cache_dir.glob("*.cache"):
+        try:
+            stale.unlink()
+        except OSError:
+            pass
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        marker.write_text(expected, encoding="ascii")
+    except OSError:
+        pass
+
+
+def _remove_stale_segment_caches(cache_path: Path) -> None:
+    stem = cache_path.stem.rpartition("-")[0]
+    for stale in cache_path.parent.glob(f"{stem}-*.cache"):
+        if stale != cache_path and stale.stem.rpartition("-")[0] == stem:
+            try:
+                stale.unlink()
+            except OSError:
+                # Still mapped by the active rules; removed after a later update.
+                pass
@@ -8,8 +8,16 @@ third-party rules must never silently degrade into unconditional blocks.
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
-from typing import Any, Iterable
+import sys
+from hashlib import blake2b
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from time import thread_time
+from typing import Any, Callable, Collection, Iterable, Literal
+
+from .public_suffix import site_key as _site_key
 
 
 RESOURCE_OPTIONS = {
@@ -46,29 +54,239 @@ RESOURCE_TYPE_NAMES = {
     "ResourceTypeWebSocket": "websocket",
 }
 
-# Common multi-label public suffixes.  This deliberately small fallback avoids
-# a network-updated PSL dependency while handling the domains users encounter
-# most often. Exact/subdomain checks below cover intranet and custom suffixes.
-COMMON_MULTI_LABEL_SUFFIXES = {
-    "ac.uk", "co.uk", "gov.uk", "ltd.uk", "me.uk", "net.uk", "org.uk", "plc.uk",
-    "asn.au", "com.au", "edu.au", "gov.au", "id.au", "net.au", "org.au",
-    "ac.nz", "co.nz", "govt.nz", "net.nz", "org.nz",
-    "co.jp", "ne.jp", "or.jp",
-    "com.br", "com.cn", "com.hk", "com.mx", "com.sg", "com.tr", "co.za",
-}
+def _domain_hash(name: bytes) -> int:
+    return int.from_bytes(blake2b(name, digest_size=8).digest(), "little")
+
+
+class DomainIndex:
+    """Compact, serializable set of domain names for hostname suffix matching.
+
+    Up to ``EXACT_LIMIT`` domains are kept as a plain set of names.  Larger
+    indexes, such as million-line hosts files, trade lookup speed for memory:
+    each domain is a 64-bit hash in a sorted ``array("Q")``, 8 bytes per entry
+    instead of a ``str`` plus a set slot (0.8 MiB rather than 10.1 MiB for
+    100,000 domains), with a radix directory over the top hash bits so a probe
+    bisects only a handful of entries.  Each probe hashes one suffix of the
+    host, which makes a lookup several times slower than a set's
+    (``benchmarks.domain_index``).  ``to_bytes`` output can be restored
+    zero-copy from a memory-mapped file with ``from_buffer``.  Hashed indexes
+    do not keep names; a false match needs a 64-bit collision.
+    """
+
+    EXACT_LIMIT = 50_000
+
+    __slots__ = ("_names", "_hashes", "_directory", "_shift", "_pending")
+
+    def __init__(self, domains: Iterable[str] = ()) -> None:
+        self._names: set[str] | None = set()
+        self._hashes: Any = array("Q")
+        self._directory: Any = array("I", [0, 0])
+        self._shift = 64
+        self._pending = array("Q")
+        for domain in domains:
+            self.add(domain)
+
+    def add(self, domain: str) -> None:
+        domain = domain.lower().strip(".")
+        if not domain:
+            return
+        if self._names is None:
+            self._pending.append(_domain_hash(domain.encode()))
+            return
+        self._names.add(domain)
+        if len(self._names) > self.EXACT_LIMIT:
+            self._switch_to_hashes()
+
+    def update(self, other: "DomainIndex") -> None:
+        if self._names is not None and other._names is not None:
+            self._names |= other._names
+            if len(self._names) > self.EXACT_LIMIT:
+                self._switch_to_hashes()
+            return
+        self._switch_to_hashes()
+        if other._names is not None:
+            self._pending.extend(_domain_hash(name.encode()) for name in other._names)
+            return
+        other.compact()
+        if len(other._hashes) > len(self._hashes):
+            # Adopt the larger sorted array (read-only, possibly memory-mapped)
+            # so ``compact`` splices the smaller side into it instead of
+            # copying and re-sorting a million-entry hosts file.
+            self._pending.extend(self._hashes)
+            self._set_hashes(other._hashes, other._directory)
+        else:
+            self._pending.extend(other._hashes)
+
+    def __ior__(self, other: "DomainIndex") -> "DomainIndex":
+        self.update(other)
+        return self
+
+    def __len__(self) -> int:
+        if self._names is not None:
+            return len(self._names)
+        self.compact()
+        return len(self._hashes)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DomainIndex):
+            return NotImplemented
+        if self._names is not None or other._names is not None:
+            return self._names == other._names
+        self.compact()
+        other.compact()
+        return self._hashes == other._hashes
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __contains__(self, domain: object) -> bool:
+        if not isinstance(domain, str):
+            return False
+        domain = domain.lower().strip(".")
+        if self._names is not None:
+            return domain in self._names
+        return bool(domain) and self.match_suffix(domain) == domain
+
+    def match_suffix(self, host: str) -> str | None:
+        """Return the longest listed suffix of a lowered, dot-stripped *host*.
+
+        Hashed indexes hash each suffix of the encoded host, longest first.
+        """
+        names = self._names
+        if names is not None:
+            candidate = host
+            while candidate not in names:
+                dot = candidate.find(".")
+                if dot < 0:
+                    return None
+                candidate = candidate[dot + 1 :]
+            return candidate
+        if self._pending:
+            self.compact()
+        hashes, directory, shift = self._hashes, self._directory, self._shift
+        encoded = host.encode()
+        start = 0
+        while True:
+            value = _domain_hash(encoded[start:])
+            bucket = value >> shift
+            hi = directory[bucket + 1]
+            index = bisect_left(hashes, value, directory[bucket], hi)
+            if index < hi and hashes[index] == value:
+                return encoded[start:].decode()
+            dot = encoded.find(b".", start)
+            if dot < 0:
+                return None
+            start = dot + 1
+
+    def drop_covered(self) -> list[str]:
+        """Remove and return names that have a listed parent domain.
+
+        ``match_suffix`` still finds the parent for every such host.  Hashed
+        indexes keep no names to walk, so they are left unchanged.
+        """
+        names = self._names
+        if names is None:
+            return []
+        covered = []
+        for name in names:
+            dot = name.find(".")
+            while dot >= 0:
+                if name[dot + 1 :] in names:
+                    covered.append(name)
+                    break
+                dot = name.find(".", dot + 1)
+        names.difference_update(covered)
+        return covered
+
+    def _switch_to_hashes(self) -> None:
+        if self._names is not None:
+            self._pending.extend(_domain_hash(name.encode()) for name in self._names)
+            self._names = None
 
+    def compact(self) -> None:
+        """Fold added domains into the sorted array; done before publishing.
 
-def domain_suffix_match(host: str, domains: set[str]) -> str | None:
+        Only the added hashes are sorted.  The runs of the existing array
+        between them are copied as raw bytes, and an array that gains nothing
+        is kept as is.
+        """
+        if not self._pending:
+            return
+        hashes = self._hashes
+        view = memoryview(hashes).cast("B")
+        merged = array("Q")
+        start = 0
+        for value in sorted(set(self._pending)):
+            position = bisect_left(hashes, value, start)
+            if position < len(hashes) and hashes[position] == value:
+                continue
+            merged.frombytes(view[8 * start : 8 * position])
+            merged.append(value)
+            start = position
+        self._pending = array("Q")
+        if merged:
+            merged.frombytes(view[8 * start :])
+            self._set_hashes(merged)
+
+    def _set_hashes(self, hashes: Any, directory: Any = None) -> None:
+        # About sixteen hashes per directory bucket.
+        bits = max(0, min(20, len(hashes).bit_length() - 4))
+        self._shift = 64 - bits
+        if directory is None:
+            directory = array("I", [0] * ((1 << bits) + 1))
+            for bucket in range(1 << bits):
+                directory[bucket + 1] = bisect_left(hashes, (bucket + 1) << self._shift, directory[bucket])
+        self._hashes = hashes
+        self._directory = directory
+
+    def to_bytes(self) -> bytes:
+        """Serialize as ``(count, hashed)`` then the names or the hashes and directory."""
+        if self._names is not None:
+            names = "\n".join(sorted(self._names)).encode()
+            return array("Q", [len(self._names), 0]).tobytes() + names
+        self.compact()
+        return (
+            array("Q", [len(self._hashes), 1]).tobytes()
+            + bytes(self._hashes)
+            + bytes(self._directory)
+        )
+
+    @classmethod
+    def from_buffer(cls, buffer: bytes | memoryview) -> "DomainIndex":
+        """Restore ``to_bytes`` output; hashed indexes are not copied (e.g. from an mmap)."""
+        view = memoryview(buffer).cast("B")
+        if len(view) < 16:
+            raise ValueError("truncated domain index")
+        count, hashed = view[:16].cast("Q")
+        index = cls()
+        if not hashed:
+            names = bytes(view[16:]).decode().split("\n") if count else []
+            if len(names) != count:
+                raise ValueError("truncated domain index")
+            index._names = set(names)
+            return index
+        bits = max(0, min(20, count.bit_length() - 4))
+        hashes_end = 16 + 8 * count
+        if len(view) != hashes_end + 4 * ((1 << bits) + 1):
+            raise ValueError("truncated domain index")
+        index._names = None
+        index._set_hashes(view[16:hashes_end].cast("Q"), view[hashes_end:].cast("I"))
+        return index
+
+
+def domain_suffix_match(host: str, domains: Collection[str] | DomainIndex) -> str | None:
     """Return a matching hostname suffix in O(number of host labels)."""
     host = host.lower().strip(".")
     if not host or not domains:
         return None
-    parts = host.split(".")
-    for index in range(len(parts)):
-        candidate = ".".join(parts[index:])
-        if candidate in domains:
-            return candidate
-    return None
+    if isinstance(domains, DomainIndex):
+        return domains.match_suffix(host)
+    candidate = host
+    while candidate not in domains:
+        dot = candidate.find(".")
+        if dot < 0:
+            return None
+        candidate = candidate[dot + 1 :]
+    return candidate
 
 
 def resource_type_name(resource_type: Any) -> str:
@@ -79,19 +297,6 @@ def resource_type_name(resource_type: Any) -> str:
     return RESOURCE_TYPE_NAMES.get(enum_name, "other")
 
 
-def _site_key(host: str) -> str:
-    host = host.lower().strip(".")
-    if not host:
-        return ""
-    labels = host.split(".")
-    if len(labels) <= 2 or all(part.isdigit() for part in labels):
-        return host
-    suffix = ".".join(labels[-2:])
-    if suffix in COMMON_MULTI_LABEL_SUFFIXES and len(labels) >= 3:
-        return ".".join(labels[-3:])
-    return suffix
-
-
 def is_third_party_request(request_host: str, first_party_host: str) -> bool | None:
     """Return whether two hosts are cross-site, or ``None`` without an origin."""
     request_host = request_host.lower().strip(".")
@@ -107,55 +312,570 @@ def is_third_party_request(request_host: str, first_party_host: str) -> bool | N
     return _site_key(request_host) != _site_key(first_party_host)
 
 
+class LRUCache:
+    """Size-bounded least-recently-used mapping with hit/miss counters.
+
+    Each instance is meant to have a single writer (the request interceptor
+    runs on Chromium's IO thread); other threads only read the counters.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Any, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any) -> Any | None:
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
 @dataclass(frozen=True)
+class FilterDecision:
+    """Single-pass verdict for one request.
+
+    ``reason`` names the stage that decided the request and ``rule`` holds the
+    filter text responsible (``||domain^`` for hostname rules), or ``""``.
+    """
+
+    blocked: bool
+    reason: Literal["exception", "domain", "pattern", "none"]
+    rule: str = ""
+
+
+NO_MATCH = FilterDecision(False, "none")
+
+
+@dataclass
+class RuleHitStats:
+    """Usage counters a ``FilterRuleSet`` updates while one is attached.
+
+    ``hits`` counts requests decided by each rule, keyed by
+    ``FilterDecision.rule``, including decisions answered from the cache.
+    ``bucket_probes`` counts uncached evaluations that scanned each token
+    bucket, with ``""`` for the generic rules every evaluation scans.  The
+    counters belong to the caller, so they survive swapping in new rule sets.
+    """
+
+    hits: Counter[str] = field(default_factory=Counter)
+    bucket_probes: Counter[str] = field(default_factory=Counter)
+
+
+@dataclass(frozen=True)
+class OptimizationReport:
+    """What ``FilterRuleSet.optimize`` removed.
+
+    ``bytes_saved`` estimates the size of the removed rule objects and strings.
+    """
+
+    duplicate_rules: int = 0
+    covered_domains: int = 0
+    shadowed_rules: int = 0
+    duplicate_selectors: int = 0
+    bytes_saved: int = 0
+
+    @property
+    def removed_rules(self) -> int:
+        return self.duplicate_rules + self.covered_domains + self.shadowed_rules
+
+
+# CPU-time limit for one wildcard rule against one URL.  It is far above what
+# the linear matcher needs, so only a pathological rule overruns it.  Thread
+# time leaves out waits for the GIL held by parsing or merging on another
+# thread; quarantine still takes consecutive overruns.
+RULE_MATCH_BUDGET = 0.02
+QUARANTINE_STRIKES = 3
+# Wildcards allowed in one pattern after runs of ``*`` are collapsed; each
+# adds a scan of the URL to every match.
+MAX_PATTERN_WILDCARDS = 16
+# Called with a rule's text as soon as it is quarantined, on the matching thread.
+_quarantine_listener: Callable[[str], None] | None = None
+
+# Characters that ABP's "^" separator placeholder does *not* match.
+_NON_SEPARATORS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789_.%-")
+# Kinds that can pin a request to one host, see ``_confined_to_blocked_host``.
+_HOST_KINDS = frozenset({"host", "regex"})
+_WILDCARD_RUN_RE = re.compile(r"\*{2,}")
+_AUTHORITY_RE = re.compile(r"[a-z][a-z0-9+.-]*://([^/?#]*)")
+
+
+def url_authority(lowered_url: str) -> tuple[int, int] | None:
+    """Return the authority span that ``||`` host anchors may start within."""
+    match = _AUTHORITY_RE.match(lowered_url)
+    return match.span(1) if match else None
+
+
+_TYPE_SETS: dict[tuple[str, ...], frozenset[str]] = {}
+
+
+# Empty frozensets are not shared by CPython; most rules have no $domain=.
+_NO_DOMAINS: frozenset[str] = frozenset()
+
+
+def _domain_set(names: Iterable[str]) -> frozenset[str]:
+    return frozenset(names) or _NO_DOMAINS
+
+
+def _type_set(names: Iterable[str]) -> frozenset[str]:
+    """Return a shared frozenset for *names*; rules repeat a few type combinations."""
+    key = tuple(sorted(names))
+    cached = _TYPE_SETS.get(key)
+    if cached is None:
+        cached = _TYPE_SETS[key] = frozenset(key)
+    return cached
+
+
+def _segments_at(text: str, pos: int, segments: tuple[str, ...], end_anchor: bool) -> bool:
+    """Match literal *segments* joined by ABP ``^`` separators at *pos*."""
+    if not text.startswith(segments[0], pos):
+        return False
+    pos += len(segments[0])
+    for index in range(1, len(segments)):
+        if pos == len(text):
+            # "^" also matches the end of the URL; only empty pieces may follow.
+            return not any(segments[index:])
+        if text[pos] in _NON_SEPARATORS:
+            return False
+        segment = segments[index]
+        if not text.startswith(segment, pos + 1):
+            return False
+        pos += 1 + len(segment)
+    return not end_anchor or pos == len(text)
+
+
+def _segments_end(text: str, pos: int, segments: tuple[str, ...]) -> int:
+    """Like ``_segments_at`` without an end anchor, returning where the match ends or -1."""
+    if not text.startswith(segments[0], pos):
+        return -1
+    pos += len(segments[0])
+    for index in range(1, len(segments)):
+        if pos == len(text):
+            return -1 if any(segments[index:]) else pos
+        if text[pos] in _NON_SEPARATORS:
+            return -1
+        segment = segments[index]
+        if not text.startswith(segment, pos + 1):
+            return -1
+        pos += 1 + len(segment)
+    return pos
+
+
+def _find_segments(text: str, segments: tuple[str, ...], pos: int) -> int:
+    """Return the end of the leftmost match of *segments* at or after *pos*, or -1."""
+    if len(segments) == 1:
+        found = text.find(segments[0], pos)
+        return found if found < 0 else found + len(segments[0])
+    if segments[0] or not segments[1]:
+        probe, offset = segments[0], 0
+    else:
+        # A leading "^" consumes one separator, so search for what follows it.
+        probe, offset = segments[1], 1
+    found = text.find(probe, pos + offset)
+    while found >= 0:
+        end = _segments_end(text, found - offset, segments)
+        if end >= 0:
+            return end
+        found = text.find(probe, found + 1)
+    return -1
+
+
+@dataclass(frozen=True, slots=True)
+class _Wildcard:
+    """A wildcard pattern split for ``_wildcard_matches``.
+
+    *anchor* is ``"||"``, ``"|"`` or ``""``; each piece is the lowered text
+    between two ``*`` split on ``^`` separators, as in ``NetworkRule.segments``.
+    ``literals`` repeats the pieces as plain strings when the pattern has no
+    anchor and no separator, the common case, which needs one ``str.find``
+    per piece.  Otherwise ``required``, the longest segment, must occur in
+    any matching URL and rules out most URLs with one substring test.
+    """
+
+    anchor: str
+    end_anchor: bool
+    pieces: tuple[tuple[str, ...], ...]
+    literals: tuple[str, ...]
+    required: str
+
+    @classmethod
+    def parse(cls, body: str) -> "_Wildcard":
+        anchor = "||" if body.startswith("||") else "|" if body.startswith("|") else ""
+        text = body[len(anchor) :].lower()
+        end_anchor = text.endswith("|")
+        if end_anchor:
+            text = text[:-1]
+        pieces = tuple(tuple(piece.split("^")) for piece in text.split("*"))
+        plain = not anchor and not end_anchor and "^" not in text
+        required = max((segment for piece in pieces for segment in piece), key=len)
+        return cls(anchor, end_anchor, pieces, tuple(text.split("*")) if plain else (), required)
+
+
+def _wildcard_matches(
+    lowered: str,
+    authority: tuple[int, int] | None,
+    anchor: str,
+    end_anchor: bool,
+    pieces: tuple[tuple[str, ...], ...],
+) -> bool:
+    """Match *pieces* in order without backtracking.
+
+    Since ``*`` accepts anything, the leftmost match of each piece leaves the
+    most room for the rest, so one forward scan decides the pattern in time
+    linear in the URL; the equivalent ``.*`` regex can take seconds on a long
+    URL with a few wildcards.
+    """
+    head = pieces[0]
+    if anchor == "||":
+        if authority is None:
+            return False
+        start, end = authority
+        cursor = -1
+        pos = lowered.find(head[0], start)
+        while 0 <= pos <= end:
+            if pos == start or lowered[pos - 1] == ".":
+                cursor = _segments_end(lowered, pos, head)
+                if cursor >= 0:
+                    break
+            pos = lowered.find(head[0], pos + 1)
+    elif anchor == "|":
+        cursor = _segments_end(lowered, 0, head)
+    else:
+        cursor = _find_segments(lowered, head, 0)
+    for piece in pieces[1:-1]:
+        if cursor < 0:
+            return False
+        cursor = _find_segments(lowered, piece, cursor)
+    if cursor < 0:
+        return False
+    tail = pieces[-1]
+    if not end_anchor:
+        return _find_segments(lowered, tail, cursor) >= 0
+    # Anchored at the end, the last piece can only start where its length
+    # fits; each trailing "^" may match the end of the URL instead of a character.
+    length = sum(map(len, tail)) + len(tail) - 1
+    optional = 0
+    while optional < len(tail) - 1 and not tail[-1 - optional]:
+        optional += 1
+    size = len(lowered)
+    for pos in range(max(cursor, size - length), size - length + optional + 1):
+        if _segments_end(lowered, pos, tail) == size:
+            return True
+    return False
+
+
+def abp_pattern_regex(body: str) -> str:
+    """Translate an ABP network pattern (without options) to a regex source."""
+    text = body
+    host_anchor = anchor_start = anchor_end = False
+    if text.startswith("||"):
+        host_anchor = True
+        text = text[2:]
+    elif text.startswith("|"):
+        anchor_start = True
+        text = text[1:]
+    if text.endswith("|"):
+        anchor_end = True
+        text = text[:-1]
+    parts: list[str] = []
+    for char in text:
+        if char == "*":
+            parts.append(".*")
+        elif char == "^":
+            parts.append(r"(?:[^a-zA-Z0-9_.%-]|$)")
+        else:
+            parts.append(re.escape(char))
+    regex = "".join(parts)
+    if host_anchor:
+        regex = r"^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?" + regex
+    elif anchor_start:
+        regex = "^" + regex
+    if anchor_end:
+        regex += "$"
+    return regex
+
+
+@dataclass(frozen=True, slots=True)
 class NetworkRule:
-    """Compiled network rule plus the ABP request constraints it carries."""
+    """One network rule's matcher plus the ABP request constraints it carries.
+
+    ``kind`` selects the cheapest exact matcher for the pattern:
+
+    * ``substring`` - a plain literal found anywhere in the URL,
+    * ``prefix`` - a ``|literal`` anchored at the start of the URL,
+    * ``host`` - a ``||literal`` anchored at a hostname label boundary,
+    * ``regex`` - a pattern that still contains ``*`` wildcards.
+
+    Literal kinds keep a lowercased ``source`` in which ``^`` marks an ABP
+    separator and are matched with ``str.startswith``/``str.find`` against the
+    lowered URL.  ``regex`` rules keep the ABP pattern itself as ``source`` and
+    split it into ``*``-separated pieces on their first evaluation, so the many
+    wildcard rules in buckets a session never reaches cost nothing more.  The
+    pieces are matched by a forward scan rather than a backtracking regex;
+    ``pattern`` still gives the equivalent regex.  Rules use ``__slots__``
+    because a full list holds tens of thousands of them.
+
+    A wildcard match that overruns ``RULE_MATCH_BUDGET`` counts against the
+    rule and one within it clears the count; after ``QUARANTINE_STRIKES``
+    overruns in a row the rule is ``quarantined``, reported to
+    ``set_quarantine_listener``'s listener, and skipped until
+    ``FilterRuleSet.merge`` next builds a rule set from it, so it cannot keep
+    stalling the network thread.
+
+    ``include_domains``/``exclude_domains`` hold a ``$domain=`` option.  The
+    most specific first-party domain listed decides, as in ABP, so
+    ``$domain=example.com|~shop.example.com`` skips the shop subdomain.
+    """
 
-    pattern: re.Pattern[str]
+    kind: Literal["substring", "prefix", "host", "regex"]
+    source: str
     include_types: frozenset[str] = frozenset()
     exclude_types: frozenset[str] = frozenset()
     third_party: bool | None = None
+    text: str = ""
+    end_anchor: bool = False
+    include_domains: frozenset[str] = _NO_DOMAINS
+    exclude_domains: frozenset[str] = _NO_DOMAINS
+    compiled: re.Pattern[str] | None = field(default=None, repr=False, compare=False)
+    segments: tuple[str, ...] = field(init=False, repr=False, compare=False)
+    constrained: bool = field(init=False, repr=False, compare=False)
+    wildcard: _Wildcard | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    slow_matches: int = field(default=0, init=False, repr=False, compare=False)
 
-    def matches(self, url: str, resource_type: str, third_party: bool | None) -> bool:
+    def __post_init__(self) -> None:
+        segments = () if self.kind == "regex" else tuple(self.source.split("^"))
+        object.__setattr__(self, "segments", segments)
+        object.__setattr__(
+            self,
+            "constrained",
+            bool(
+                self.include_types
+                or self.exclude_types
+                or self.third_party is not None
+                or self.include_domains
+                or self.exclude_domains
+            ),
+        )
+
+    @property
+    def quarantined(self) -> bool:
+        return self.slow_matches >= QUARANTINE_STRIKES
+
+    @property
+    def pattern(self) -> re.Pattern[str]:
+        compiled = self.compiled
+        if compiled is None:
+            compiled = re.compile(abp_pattern_regex(self.source), re.IGNORECASE)
+            object.__setattr__(self, "compiled", compiled)
+        return compiled
+
+    def applies_to(
+        self, resource_type: str, third_party: bool | None, first_party_domains: tuple[str, ...] = ()
+    ) -> bool:
+        """Check the ``$type``, ``$third-party`` and ``$domain`` constraints only.
+
+        *first_party_domains* lists the first-party host and its parent
+        domains, longest first.
+        """
         if self.include_types and resource_type not in self.include_types:
             return False
         if resource_type in self.exclude_types:
             return False
         if self.third_party is not None and third_party is not self.third_party:
             return False
-        return self.pattern.search(url) is not None
+        if self.include_domains or self.exclude_domains:
+            for domain in first_party_domains:
+                if domain in self.exclude_domains:
+                    return False
+                if domain in self.include_domains:
+                    return True
+            return not self.include_domains
+        return True
+
+    def matches(
+        self,
+        url: str,
+        lowered: str,
+        authority: tuple[int, int] | None,
+        resource_type: str,
+        third_party: bool | None,
+        first_party_domains: tuple[str, ...] = (),
+    ) -> bool:
+        """Test one request; *lowered* and *authority* are precomputed per URL."""
+        if self.constrained and not self.applies_to(resource_type, third_party, first_party_domains):
+            return False
+        kind = self.kind
+        segments = self.segments
+        if kind == "substring":
+            first = segments[0]
+            if len(segments) == 1:
+                return lowered.endswith(first) if self.end_anchor else first in lowered
+            pos = lowered.find(first)
+            while pos >= 0:
+                if _segments_at(lowered, pos, segments, self.end_anchor):
+                    return True
+                pos = lowered.find(first, pos + 1)
+            return False
+        if kind == "host":
+            if authority is None:
+                return False
+            start, end = authority
+            first = segments[0]
+            pos = lowered.find(first, start)
+            while 0 <= pos <= end:
+                if (pos == start or lowered[pos - 1] == ".") and _segments_at(
+                    lowered, pos, segments, self.end_anchor
+                ):
+                    return True
+                pos = lowered.find(first, pos + 1)
+            return False
+        if kind == "prefix":
+            if len(segments) == 1 and not self.end_anchor:
+                return lowered.startswith(segments[0])
+            return _segments_at(lowered, 0, segments, self.end_anchor)
+        if self.slow_matches >= QUARANTINE_STRIKES:
+            return False
+        wildcard = self.wildcard
+        if wildcard is None:
+            wildcard = _Wildcard.parse(self.source)
+            object.__setattr__(self, "wildcard", wildcard)
+        if wildcard.literals:
+            pos = 0
+            for literal in wildcard.literals:
+                pos = lowered.find(literal, pos)
+                if pos < 0:
+                    return False
+                pos += len(literal)
+            return True
+        if wildcard.required not in lowered:
+            return False
+        started = thread_time()
+        matched = _wildcard_matches(lowered, authority, wildcard.anchor, wildcard.end_anchor, wildcard.pieces)
+        if thread_time() - started > RULE_MATCH_BUDGET:
+            object.__setattr__(self, "slow_matches", self.slow_matches + 1)
+            listener = _quarantine_listener
+            if self.slow_matches == QUARANTINE_STRIKES and listener is not None:
+                listener(self.text or self.source)
+        elif self.slow_matches:
+            object.__setattr__(self, "slow_matches", 0)
+        return matched
 
 
 class FilterRuleSet:
     """A practical, indexed subset of the Adblock Plus filter grammar."""
 
     GENERIC_CAP = 200
+    DECISION_CACHE_SIZE = 8192
+    # Very long URLs (inline data, giant query strings) are evaluated but not
+    # retained, so the decision cache stays small in bytes as well as entries.
+    DECISION_CACHE_MAX_URL = 2048
+    # Only generic selectors without an id or class key are injected into
+    # every page, so only those are capped.
     GENERIC_SELECTOR_CAP = 5000
+    SITE_CSS_CACHE_SIZE = 256
+    FIRST_PARTY_CACHE_SIZE = 256
+    _SELECTOR_KEY_RE = re.compile(r"[#.]-?[A-Za-z_][A-Za-z0-9_-]*(?=$|[\s>+~.#:\[])")
     _CSS_CHUNK = 100
     _TOKEN_RE = re.compile(r"[a-z0-9]{4,}")
+    _UNINDEXABLE_TOKENS = frozenset({"http", "https", "www"})
     _HOSTS_RE = re.compile(r"^(?:0\.0\.0\.0|127\.0\.0\.1)\s+([a-z0-9.-]+)$", re.IGNORECASE)
     _DOMAIN_RULE_RE = re.compile(r"^[a-z0-9.-]+\^?$", re.IGNORECASE)
+    _DOMAIN_OPTION_RE = re.compile(r"^[a-z0-9-]+(?:\.[a-z0-9-]+)*$")
     SUPPORTED_OPTIONS = RESOURCE_OPTIONS | {"third-party", "3p"}
 
     def __init__(self) -> None:
-        self.blocked_domains: set[str] = set()
-        self.exception_domains: set[str] = set()
+        self.blocked_domains = DomainIndex()
+        self.exception_domains = DomainIndex()
         self.token_buckets: dict[str, list[NetworkRule]] = {}
         self.generic_patterns: list[NetworkRule] = []
         self.exception_token_buckets: dict[str, list[NetworkRule]] = {}
         self.generic_exceptions: list[NetworkRule] = []
+        # Rules that ``$domain=`` limits to some first-party sites, filed under
+        # each domain they include and then by token ("" when they have none),
+        # so requests from other sites never scan them.
+        self.domain_token_buckets: dict[str, dict[str, list[NetworkRule]]] = {}
+        self.domain_exception_token_buckets: dict[str, dict[str, list[NetworkRule]]] = {}
         self.generic_selectors: list[str] = []
+        # Generic selectors that can only match when a given ``#id`` or
+        # ``.class`` exists in the page, keyed by that id or class.
+        self.generic_selector_index: dict[str, list[str]] = {}
         self.domain_selectors: dict[str, list[str]] = {}
         self.rule_count = 0
         self.cosmetic_count = 0
         self.skipped_count = 0
         self._generic_css: str | None = None
+        # Tokenized rules wait here, with their usable tokens and exception
+        # flag, until ``finalize`` files them under their rarest token.
+        self._pending_rules: list[tuple[NetworkRule, tuple[str, ...], bool]] = []
+        # Owned by the rule set so swapping in a new FilterRuleSet replaces the
+        # rules and their cached decisions in one atomic attribute assignment.
+        self.decision_cache = LRUCache(self.DECISION_CACHE_SIZE)
+        # Site stylesheets keyed by the domains whose selectors they contain.
+        self.site_css_cache = LRUCache(self.SITE_CSS_CACHE_SIZE)
+        # First-party host -> its domains plus the scoped buckets they select,
+        # computed once per site instead of once per request.
+        self.first_party_cache = LRUCache(self.FIRST_PARTY_CACHE_SIZE)
+        # Every domain named by a ``$domain=`` option; built with the cache.
+        self._option_domains: frozenset[str] | None = None
+        # Optional usage counters; ``None`` keeps evaluation free of counting.
+        self.hit_stats: RuleHitStats | None = None
+        # What the last ``optimize`` call removed, for status reporting.
+        self.optimization: OptimizationReport | None = None
 
     def parse_text(self, text: str) -> None:
-        for raw_line in text.splitlines():
+        self.parse_lines(text.splitlines())
+
+    def parse_lines(
+        self, lines: Iterable[str], section: Literal["all", "domains", "patterns"] = "all"
+    ) -> int:
+        """Parse filter lines, such as a batch streamed from a list file.
+
+        ``section="domains"`` keeps only hosts-file lines and option-less
+        ``||domain^`` rules, a quick pass that enables hostname blocking while
+        the rest is parsed with ``section="patterns"``.  Lines outside the
+        section are ignored rather than counted as skipped, so the two passes
+        add up to one ``"all"`` parse.  Returns how many lines were left to the
+        other section.
+        """
+        domains_only = section == "domains"
+        deferred = 0
+        for raw_line in lines:
             line = raw_line.strip()
             if not line or line.startswith(("!", "[")):
                 continue
+            if domains_only and (
+                not (line[:1].isdigit() or line.startswith(("||", "@@||")))
+                or "#" in line
+                or line.partition("$")[2]
+            ):
+                deferred += 1
+                continue
+            rule_text = line
             if "#@#" in line or "#?#" in line or "#$#" in line:
                 self.skipped_count += 1
                 continue
@@ -165,7 +885,9 @@ class FilterRuleSet:
             hosts_match = self._HOSTS_RE.match(line)
             if hosts_match:
                 domain = hosts_match.group(1).lower()
-                if domain not in {"localhost", "localhost.localdomain", "broadcasthost"}:
+                if section == "patterns":
+                    deferred += 1
+                elif domain not in {"localhost", "localhost.localdomain", "broadcasthost"}:
                     self.blocked_domains.add(domain)
                     self.rule_count += 1
                 continue
@@ -184,42 +906,431 @@ class FilterRuleSet:
                 rest = body[2:]
                 if self._DOMAIN_RULE_RE.match(rest):
                     domain = rest.rstrip("^").lower().strip(".")
-                    if domain:
+                    if section == "patterns":
+                        deferred += 1
+                    elif domain:
                         (self.exception_domains if exception else self.blocked_domains).add(domain)
                         self.rule_count += 1
                     continue
+            if domains_only:
+                deferred += 1
+                continue
 
-            pattern = self._compile_pattern(body)
-            if pattern is None:
+            matcher = self._compile_pattern(body)
+            if matcher is None:
                 self.skipped_count += 1
                 continue
-            include_types, exclude_types, third_party = constraints
-            rule = NetworkRule(pattern, include_types, exclude_types, third_party)
-            token = self._pick_token(body)
-            if exception:
-                buckets, generic = self.exception_token_buckets, self.generic_exceptions
-            else:
-                buckets, generic = self.token_buckets, self.generic_patterns
-            if token:
-                buckets.setdefault(token, []).append(rule)
+            kind, source, end_anchor = matcher
+            include_types, exclude_types, third_party, include_domains, exclude_domains = constraints
+            rule = NetworkRule(
+                kind,
+                source,
+                include_types,
+                exclude_types,
+                third_party,
+                rule_text,
+                end_anchor,
+                include_domains,
+                exclude_domains,
+            )
+            tokens = self._candidate_tokens(body)
+            generic = self.generic_exceptions if exception else self.generic_patterns
+            if tokens or include_domains:
+                self._pending_rules.append((rule, tokens, exception))
                 self.rule_count += 1
             elif len(generic) < self.GENERIC_CAP:
                 generic.append(rule)
                 self.rule_count += 1
             else:
                 self.skipped_count += 1
+        self._generic_css = None
+        self.decision_cache.clear()
+        self.site_css_cache.clear()
+        self.first_party_cache.clear()
+        self._option_domains = None
+        return deferred
+
+    def finalize(self) -> None:
+        """Second build pass: file pending rules under their rarest usable token.
+
+        Token frequencies are counted over every tokenized rule of each index
+        first, so a very common token such as ``analytics`` only keeps rules
+        that have no rarer choice, the way uBlock Origin balances its buckets.
+        Rules indexed by an earlier pass are re-balanced together with new ones.
+        ``$domain=`` rules with included domains go to the per-domain buckets.
+        The domain indexes are compacted too.  ``evaluate`` finalizes lazily;
+        build workers call this before publishing.
+        """
+        self.blocked_domains.compact()
+        self.exception_domains.compact()
+        if not self._pending_rules:
+            return
+        for exception, buckets, scoped in (
+            (False, self.token_buckets, self.domain_token_buckets),
+            (True, self.exception_token_buckets, self.domain_exception_token_buckets),
+        ):
+            # A rule with several included domains sits in several buckets.
+            scoped_rules = {
+                id(rule): rule
+                for domain_buckets in scoped.values()
+                for bucket in domain_buckets.values()
+                for rule in bucket
+            }
+            entries = [
+                (rule, self._candidate_tokens(self._rule_body(rule.text)))
+                for rule in (
+                    *(rule for bucket in buckets.values() for rule in bucket),
+                    *scoped_rules.values(),
+                )
+            ]
+            entries.extend(
+                (rule, tokens) for rule, tokens, is_exception in self._pending_rules
+                if is_exception is exception
+            )
+            frequency = Counter(token for _rule, tokens in entries for token in tokens)
+            buckets.clear()
+            scoped.clear()
+            for rule, tokens in entries:
+                token = (
+                    min(tokens, key=lambda token: (frequency[token], -len(token), token))
+                    if tokens
+                    else ""
+                )
+                if rule.include_domains:
+                    for domain in sorted(rule.include_domains):
+                        scoped.setdefault(domain, {}).setdefault(token, []).append(rule)
+                else:
+                    buckets.setdefault(token, []).append(rule)
+        self._pending_rules = []
+        self.first_party_cache.clear()
+        self._option_domains = None
+
+    def bucket_stats(self) -> dict[str, Any]:
+        """Describe the token-bucket size distribution of both indexes.
+
+        ``max`` is the worst-case number of rules scanned for one URL token;
+        ``histogram`` counts buckets by power-of-two size range.  Rules scoped
+        by ``$domain=`` are counted separately under ``scoped_domains``.
+        """
+        self.finalize()
+        sizes = sorted(
+            len(rules)
+            for buckets in (self.token_buckets, self.exception_token_buckets)
+            for rules in buckets.values()
+        )
+        histogram: dict[str, int] = {}
+        for size in sizes:
+            low = 1 << (size.bit_length() - 1)
+            label = str(low) if low == 1 else f"{low}-{2 * low - 1}"
+            histogram[label] = histogram.get(label, 0) + 1
+
+        def percentile(fraction: float) -> int:
+            return sizes[min(len(sizes) - 1, int(fraction * len(sizes)))] if sizes else 0
+
+        return {
+            "buckets": len(sizes),
+            "rules": sum(sizes),
+            "mean": sum(sizes) / len(sizes) if sizes else 0.0,
+            "p50": percentile(0.50),
+            "p90": percentile(0.90),
+            "p99": percentile(0.99),
+            "max": sizes[-1] if sizes else 0,
+            "generic": len(self.generic_patterns) + len(self.generic_exceptions),
+            "scoped_domains": len(self.domain_token_buckets.keys() | self.domain_exception_token_buckets.keys()),
+            "histogram": histogram,
+        }
+
+    def to_state(self) -> dict[str, Any]:
+        """Return the parsed rules as plain builtins for the compiled-rule cache."""
+        self.finalize()
+
+        def rules_state(rules: Iterable[NetworkRule]) -> list[tuple[Any, ...]]:
+            return [
+                (
+                    rule.kind,
+                    rule.source,
+                    sorted(rule.include_types),
+                    sorted(rule.exclude_types),
+                    rule.third_party,
+                    rule.text,
+                    rule.end_anchor,
+                    sorted(rule.include_domains),
+                    sorted(rule.exclude_domains),
+                )
+                for rule in rules
+            ]
+
+        def scoped_state(scoped: dict[str, dict[str, list[NetworkRule]]]) -> dict[str, Any]:
+            return {
+                domain: {token: rules_state(rules) for token, rules in buckets.items()}
+                for domain, buckets in scoped.items()
+            }
+
+        return {
+            "blocked_domains": self.blocked_domains.to_bytes(),
+            "exception_domains": self.exception_domains.to_bytes(),
+            "token_buckets": {token: rules_state(rules) for token, rules in self.token_buckets.items()},
+            "generic_patterns": rules_state(self.generic_patterns),
+            "exception_token_buckets": {
+                token: rules_state(rules) for token, rules in self.exception_token_buckets.items()
+            },
+            "generic_exceptions": rules_state(self.generic_exceptions),
+            "domain_token_buckets": scoped_state(self.domain_token_buckets),
+            "domain_exception_token_buckets": scoped_state(self.domain_exception_token_buckets),
+            "generic_selectors": list(self.generic_selectors),
+            "generic_selector_index": {
+                key: list(selectors) for key, selectors in self.generic_selector_index.items()
+            },
+            "domain_selectors": {domain: list(selectors) for domain, selectors in self.domain_selectors.items()},
+            "counts": (self.rule_count, self.cosmetic_count, self.skipped_count),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict[str, Any]) -> "FilterRuleSet":
+        """Rebuild a rule set from ``to_state`` output without re-parsing lists.
+
+        Regexes are not compiled here; each rule compiles on its first match.
+        """
+        rules = cls()
+
+        def restore(entries: Iterable[tuple[Any, ...]]) -> list[NetworkRule]:
+            return [
+                NetworkRule(
+                    kind,
+                    source,
+                    _type_set(include),
+                    _type_set(exclude),
+                    third_party,
+                    text,
+                    end_anchor,
+                    _domain_set(include_domains),
+                    _domain_set(exclude_domains),
+                )
+                for (
+                    kind, source, include, exclude, third_party, text, end_anchor, include_domains, exclude_domains
+                ) in entries
+            ]
+
+        def restore_scoped(scoped: dict[str, Any]) -> dict[str, dict[str, list[NetworkRule]]]:
+            return {
+                domain: {token: restore(entries) for token, entries in buckets.items()}
+                for domain, buckets in scoped.items()
+            }
+
+        rules.blocked_domains = DomainIndex.from_buffer(state["blocked_domains"])
+        rules.exception_domains = DomainIndex.from_buffer(state["exception_domains"])
+        rules.token_buckets = {token: restore(entries) for token, entries in state["token_buckets"].items()}
+        rules.generic_patterns = restore(state["generic_patterns"])
+        rules.exception_token_buckets = {
+            token: restore(entries) for token, entries in state["exception_token_buckets"].items()
+        }
+        rules.generic_exceptions = restore(state["generic_exceptions"])
+        rules.domain_token_buckets = restore_scoped(state["domain_token_buckets"])
+        rules.domain_exception_token_buckets = restore_scoped(state["domain_exception_token_buckets"])
+        rules.generic_selectors = list(state["generic_selectors"])
+        rules.generic_selector_index = {
+            key: list(selectors) for key, selectors in state["generic_selector_index"].items()
+        }
+        rules.domain_selectors = {
+            domain: list(selectors) for domain, selectors in state["domain_selectors"].items()
+        }
+        rules.rule_count, rules.cosmetic_count, rules.skipped_count = state["counts"]
+        return rules
+
+    @classmethod
+    def merge(cls, parts: Iterable["FilterRuleSet"]) -> "FilterRuleSet":
+        """Combine separately parsed lists without re-parsing or re-indexing them.
+
+        Bucket lists are concatenated per token in *parts* order, so each
+        rule stays under the token its own list chose.  The generic caps apply
+        across the result as if every list had been parsed into one set.
+        Rules carried over from *parts* leave quarantine.
+        """
+        merged = cls()
+        for part in parts:
+            part.finalize()
+            merged.blocked_domains |= part.blocked_domains
+            merged.exception_domains |= part.exception_domains
+            for target, source in (
+                (merged.token_buckets, part.token_buckets),
+                (merged.exception_token_buckets, part.exception_token_buckets),
+            ):
+                for token, rules in source.items():
+                    bucket = target.get(token)
+                    if bucket is None:
+                        target[token] = list(rules)
+                    else:
+                        bucket.extend(rules)
+            for scoped_target, scoped_source in (
+                (merged.domain_token_buckets, part.domain_token_buckets),
+                (merged.domain_exception_token_buckets, part.domain_exception_token_buckets),
+            ):
+                for domain, buckets in scoped_source.items():
+                    domain_buckets = scoped_target.setdefault(domain, {})
+                    for token, rules in buckets.items():
+                        domain_buckets.setdefault(token, []).extend(rules)
+            for domain, selectors in part.domain_selectors.items():
+                merged.domain_selectors.setdefault(domain, []).extend(selectors)
+            for key, selectors in part.generic_selector_index.items():
+                merged.generic_selector_index.setdefault(key, []).extend(selectors)
+            merged.rule_count += part.rule_count
+            merged.cosmetic_count += part.cosmetic_count
+            merged.skipped_count += part.skipped_count
+            for target, source, cap in (
+                (merged.generic_patterns, part.generic_patterns, cls.GENERIC_CAP),
+                (merged.generic_exceptions, part.generic_exceptions, cls.GENERIC_CAP),
+            ):
+                kept = source[: max(0, cap - len(target))]
+                target.extend(kept)
+                merged.rule_count -= len(source) - len(kept)
+                merged.skipped_count += len(source) - len(kept)
+            kept_selectors = part.generic_selectors[
+                : max(0, cls.GENERIC_SELECTOR_CAP - len(merged.generic_selectors))
+            ]
+            merged.generic_selectors.extend(kept_selectors)
+            merged.cosmetic_count -= len(part.generic_selectors) - len(kept_selectors)
+            merged.skipped_count += len(part.generic_selectors) - len(kept_selectors)
+        merged.blocked_domains.compact()
+        merged.exception_domains.compact()
+        for rule in merged.network_rules():
+            if rule.slow_matches:
+                object.__setattr__(rule, "slow_matches", 0)
+        return merged
+
+    def optimize(self) -> OptimizationReport:
+        """Drop rules that cannot change a verdict, typically after ``merge``.
+
+        Overlapping lists repeat many rules.  This removes network rules that
+        differ from an earlier one only in their text, hostname rules under a
+        listed parent (``||x.ads.example^`` beside ``||ads.example^``), block
+        patterns confined to a blocked host (``||ads.example/ad.js``), whose
+        requests the hostname stage blocks first, and repeated selectors.  A
+        decision may now name the surviving rule instead of the removed one.
+        """
+        self.finalize()
+        removed: dict[int, NetworkRule] = {}
+        duplicates = shadowed = 0
+        for exception, buckets, scoped, generic in (
+            (False, self.token_buckets, self.domain_token_buckets, self.generic_patterns),
+            (True, self.exception_token_buckets, self.domain_exception_token_buckets, self.generic_exceptions),
+        ):
+            kept: dict[tuple[Any, ...], NetworkRule] = {}
+            # Only the few lists that lose a rule are rebuilt.
+            dirty: list[tuple[dict[str, list[NetworkRule]] | None, str]] = []
+            places = [
+                (bucket_map, token, bucket)
+                for bucket_map in (buckets, *scoped.values())
+                for token, bucket in bucket_map.items()
+            ]
+            places.append((None, "", generic))
+            for bucket_map, token, bucket in places:
+                changed = False
+                for rule in bucket:
+                    if id(rule) in removed:
+                        # A ``$domain=`` rule sits in one bucket per domain.
+                        changed = True
+                        continue
+                    if not exception and rule.kind in _HOST_KINDS and self._confined_to_blocked_host(rule):
+                        removed[id(rule)] = rule
+                        shadowed += 1
+                        changed = True
+                        continue
+                    key = (
+                        rule.kind,
+                        rule.source.lower() if rule.kind == "regex" else rule.source,
+                        rule.include_types,
+                        rule.exclude_types,
+                        rule.third_party,
+                        rule.end_anchor,
+                        rule.include_domains,
+                        rule.exclude_domains,
+                    )
+                    if kept.setdefault(key, rule) is not rule:
+                        removed[id(rule)] = rule
+                        duplicates += 1
+                        changed = True
+                if changed:
+                    dirty.append((bucket_map, token))
+            for bucket_map, token in dirty:
+                if bucket_map is None:
+                    generic[:] = [rule for rule in generic if id(rule) not in removed]
+                    continue
+                remaining = [rule for rule in bucket_map[token] if id(rule) not in removed]
+                if remaining:
+                    bucket_map[token] = remaining
+                else:
+                    del bucket_map[token]
+            for domain in [domain for domain, domain_buckets in scoped.items() if not domain_buckets]:
+                del scoped[domain]
+
+        covered = self.blocked_domains.drop_covered() + self.exception_domains.drop_covered()
+        saved = sum(
+            sys.getsizeof(rule) + sys.getsizeof(rule.text) + sys.getsizeof(rule.source)
+            for rule in removed.values()
+        )
+        saved += sum(sys.getsizeof(name) for name in covered)
+
+        duplicate_selectors = 0
+        for selector_lists in (self.domain_selectors, self.generic_selector_index, {"": self.generic_selectors}):
+            for selectors in selector_lists.values():
+                unique = list(dict.fromkeys(selectors))
+                if len(unique) < len(selectors):
+                    duplicate_selectors += len(selectors) - len(unique)
+                    saved += sum(map(sys.getsizeof, selectors)) - sum(map(sys.getsizeof, unique))
+                    selectors[:] = unique
+
+        self.rule_count -= len(removed) + len(covered)
+        self.cosmetic_count -= duplicate_selectors
+        self._generic_css = None
+        self.decision_cache.clear()
+        self.site_css_cache.clear()
+        self.first_party_cache.clear()
+        self._option_domains = None
+        self.optimization = OptimizationReport(duplicates, len(covered), shadowed, duplicate_selectors, saved)
+        return self.optimization
+
+    def _confined_to_blocked_host(self, rule: NetworkRule) -> bool:
+        """Whether every URL *rule* matches has a host under ``blocked_domains``.
+
+        ``||host^`` and ``||host/`` pin the request host to ``host`` or one of
+        its subdomains.  The ``^`` could also match an ``@`` in user info, but
+        Chromium refuses subresource URLs with embedded credentials.
+        """
+        if rule.kind == "host":
+            text = rule.source
+        elif rule.kind == "regex" and rule.source.startswith("||"):
+            text = rule.source[2:].lower()
+        else:
+            return False
+        host, separator, _rest = text.partition("/")
+        host, caret, _ = host.partition("^")
+        if not (separator or caret) or not self._DOMAIN_OPTION_RE.match(host):
+            return False
+        return self.blocked_domains.match_suffix(host) is not None
 
     @classmethod
     def _parse_options(
         cls, options: str
-    ) -> tuple[frozenset[str], frozenset[str], bool | None] | None:
+    ) -> tuple[frozenset[str], frozenset[str], bool | None, frozenset[str], frozenset[str]] | None:
         include_types: set[str] = set()
         exclude_types: set[str] = set()
         third_party: bool | None = None
+        include_domains: set[str] = set()
+        exclude_domains: set[str] = set()
         if not options:
-            return frozenset(), frozenset(), None
+            return _type_set(()), _type_set(()), None, _NO_DOMAINS, _NO_DOMAINS
         for raw_option in options.split(","):
             option = raw_option.strip().lower()
+            if option.startswith("domain="):
+                for entry in option[len("domain="):].split("|"):
+                    domain = entry.strip()
+                    target = exclude_domains if domain.startswith("~") else include_domains
+                    domain = domain.lstrip("~").strip(".")
+                    # Entity domains such as ``example.*`` are not supported.
+                    if not cls._DOMAIN_OPTION_RE.match(domain):
+                        return None
+                    target.add(domain)
+                continue
             negated = option.startswith("~")
             if negated:
                 option = option[1:]
@@ -234,9 +1345,15 @@ class FilterRuleSet:
                 exclude_types.add(option)
             else:
                 include_types.add(option)
-        if include_types & exclude_types:
+        if include_types & exclude_types or include_domains & exclude_domains:
             return None
-        return frozenset(include_types), frozenset(exclude_types), third_party
+        return (
+            _type_set(include_types),
+            _type_set(exclude_types),
+            third_party,
+            _domain_set(include_domains),
+            _domain_set(exclude_domains),
+        )
 
     def _parse_cosmetic(self, line: str) -> None:
         domains_part, _, selector = line.partition("##")
@@ -246,7 +1363,11 @@ class FilterRuleSet:
             return
         domains_part = domains_part.strip().lower()
         if not domains_part:
-            if len(self.generic_selectors) < self.GENERIC_SELECTOR_CAP:
+            key = self._selector_key(selector)
+            if key is not None:
+                self.generic_selector_index.setdefault(key, []).append(selector)
+                self.cosmetic_count += 1
+            elif len(self.generic_selectors) < self.GENERIC_SELECTOR_CAP:
                 self.generic_selectors.append(selector)
                 self.cosmetic_count += 1
             else:
@@ -274,19 +1395,74 @@ class FilterRuleSet:
             blocks.append(", ".join(chunk) + " { display: none !important; }")
         return "\n".join(blocks)
 
-    def cosmetic_css_for(self, host: str) -> str:
+    @classmethod
+    def _selector_key(cls, selector: str) -> str | None:
+        """Return the ``#id``/``.class`` a page needs before *selector* can match.
+
+        Only a leading id or class qualifies; selector lists and escaped
+        identifiers are left unindexed.
+        """
+        if "," in selector or "\\" in selector:
+            return None
+        match = cls._SELECTOR_KEY_RE.match(selector)
+        return match.group() if match else None
+
+    def generic_cosmetic_css_for(self, keys: Iterable[str]) -> str:
+        """Return the indexed generic selectors for the ids/classes seen in a page."""
+        index = self.generic_selector_index
+        return self._css_block(
+            [selector for key in keys for selector in index.get(key, ())]
+        )
+
+    def generic_cosmetic_css(self) -> str:
+        """Return the stylesheet for unindexed selectors that apply on every page."""
         if self._generic_css is None:
             self._generic_css = self._css_block(self.generic_selectors)
-        site_selectors: list[str] = []
-        if host:
-            parts = host.lower().strip(".").split(".")
-            for index in range(len(parts)):
-                site_selectors.extend(self.domain_selectors.get(".".join(parts[index:]), ()))
-        site_css = self._css_block(site_selectors) if site_selectors else ""
-        return "\n".join(part for part in (site_css, self._generic_css) if part)
+        return self._generic_css
+
+    def site_cosmetic_css(self, host: str) -> str:
+        """Return only the site-specific stylesheet for *host*.
+
+        Hosts whose selectors come from the same domains share one cached
+        stylesheet, so most navigations reuse an already built string.
+        """
+        if not host or not self.domain_selectors:
+            return ""
+        parts = host.lower().strip(".").split(".")
+        domains = tuple(
+            domain
+            for domain in (".".join(parts[index:]) for index in range(len(parts)))
+            if domain in self.domain_selectors
+        )
+        if not domains:
+            return ""
+        css = self.site_css_cache.get(domains)
+        if css is None:
+            css = self._css_block(
+                [selector for domain in domains for selector in self.domain_selectors[domain]]
+            )
+            self.site_css_cache.put(domains, css)
+        return css
+
+    def cosmetic_css_for(self, host: str) -> str:
+        return "\n".join(
+            part for part in (self.site_cosmetic_css(host), self.generic_cosmetic_css()) if part
+        )
 
     @staticmethod
-    def _compile_pattern(body: str) -> re.Pattern[str] | None:
+    def _compile_pattern(
+        body: str,
+    ) -> tuple[Literal["substring", "prefix", "host", "regex"], str, bool] | None:
+        """Classify *body* and return ``(kind, source, end_anchor)``.
+
+        Leading ``*`` on unanchored patterns and trailing ``*`` without an end
+        anchor are no-ops and are dropped before classifying; anything that
+        still contains ``*`` stays a ``regex`` rule whose source is *body* with
+        runs of ``*`` collapsed.  Patterns with more than
+        ``MAX_PATTERN_WILDCARDS`` wildcards are rejected.
+        """
+        if "**" in body:
+            body = _WILDCARD_RUN_RE.sub("*", body)
         text = body
         host_anchor = anchor_start = anchor_end = False
         if text.startswith("||"):
@@ -300,38 +1476,197 @@ class FilterRuleSet:
             text = text[:-1]
         if not text:
             return None
-        parts: list[str] = []
-        for char in text:
-            if char == "*":
-                parts.append(".*")
-            elif char == "^":
-                parts.append(r"(?:[^a-zA-Z0-9_.%-]|$)")
-            else:
-                parts.append(re.escape(char))
-        regex = "".join(parts)
-        if host_anchor:
-            regex = r"^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?" + regex
-        elif anchor_start:
-            regex = "^" + regex
-        if anchor_end:
-            regex += "$"
-        try:
-            return re.compile(regex, re.IGNORECASE)
-        except re.error:
+        literal = text if host_anchor or anchor_start else text.lstrip("*")
+        literal = literal if anchor_end else literal.rstrip("*")
+        if "*" not in literal:
+            kind: Literal["substring", "prefix", "host"] = (
+                "host" if host_anchor else "prefix" if anchor_start else "substring"
+            )
+            return kind, literal.lower(), anchor_end
+        if literal.count("*") > MAX_PATTERN_WILDCARDS:
             return None
+        return "regex", body, False
+
+    @staticmethod
+    def _rule_body(rule_text: str) -> str:
+        text = rule_text[2:] if rule_text.startswith("@@") else rule_text
+        return text.partition("$")[0]
+
+    def _candidate_tokens(self, body: str) -> tuple[str, ...]:
+        """Return the distinct tokens any URL matched by *body* must contain.
+
+        A run touching ``*`` may continue into arbitrary URL text and so is not
+        a complete URL token; such runs are skipped, as uBlock Origin does.
+        """
+        lowered = body.lower()
+        tokens: dict[str, None] = {}
+        for match in self._TOKEN_RE.finditer(lowered):
+            start, end = match.span()
+            if (start and lowered[start - 1] == "*") or lowered[end : end + 1] == "*":
+                continue
+            token = match.group()
+            if token not in self._UNINDEXABLE_TOKENS:
+                tokens[token] = None
+        return tuple(tokens)
+
+    @staticmethod
+    def _first_match(
+        url_text: str,
+        lowered: str,
+        authority: tuple[int, int] | None,
+        tokens: Iterable[str],
+        buckets: dict[str, list[NetworkRule]],
+        scoped: Iterable[dict[str, list[NetworkRule]]],
+        generic: Iterable[NetworkRule],
+        resource_type: str,
+        third_party: bool | None,
+        first_party_domains: tuple[str, ...],
+    ) -> NetworkRule | None:
+        for token in tokens:
+            for rule in buckets.get(token, ()):
+                if rule.matches(url_text, lowered, authority, resource_type, third_party, first_party_domains):
+                    return rule
+        for domain_buckets in scoped:
+            for token in tokens:
+                for rule in domain_buckets.get(token, ()):
+                    if rule.matches(url_text, lowered, authority, resource_type, third_party, first_party_domains):
+                        return rule
+            for rule in domain_buckets.get("", ()):
+                if rule.matches(url_text, lowered, authority, resource_type, third_party, first_party_domains):
+                    return rule
+        for rule in generic:
+            if rule.matches(url_text, lowered, authority, resource_type, third_party, first_party_domains):
+                return rule
+        return None
 
-    def _pick_token(self, body: str) -> str | None:
-        tokens: list[str] = []
-        for segment in re.split(r"[*^|]", body.lower()):
-            tokens.extend(self._TOKEN_RE.findall(segment))
-        tokens = [token for token in tokens if token not in {"http", "https", "www"}]
-        return max(tokens, key=len) if tokens else None
+    def network_rules(self) -> Iterable[NetworkRule]:
+        """Yield every indexed network rule; ``$domain=`` rules once per domain."""
+        for buckets in (self.token_buckets, self.exception_token_buckets):
+            for bucket in buckets.values():
+                yield from bucket
+        for scoped in (self.domain_token_buckets, self.domain_exception_token_buckets):
+            for domain_buckets in scoped.values():
+                for bucket in domain_buckets.values():
+                    yield from bucket
+        yield from self.generic_patterns
+        yield from self.generic_exceptions
 
-    def _matching_rules(self, url_text: str, buckets: dict[str, list[NetworkRule]], generic: Iterable[NetworkRule]) -> Iterable[NetworkRule]:
+    def quarantined_rules(self) -> list[str]:
+        """Return the text of every rule the match watchdog has quarantined."""
+        return sorted({rule.text for rule in self.network_rules() if rule.kind == "regex" and rule.quarantined})
+
+    def _first_party_scope(self, first_party_host: str) -> tuple[Any, ...]:
+        """Return ``(domains, option domains, scoped exceptions, scoped blocks)``.
+
+        *domains* are the first-party host and its parents, longest first;
+        *option domains* are those named by some ``$domain=`` option, which is
+        all that can make two hosts of one site decide differently.
+        """
+        scope = self.first_party_cache.get(first_party_host)
+        if scope is None:
+            if self._option_domains is None:
+                self._option_domains = frozenset(
+                    self.domain_token_buckets.keys() | self.domain_exception_token_buckets.keys()
+                ).union(*(rule.exclude_domains for rule in self.network_rules() if rule.exclude_domains))
+            labels = first_party_host.lower().strip(".").split(".") if first_party_host else []
+            domains = tuple(".".join(labels[index:]) for index in range(len(labels)))
+            scope = (
+                domains,
+                tuple(domain for domain in domains if domain in self._option_domains),
+                tuple(
+                    self.domain_exception_token_buckets[domain]
+                    for domain in domains
+                    if domain in self.domain_exception_token_buckets
+                ),
+                tuple(
+                    self.domain_token_buckets[domain] for domain in domains if domain in self.domain_token_buckets
+                ),
+            )
+            self.first_party_cache.put(first_party_host, scope)
+        return scope
+
+    def evaluate(
+        self,
+        url_text: str,
+        host: str,
+        resource_type: Any = "other",
+        first_party_host: str = "",
+    ) -> FilterDecision:
+        """Decide one request in a single pass over exceptions, then blocks.
+
+        The URL is lowered and tokenized, the third-party relation derived, and
+        the resource type mapped exactly once; every later stage reuses them.
+        Repeated requests are answered from a bounded LRU keyed by URL,
+        resource type, first-party site, and whichever first-party domains
+        ``$domain=`` options name.
+        """
+        request_type = resource_type_name(resource_type)
+        if self._pending_rules:
+            self.finalize()
+        scope = self._first_party_scope(first_party_host)
+        if len(url_text) > self.DECISION_CACHE_MAX_URL:
+            decision = self._evaluate_uncached(url_text, host, request_type, first_party_host, scope)
+        else:
+            key = (url_text, request_type, _site_key(first_party_host), scope[1])
+            decision = self.decision_cache.get(key)
+            if decision is None:
+                decision = self._evaluate_uncached(url_text, host, request_type, first_party_host, scope)
+                self.decision_cache.put(key, decision)
+        stats = self.hit_stats
+        if stats is not None and decision.rule:
+            stats.hits[decision.rule] += 1
+        return decision
+
+    def _evaluate_uncached(
+        self, url_text: str, host: str, request_type: str, first_party_host: str, scope: tuple[Any, ...]
+    ) -> FilterDecision:
+        exception_domain = domain_suffix_match(host, self.exception_domains)
+        if exception_domain is not None:
+            return FilterDecision(False, "exception", f"@@||{exception_domain}^")
         lowered = url_text.lower()
-        for token in set(self._TOKEN_RE.findall(lowered)):
-            yield from buckets.get(token, ())
-        yield from generic
+        tokens = set(self._TOKEN_RE.findall(lowered))
+        authority = url_authority(lowered)
+        stats = self.hit_stats
+        if stats is not None:
+            probes = stats.bucket_probes
+            probes[""] += 1
+            for token in tokens:
+                if token in self.exception_token_buckets or token in self.token_buckets:
+                    probes[token] += 1
+        third_party = is_third_party_request(host, first_party_host)
+        first_party_domains, _option_domains, scoped_exceptions, scoped_blocks = scope
+        rule = self._first_match(
+            url_text,
+            lowered,
+            authority,
+            tokens,
+            self.exception_token_buckets,
+            scoped_exceptions,
+            self.generic_exceptions,
+            request_type,
+            third_party,
+            first_party_domains,
+        )
+        if rule is not None:
+            return FilterDecision(False, "exception", rule.text)
+        blocked_domain = domain_suffix_match(host, self.blocked_domains)
+        if blocked_domain is not None:
+            return FilterDecision(True, "domain", f"||{blocked_domain}^")
+        rule = self._first_match(
+            url_text,
+            lowered,
+            authority,
+            tokens,
+            self.token_buckets,
+            scoped_blocks,
+            self.generic_patterns,
+            request_type,
+            third_party,
+            first_party_domains,
+        )
+        if rule is not None:
+            return FilterDecision(True, "pattern", rule.text)
+        return NO_MATCH
 
     def allows_request(
         self,
@@ -340,15 +1675,8 @@ class FilterRuleSet:
         resource_type: str = "other",
         first_party_host: str = "",
     ) -> bool:
-        if domain_suffix_match(host, self.exception_domains) is not None:
-            return True
-        third_party = is_third_party_request(host, first_party_host)
-        return any(
-            rule.matches(url_text, resource_type, third_party)
-            for rule in self._matching_rules(
-                url_text, self.exception_token_buckets, self.generic_exceptions
-            )
-        )
+        """Compatibility helper: whether an exception rule covers the request."""
+        return self.evaluate(url_text, host, resource_type, first_party_host).reason == "exception"
 
     def is_exception_host(self, host: str) -> bool:
         """Compatibility helper for unconditional hostname exceptions."""
@@ -361,13 +1689,37 @@ class FilterRuleSet:
         resource_type: str = "other",
         first_party_host: str = "",
     ) -> bool:
-        if self.allows_request(url_text, host, resource_type, first_party_host):
-            return False
-        if domain_suffix_match(host, self.blocked_domains) is not None:
-            return True
-        third_party = is_third_party_request(host, first_party_host)
-        return any(
-            rule.matches(url_text, resource_type, third_party)
-            for rule in self._matching_rules(url_text, self.token_buckets, self.generic_patterns)
-        )
+        """Compatibility helper returning only ``evaluate(...).blocked``."""
+        return self.evaluate(url_text, host, resource_type, first_party_host).blocked
+
+
+def set_quarantine_listener(listener: Callable[[str], None] | None) -> None:
+    """Report every rule the match watchdog quarantines to *listener* from now on."""
+    global _quarantine_listener
+    _quarantine_listener = listener
+
 
+def request_block_key(
+    rules: FilterRuleSet | None,
+    block_list: Collection[str] | DomainIndex,
+    url_text: str,
+    host: str,
+    resource_type: Any = "other",
+    first_party_host: str = "",
+) -> str | None:
+    """Return the interceptor's blocked-by key for a request, or ``None`` to allow it.
+
+    A filter-list exception overrides the built-in domain blocklist; otherwise
+    a blocklisted host suffix is reported before a matching pattern rule.
+    """
+    decision = (
+        rules.evaluate(url_text, host, resource_type, first_party_host) if rules is not None else None
+    )
+    if decision is not None and decision.reason == "exception":
+        return None
+    match = domain_suffix_match(host, block_list)
+    if match:
+        return match
+    if decision is not None and decision.blocked:
+        return host or "pattern-rule"
+    return None
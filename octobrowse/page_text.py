@@ -0,0 +1,124 @@
+"""Per-tab cache of cleaned page text, its chunks, and its Q&A index.
+
+Summaries, page Q&A, reader view, insights, and read aloud all read the
+visible text of a tab. Fetching it copies the whole page out of the
+renderer process and cleaning it is linear in its size, so a tab's text is
+fetched once and shared until the tab navigates or finishes loading again.
+A refetch whose content hash is unchanged keeps the cleaned text, chunks, and
+index. Entries are keyed by tab and privacy mode, so private and standard
+tabs never share one, and least recently used entries are evicted past a
+byte budget.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sys
+from collections import OrderedDict
+from typing import Hashable
+
+from .ai_context import ChunkIndex, SourceChunk, clean_page_text, split_page_text
+
+
+PAGE_TEXT_CACHE_BYTES = 48 * 2**20
+
+
+def content_digest(text: str) -> bytes:
+    """Return the hash that decides whether a refetched page text changed."""
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+class PageText:
+    """Cleaned text of one page load; chunks and index are built on first use."""
+
+    __slots__ = ("url", "digest", "cleaned", "_title", "_chunks", "_chunk_bytes", "_index")
+
+    def __init__(self, url: str, digest: bytes, cleaned: str) -> None:
+        self.url = url
+        self.digest = digest
+        self.cleaned = cleaned
+        self._title: str | None = None
+        self._chunks: list[SourceChunk] = []
+        self._chunk_bytes = 0
+        self._index: ChunkIndex | None = None
+
+    def chunks(self, title: str) -> list[SourceChunk]:
+        """Return the page's source chunks, labelled with *title*."""
+        if self._title != title:
+            self._chunks = split_page_text(self.cleaned, title=title, url=self.url, pre_cleaned=True)
+            self._chunk_bytes = sum(sys.getsizeof(chunk.text) for chunk in self._chunks)
+            self._index = None
+            self._title = title
+        return self._chunks
+
+    def index(self, title: str) -> ChunkIndex:
+        """Return the Q&A index over ``chunks(title)``."""
+        chunks = self.chunks(title)
+        if self._index is None:
+            self._index = ChunkIndex(chunks)
+        return self._index
+
+    @property
+    def size(self) -> int:
+        """Approximate bytes held: the text, its chunk copies, and the index's token text."""
+        return sys.getsizeof(self.cleaned) + self._chunk_bytes * (2 if self._index is not None else 1)
+
+
+class PageTextCache:
+    """LRU map from ``(tab, private)`` to the ``PageText`` of its current load."""
+
+    def __init__(self, max_bytes: int = PAGE_TEXT_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[Hashable, bool], PageText] = OrderedDict()
+        self._fresh: set[tuple[Hashable, bool]] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, tab: Hashable, url: str, private: bool) -> PageText | None:
+        """Return *tab*'s text if it was fetched since the tab last navigated or loaded."""
+        key = (tab, private)
+        entry = self._entries.get(key)
+        if entry is None or key not in self._fresh or entry.url != url:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def store(self, tab: Hashable, url: str, private: bool, text: str) -> PageText:
+        """Record freshly fetched *text* for *tab*, reusing the entry if the content is unchanged."""
+        key = (tab, private)
+        digest = content_digest(text)
+        entry = self._entries.get(key)
+        if entry is None or entry.url != url or entry.digest != digest:
+            entry = PageText(url, digest, clean_page_text(text))
+            self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._fresh.add(key)
+        self.trim()
+        return entry
+
+    def invalidate(self, tab: Hashable) -> None:
+        """Mark *tab*'s text stale; the next fetch may still reuse its cleaned form."""
+        self._fresh.discard((tab, False))
+        self._fresh.discard((tab, True))
+
+    def discard(self, tab: Hashable) -> None:
+        for key in ((tab, False), (tab, True)):
+            self._entries.pop(key, None)
+            self._fresh.discard(key)
+
+    def trim(self) -> None:
+        """Evict least recently used entries until the cache fits its budget.
+
+        Entries grow when their chunks and index are built, so callers trim
+        again after using them. The most recent entry is always kept.
+        """
+        total = sum(entry.size for entry in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self._fresh.discard(key)
+            total -= entry.size
@@ -0,0 +1,44 @@
+"""Worker processes for parsing filter lists.
+
+A spawned process re-runs the launching script before it can unpickle any
+work, which for the browser means importing Qt WebEngine, OpenAI, and speech
+recognition just to parse text.  Processes started by ``filter_parse_pool``
+run this module in its place, so a worker only imports ``filter_cache`` and
+``filtering`` once its first shard arrives.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.context import SpawnContext, SpawnProcess
+
+_launch_lock = threading.Lock()
+
+
+class _ParseProcess(SpawnProcess):
+    @staticmethod
+    def _Popen(process_obj):
+        # A new process imports whatever ``__main__`` is while it is launched;
+        # stand in for the launching script for just that moment.
+        with _launch_lock:
+            main_module = sys.modules["__main__"]
+            sys.modules["__main__"] = sys.modules[__name__]
+            try:
+                return SpawnProcess._Popen(process_obj)
+            finally:
+                sys.modules["__main__"] = main_module
+
+
+class _ParseContext(SpawnContext):
+    Process = _ParseProcess
+
+
+def filter_parse_pool(processes: int) -> ProcessPoolExecutor:
+    """Return a pool of up to *processes* lightweight filter-parsing workers.
+
+    Workers start on first use, so an unused pool costs nothing; shut it down
+    once parsing finishes.
+    """
+    return ProcessPoolExecutor(processes, mp_context=_ParseContext())
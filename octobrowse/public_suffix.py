@@ -0,0 +1,139 @@
+"""Registrable-domain ("site") lookup backed by the bundled Public Suffix List.
+
+``data/public_suffix_list.dat.gz`` is a gzip copy of
+https://publicsuffix.org/list/public_suffix_list.dat (MPL-2.0), including the
+private section, so hosting suffixes such as ``github.io`` and
+``s3.amazonaws.com`` separate their tenants into distinct sites.  The list is
+parsed into a label trie on first use; results are memoized per host.
+"""
+
+from __future__ import annotations
+
+import gzip
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+
+PUBLIC_SUFFIX_DATA = Path(__file__).with_name("data") / "public_suffix_list.dat.gz"
+SITE_KEY_CACHE_SIZE = 8192
+
+# Used only when the bundled list is missing or unreadable, e.g. a source
+# checkout without package data.  Exact/subdomain checks in the filter engine
+# still cover intranet and custom suffixes.
+COMMON_MULTI_LABEL_SUFFIXES = {
+    "ac.uk", "co.uk", "gov.uk", "ltd.uk", "me.uk", "net.uk", "org.uk", "plc.uk",
+    "asn.au", "com.au", "edu.au", "gov.au", "id.au", "net.au", "org.au",
+    "ac.nz", "co.nz", "govt.nz", "net.nz", "org.nz",
+    "co.jp", "ne.jp", "or.jp",
+    "com.br", "com.cn", "com.hk", "com.mx", "com.sg", "com.tr", "co.za",
+}
+
+# Trie nodes map a label to its child node.  The ``None`` key marks a node
+# that ends a rule: ``_RULE`` for a suffix, ``_EXCEPTION`` for a ``!`` rule.
+_RULE = 1
+_EXCEPTION = -1
+_Node = dict
+
+
+def _ascii_rule(rule: str) -> str | None:
+    try:
+        return rule.encode("idna").decode("ascii")
+    except UnicodeError:
+        return None
+
+
+def parse_public_suffix_rules(lines: Iterable[str]) -> _Node:
+    """Build a suffix trie from PSL-format lines (comments and blanks skipped).
+
+    Internationalized rules are added in both Unicode and ``xn--`` form
+    because hosts may arrive in either.
+    """
+    root: _Node = {}
+    for line in lines:
+        rule = line.split(None, 1)[0].lower() if line.strip() else ""
+        if not rule or rule.startswith("//"):
+            continue
+        flag = _RULE
+        if rule.startswith("!"):
+            flag, rule = _EXCEPTION, rule[1:]
+        variants = {rule}
+        if not rule.isascii() and "*" not in rule:
+            ascii_rule = _ascii_rule(rule)
+            if ascii_rule is not None:
+                variants.add(ascii_rule)
+        for variant in variants:
+            node = root
+            for label in reversed(variant.split(".")):
+                node = node.setdefault(sys.intern(label), {})
+            node[None] = flag
+    return _share_leaves(root)
+
+
+def _share_leaves(node: _Node) -> _Node:
+    # Most rules are leaves; one shared ``{None: _RULE}`` saves a dict apiece.
+    leaf: _Node = {None: _RULE}
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        for label, child in current.items():
+            if label is None:
+                continue
+            if child == leaf:
+                current[label] = leaf
+            else:
+                stack.append(child)
+    return node
+
+
+@lru_cache(maxsize=1)
+def public_suffix_trie() -> _Node:
+    """Return the bundled list's trie, falling back to common suffixes."""
+    try:
+        with gzip.open(PUBLIC_SUFFIX_DATA, "rt", encoding="utf-8") as handle:
+            trie = parse_public_suffix_rules(handle)
+    except (OSError, EOFError, UnicodeDecodeError):
+        trie = {}
+    if not trie:
+        trie = parse_public_suffix_rules(COMMON_MULTI_LABEL_SUFFIXES)
+    return trie
+
+
+def public_suffix_length(labels: list[str], trie: _Node | None = None) -> int:
+    """Return how many trailing *labels* form the public suffix (at least 1)."""
+    node = public_suffix_trie() if trie is None else trie
+    matched = 1  # the implicit "*" rule: an unlisted TLD is a public suffix
+    for depth, label in enumerate(reversed(labels), 1):
+        wildcard = node.get("*")
+        if wildcard is not None and wildcard.get(None) == _RULE:
+            matched = depth
+        child = node.get(label)
+        if child is None:
+            break
+        flag = child.get(None)
+        if flag == _EXCEPTION:
+            return depth - 1
+        if flag == _RULE:
+            matched = depth
+        node = child
+    return matched
+
+
+@lru_cache(maxsize=SITE_KEY_CACHE_SIZE)
+def site_key(host: str) -> str:
+    """Return the registrable domain of *host* (eTLD+1), or the host itself.
+
+    IP addresses, single labels, and hosts that are themselves public
+    suffixes are their own site.
+    """
+    host = host.lower().strip(".")
+    if not host or ":" in host:
+        return host
+    labels = host.split(".")
+    if len(labels) == 1 or all(part.isdigit() for part in labels):
+        return host
+    suffix_length = public_suffix_length(labels)
+    if suffix_length >= len(labels):
+        return host
+    return ".".join(labels[-suffix_length - 1:])
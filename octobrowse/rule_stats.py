@@ -0,0 +1,178 @@
+"""Persisted filter-rule usage counters, the rule report, and personal lists.
+
+While counting is on, every ``FilterRuleSet`` the interceptor uses shares one
+``RuleHitStats``.  The counters are saved as JSON beside the settings so they
+accumulate across sessions and list updates; rules that leave the lists are
+simply no longer reported.  A personal list keeps only the network rules that
+ever decided a request, so users who browse a narrow set of sites can replace
+EasyList-sized lists with a few hundred rules.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+from .filtering import FilterRuleSet, NetworkRule, RuleHitStats
+
+
+RULE_STATS_FILE = "filter-rule-stats.json"
+REPORT_LIMIT = 50
+# ``FilterDecision.rule`` text of a hostname rule; those live in a hashed
+# DomainIndex, so unlike pattern rules they cannot be listed when never hit.
+_HOSTNAME_RULE_RE = re.compile(r"^(@@)?\|\|([a-z0-9.-]+)\^$")
+
+
+@dataclass(frozen=True)
+class BucketCost:
+    """How often a token bucket was scanned and how much regex work it holds."""
+
+    token: str
+    probes: int
+    rules: int
+    regex_rules: int
+
+    @property
+    def regex_tests(self) -> int:
+        """Worst-case regex evaluations: every probe scanning every regex rule."""
+        return self.probes * self.regex_rules
+
+
+@dataclass(frozen=True)
+class RuleReport:
+    """Snapshot of rule usage for the ``octo:filters`` page."""
+
+    network_rules: int
+    hit_network_rules: int
+    hostname_rules: int
+    hit_hostname_rules: int
+    hot_rules: list[tuple[str, int]]
+    never_hit: list[str]
+    expensive_buckets: list[BucketCost]
+
+
+def read_rule_stats(path: Path) -> tuple[bool, RuleHitStats]:
+    """Load ``(counting enabled, counters)``; a missing or malformed file is off and empty."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False, RuleHitStats()
+    if not isinstance(data, dict):
+        return False, RuleHitStats()
+
+    def counter(value: object) -> Counter[str]:
+        if not isinstance(value, dict):
+            return Counter()
+        return Counter(
+            {str(key): count for key, count in value.items() if isinstance(count, int) and count > 0}
+        )
+
+    return bool(data.get("enabled", False)), RuleHitStats(
+        counter(data.get("hits")), counter(data.get("bucket_probes"))
+    )
+
+
+def write_rule_stats(path: Path, stats: RuleHitStats, enabled: bool) -> bool:
+    """Atomically write the counters; return ``False`` on I/O failure."""
+    # dict() copies in one step, so the interceptor thread may keep counting.
+    payload = {
+        "enabled": enabled,
+        "hits": dict(stats.hits),
+        "bucket_probes": dict(stats.bucket_probes),
+    }
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(payload, sort_keys=True), encoding="utf-8")
+        tmp_path.replace(path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def _distinct_network_rules(rules: FilterRuleSet) -> dict[str, NetworkRule]:
+    return {rule.text: rule for rule in rules.network_rules()}
+
+
+def _hit_hostname_rules(rules: FilterRuleSet, hits: dict[str, int]) -> set[str]:
+    kept = set()
+    for text in hits:
+        match = _HOSTNAME_RULE_RE.match(text)
+        if match is None:
+            continue
+        index = rules.exception_domains if match.group(1) else rules.blocked_domains
+        if match.group(2) in index:
+            kept.add(text)
+    return kept
+
+
+def rule_report(rules: FilterRuleSet, stats: RuleHitStats, limit: int = REPORT_LIMIT) -> RuleReport:
+    """Summarize which of *rules* were used according to *stats*.
+
+    Hot rules and never-hit rules cover the loaded rules only.  Buckets are
+    ranked by ``BucketCost.regex_tests``, an upper bound, since a scan stops
+    at the first matching rule.
+    """
+    rules.finalize()
+    hits = dict(stats.hits)
+    network = _distinct_network_rules(rules)
+    hostname_hits = _hit_hostname_rules(rules, hits)
+    hot = sorted(
+        ((text, count) for text, count in hits.items() if text in network or text in hostname_hits),
+        key=lambda item: (-item[1], item[0]),
+    )
+    never_hit = sorted(text for text in network if text not in hits)
+
+    costs = []
+    for token, probes in dict(stats.bucket_probes).items():
+        if token:
+            bucket = [*rules.exception_token_buckets.get(token, ()), *rules.token_buckets.get(token, ())]
+        else:
+            bucket = [*rules.generic_exceptions, *rules.generic_patterns]
+        regex_rules = sum(rule.kind == "regex" for rule in bucket)
+        if regex_rules:
+            costs.append(BucketCost(token, probes, len(bucket), regex_rules))
+    costs.sort(key=lambda cost: (-cost.regex_tests, cost.token))
+
+    return RuleReport(
+        network_rules=len(network),
+        hit_network_rules=len(network) - len(never_hit),
+        hostname_rules=len(rules.blocked_domains) + len(rules.exception_domains),
+        hit_hostname_rules=len(hostname_hits),
+        hot_rules=hot[:limit],
+        never_hit=never_hit,
+        expensive_buckets=costs[:limit],
+    )
+
+
+def personal_filter_list(rules: FilterRuleSet, stats: RuleHitStats, title: str = "Personal filter list") -> str:
+    """Return an Adblock-format list of the loaded network rules that ever matched.
+
+    Element-hiding rules are kept in full because the interceptor cannot see
+    whether a selector hid anything.
+    """
+    rules.finalize()
+    hits = dict(stats.hits)
+    hostnames = _hit_hostname_rules(rules, hits)
+    network = [text for text in _distinct_network_rules(rules) if text in hits]
+    lines = [
+        "[Adblock Plus 2.0]",
+        f"! Title: {title}",
+        f"! {len(hostnames) + len(network)} network rules that matched at least once",
+    ]
+    lines += sorted(hostnames)
+    lines += sorted(network)
+    generic = set(rules.generic_selectors)
+    for selectors in rules.generic_selector_index.values():
+        generic.update(selectors)
+    lines += [f"##{selector}" for selector in sorted(generic)]
+    lines += [
+        f"{domain}##{selector}"
+        for domain, selectors in sorted(rules.domain_selectors.items())
+        for selector in selectors
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,205 @@
+"""Conditional, streaming downloads of filter-list subscriptions.
+
+Each subscription is requested with the ``ETag`` and ``Last-Modified``
+validators saved from its previous download, so an unchanged list costs one
+``304 Not Modified`` round trip and no reparse.  Bodies are requested
+gzip-compressed, decompressed while they stream into a temporary file beside
+the destination, and moved into place only once complete, so a failed or
+truncated download never replaces a working list.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import time
+import zlib
+from dataclasses import asdict, dataclass, replace
+from http.client import HTTPException
+from pathlib import Path
+from typing import Collection
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+
+SUBSCRIPTION_STATE_FILE = "subscriptions.json"
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+MAX_LIST_BYTES = 64 * 1024 * 1024
+DEFAULT_TIMEOUT = 30.0
+_FILE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class SubscriptionError(Exception):
+    """A subscription could not be downloaded; the previous copy is kept."""
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """A list URL plus the validators and time of its last successful check."""
+
+    url: str
+    etag: str = ""
+    last_modified: str = ""
+    checked_at: float = 0.0
+
+
+@dataclass(frozen=True)
+class DownloadResult:
+    """Outcome of one check; ``changed`` is ``False`` for ``304 Not Modified``."""
+
+    subscription: Subscription
+    changed: bool
+    size: int = 0
+
+
+def subscription_file_name(url: str, taken: Collection[str] = ()) -> str:
+    """Return a ``.txt`` file name for the list at *url* that is not in *taken*."""
+    parsed = urlsplit(url)
+    stem = Path(parsed.path).stem or parsed.hostname or "subscription"
+    stem = _FILE_NAME_RE.sub("-", stem).strip(".-") or "subscription"
+    name, counter = f"{stem}.txt", 1
+    while name in taken:
+        counter += 1
+        name = f"{stem}-{counter}.txt"
+    return name
+
+
+def read_subscriptions(path: Path) -> dict[str, Subscription]:
+    """Load ``{list file name: Subscription}``; a missing or malformed file is empty."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    subscriptions = {}
+    for name, entry in data.items():
+        if not isinstance(entry, dict) or not isinstance(entry.get("url"), str):
+            continue
+        try:
+            checked_at = float(entry.get("checked_at") or 0.0)
+        except (TypeError, ValueError):
+            checked_at = 0.0
+        subscriptions[str(name)] = Subscription(
+            entry["url"],
+            str(entry.get("etag") or ""),
+            str(entry.get("last_modified") or ""),
+            checked_at,
+        )
+    return subscriptions
+
+
+def write_subscriptions(path: Path, subscriptions: dict[str, Subscription]) -> bool:
+    """Atomically write *subscriptions*; return ``False`` on I/O failure."""
+    payload = {name: asdict(subscription) for name, subscription in subscriptions.items()}
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+        tmp_path.replace(path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def download_subscription(
+    subscription: Subscription,
+    destination: Path,
+    timeout: float = DEFAULT_TIMEOUT,
+    user_agent: str = "",
+    max_bytes: int = MAX_LIST_BYTES,
+) -> DownloadResult:
+    """Refresh *destination* from *subscription*'s URL if the server has a newer copy.
+
+    Validators are only sent while *destination* exists, so a deleted list is
+    always downloaded again.  Raises ``SubscriptionError`` on any network,
+    HTTP, size, or decoding failure, leaving *destination* untouched.
+    """
+    if urlsplit(subscription.url).scheme.lower() not in {"http", "https"}:
+        raise SubscriptionError(f"Unsupported subscription URL: {subscription.url}")
+    headers = {"Accept-Encoding": "gzip"}
+    if user_agent:
+        headers["User-Agent"] = user_agent
+    if destination.exists():
+        if subscription.etag:
+            headers["If-None-Match"] = subscription.etag
+        if subscription.last_modified:
+            headers["If-Modified-Since"] = subscription.last_modified
+    checked_at = time.time()
+    tmp_path = destination.with_name(destination.name + ".part")
+    try:
+        with urlopen(Request(subscription.url, headers=headers), timeout=timeout) as response:
+            encoding = (response.headers.get("Content-Encoding") or "identity").strip().lower()
+            if encoding not in {"identity", "gzip", "x-gzip"}:
+                raise SubscriptionError(f"Unsupported Content-Encoding: {encoding}")
+            decoder = zlib.decompressobj(zlib.MAX_WBITS | 16) if encoding != "identity" else None
+            size = 0
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("wb") as handle:
+                while chunk := response.read(DOWNLOAD_CHUNK_BYTES):
+                    if decoder is not None:
+                        chunk = decoder.decompress(chunk, max_bytes + 1 - size)
+                        if decoder.unconsumed_tail:
+                            raise SubscriptionError("Filter list exceeds the size limit")
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise SubscriptionError("Filter list exceeds the size limit")
+                    handle.write(chunk)
+                if response.length:
+                    raise SubscriptionError("Truncated response")
+                if decoder is not None:
+                    if not decoder.eof:
+                        raise SubscriptionError("Truncated gzip response")
+                    tail = decoder.flush()
+                    size += len(tail)
+                    if size > max_bytes:
+                        raise SubscriptionError("Filter list exceeds the size limit")
+                    handle.write(tail)
+            etag = response.headers.get("ETag") or ""
+            last_modified = response.headers.get("Last-Modified") or ""
+        tmp_path.replace(destination)
+    except HTTPError as exc:
+        if exc.code == 304:
+            return DownloadResult(replace(subscription, checked_at=checked_at), changed=False)
+        raise SubscriptionError(f"HTTP {exc.code} for {subscription.url}") from exc
+    except (URLError, HTTPException, OSError, zlib.error, ValueError) as exc:
+        # HTTPException covers IncompleteRead from a connection dropped mid-body.
+        raise SubscriptionError(str(getattr(exc, "reason", exc)) or type(exc).__name__) from exc
+    finally:
+        # Already moved into place after a complete download.
+        tmp_path.unlink(missing_ok=True)
+    return DownloadResult(
+        Subscription(subscription.url, etag, last_modified, checked_at), changed=True, size=size
+    )
+
+
+def subscription_due(subscription: Subscription, path: Path, max_age: float, now: float | None = None) -> bool:
+    """Return whether *subscription* was last checked more than *max_age* seconds ago.
+
+    Lists downloaded before check times were recorded fall back to their
+    file modification time.
+    """
+    now = time.time() if now is None else now
+    checked_at = subscription.checked_at
+    if not checked_at:
+        try:
+            checked_at = path.stat().st_mtime
+        except OSError:
+            return True
+    return now - checked_at > max_age
+
+
+def subscription_summary(results: dict[str, DownloadResult], errors: dict[str, str]) -> str:
+    """Describe one update round for the status bar."""
+    changed = sorted(name for name, result in results.items() if result.changed)
+    parts = []
+    if changed:
+        parts.append(f"updated {', '.join(changed)}")
+    unchanged = len(results) - len(changed)
+    if unchanged:
+        parts.append(f"{unchanged} unchanged")
+    if errors:
+        parts.append(f"{len(errors)} failed ({'; '.join(f'{name}: {error}' for name, error in sorted(errors.items()))})")
+    return "Filter lists: " + (", ".join(parts) if parts else "no subscriptions")
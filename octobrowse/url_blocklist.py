@@ -0,0 +1,320 @@
+"""Local, Safe-Browsing-style blocklist of malicious URLs.
+
+Each listed URL expression (``host/path``) is stored as the first 64 bits of
+its SHA-256 hash, split into a sorted ``array("I")`` of 32-bit prefixes and a
+parallel array of the next 32 bits.  A lookup hashes the host-suffix and
+path-prefix expressions of a page URL, as Safe Browsing does, binary-searches
+the prefixes, and confirms a prefix hit with the second half, so a few
+million entries cost 8 bytes each and a false match needs a 64-bit collision.
+A table of where each top-16-bit value starts narrows every search to a few
+dozen prefixes.
+
+Lists are imported from local files with ``build_url_hash_list``, which
+writes a new memory-mapped file per import so a list still mapped by the
+interceptor is never replaced in place.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import ipaddress
+import mmap
+import re
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterable
+from urllib.parse import quote, unquote, urlsplit
+
+from .filtering import resource_type_name
+
+
+URL_BLOCKLIST_DIR = "url-blocklist"
+_MAGIC = b"OCTOURLH"
+_FORMAT_VERSION = 1
+# magic, format version, little-endian flag, entry count, crc32 of the arrays.
+_HEADER = struct.Struct("<8sHHQI4x")
+_BUCKET_BITS = 16
+_BUCKET_SHIFT = 32 - _BUCKET_BITS
+_BUCKETS = 1 << _BUCKET_BITS
+_HEX_HASH_RE = re.compile(r"^[0-9a-fA-F]{64}$")
+# Everything printable except "%" and "#" stays as is; the rest is escaped.
+_KEEP_CHARS = "".join(chr(code) for code in range(0x21, 0x7F) if chr(code) not in "%#")
+_NEEDS_ESCAPING_RE = re.compile(r"[^!\"$&-~]")
+# Only page loads are checked; a malicious page's subresources die with it.
+FRAME_TYPES = frozenset({"document", "subdocument"})
+
+
+def _canonical(text: str) -> str:
+    if _NEEDS_ESCAPING_RE.search(text) is None:
+        return text
+    # Unescape until stable, then escape exactly once.
+    for _ in range(8):
+        unescaped = unquote(text)
+        if unescaped == text:
+            break
+        text = unescaped
+    return quote(text, safe=_KEEP_CHARS)
+
+
+def _canonical_path(path: str) -> str:
+    segments: list[str] = []
+    for segment in path.split("/"):
+        if segment in {"", "."}:
+            continue
+        if segment == "..":
+            if segments:
+                segments.pop()
+            continue
+        segments.append(segment)
+    canonical = "/" + "/".join(segments)
+    if segments and path.endswith(("/", "/.", "/..")):
+        canonical += "/"
+    return canonical
+
+
+def _is_ip_address(host: str) -> bool:
+    # Domain names end in a letter; skip the costly failed parse for them.
+    if not host[-1].isdigit() and ":" not in host:
+        return False
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def _canonical_url(url: str) -> tuple[str, str, str | None] | None:
+    text = url.strip().replace("\t", "").replace("\r", "").replace("\n", "")
+    if "://" not in text:
+        text = "http://" + text
+    try:
+        parts = urlsplit(text)
+        host = parts.hostname or ""
+    except ValueError:
+        return None
+    host = re.sub(r"\.{2,}", ".", _canonical(host).strip(".").lower())
+    if not host:
+        return None
+    path = _canonical_path(_canonical(parts.path))
+    return host, path, _canonical(parts.query) if parts.query else None
+
+
+def url_expressions(url: str) -> list[str]:
+    """Return the ``host/path`` expressions of *url* that list entries can match.
+
+    The URL is canonicalized roughly as Safe Browsing specifies: fragment
+    and port dropped, escapes normalized, dot segments and repeated slashes
+    resolved, and the host lowered with repeated dots collapsed.  Expressions
+    pair the exact host and up to four parent domains with the exact path and
+    query, the path alone, and up to four leading directories.
+    """
+    canonical = _canonical_url(url)
+    if canonical is None:
+        return []
+    host, path, query = canonical
+
+    if _is_ip_address(host):
+        hosts = [host]
+    else:
+        # The last five labels, then successively fewer, down to two.
+        labels = host.split(".")
+        hosts = [host] + [".".join(labels[-count:]) for count in range(min(len(labels) - 1, 5), 1, -1)]
+    paths = [path + "?" + query] if query is not None else []
+    paths.append(path)
+    prefix = "/"
+    paths.append(prefix)
+    for directory in path.split("/")[1:-1][:3]:
+        prefix += directory + "/"
+        paths.append(prefix)
+    paths = list(dict.fromkeys(paths))
+    return [candidate_host + candidate_path for candidate_host in hosts for candidate_path in paths]
+
+
+def expression_hash(expression: str) -> int:
+    """Return the 64-bit hash a list stores for one URL expression."""
+    return int.from_bytes(hashlib.sha256(expression.encode("utf-8")).digest()[:8], "big")
+
+
+def list_entry_hash(line: str) -> int | None:
+    """Hash one list line: a hex SHA-256 digest or a URL expression; ``None`` to skip."""
+    line = line.strip()
+    if not line or line.startswith(("#", "!")):
+        return None
+    if _HEX_HASH_RE.match(line):
+        return int(line[:16], 16)
+    canonical = _canonical_url(line)
+    if canonical is None:
+        return None
+    # The entry itself: exact host, path and query, as ``url_expressions`` lists first.
+    host, path, query = canonical
+    return expression_hash(host + path + ("?" + query if query is not None else ""))
+
+
+class UrlHashList:
+    """Sorted 64-bit URL hashes, searched by 32-bit prefix and confirmed by the rest."""
+
+    __slots__ = ("_buckets", "_prefixes", "_suffixes", "_mapping")
+
+    def __init__(
+        self,
+        prefixes: Any = None,
+        suffixes: Any = None,
+        buckets: Any = None,
+        mapping: mmap.mmap | None = None,
+    ) -> None:
+        self._prefixes: Any = array("I") if prefixes is None else prefixes
+        self._suffixes: Any = array("I") if suffixes is None else suffixes
+        # _buckets[b] is the index of the first prefix whose top bits are >= b.
+        self._buckets: Any = _bucket_starts(self._prefixes) if buckets is None else buckets
+        self._mapping = mapping
+
+    @classmethod
+    def from_hashes(cls, hashes: Iterable[int]) -> "UrlHashList":
+        """Build an in-memory list; duplicates are dropped.
+
+        Hashes are sorted one top-byte partition at a time, so a few million
+        entries never exist as one list of Python integers.
+        """
+        partitions = [array("Q") for _ in range(256)]
+        for value in hashes:
+            partitions[value >> 56].append(value)
+        prefixes, suffixes = array("I"), array("I")
+        for partition in partitions:
+            previous = None
+            for value in sorted(partition):
+                if value != previous:
+                    prefixes.append(value >> 32)
+                    suffixes.append(value & 0xFFFFFFFF)
+                    previous = value
+            del partition[:]
+        return cls(prefixes, suffixes)
+
+    def __len__(self) -> int:
+        return len(self._prefixes)
+
+    def contains_hash(self, value: int) -> bool:
+        prefixes = self._prefixes
+        prefix = value >> 32
+        bucket = prefix >> _BUCKET_SHIFT
+        end = self._buckets[bucket + 1]
+        index = bisect_left(prefixes, prefix, self._buckets[bucket], end)
+        suffix = value & 0xFFFFFFFF
+        while index < end and prefixes[index] == prefix:
+            if self._suffixes[index] == suffix:
+                return True
+            index += 1
+        return False
+
+    def match(self, url: str) -> str | None:
+        """Return the listed expression *url* falls under, or ``None``."""
+        if not self._prefixes:
+            return None
+        for expression in url_expressions(url):
+            if self.contains_hash(expression_hash(expression)):
+                return expression
+        return None
+
+    def to_bytes(self) -> bytes:
+        body = bytes(self._buckets) + bytes(self._prefixes) + bytes(self._suffixes)
+        header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, sys.byteorder == "little", len(self), zlib.crc32(body))
+        return header + body
+
+    @classmethod
+    def open(cls, path: Path) -> "UrlHashList | None":
+        """Memory-map a list written by ``build_url_hash_list``; ``None`` if unusable."""
+        try:
+            with path.open("rb") as handle:
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(mapped) < _HEADER.size:
+                return None
+            magic, version, little_endian, count, crc = _HEADER.unpack_from(mapped)
+            if (
+                magic != _MAGIC
+                or version != _FORMAT_VERSION
+                or bool(little_endian) != (sys.byteorder == "little")
+                or len(mapped) != _HEADER.size + 4 * (_BUCKETS + 1) + 8 * count
+            ):
+                return None
+            view = memoryview(mapped)
+            if zlib.crc32(view[_HEADER.size :]) != crc:
+                return None
+            start = _HEADER.size + 4 * (_BUCKETS + 1)
+            middle = start + 4 * count
+            buckets = view[_HEADER.size : start].cast("I")
+            if buckets[0] != 0 or buckets[_BUCKETS] != count:
+                return None
+            return cls(view[start:middle].cast("I"), view[middle:].cast("I"), buckets, mapped)
+        except (OSError, ValueError):
+            return None
+
+
+def _bucket_starts(prefixes: Any) -> array:
+    starts = array("I", [0]) * (_BUCKETS + 1)
+    count = len(prefixes)
+    index = 0
+    for bucket in range(_BUCKETS):
+        starts[bucket] = index
+        # Prefixes are sorted, so each bucket starts where the previous ended.
+        index = bisect_left(prefixes, (bucket + 1) << _BUCKET_SHIFT, index, count)
+    starts[_BUCKETS] = count
+    return starts
+
+
+def frame_request_match(hashes: UrlHashList | None, url_text: str, resource_type: Any) -> str | None:
+    """Return the listed expression a main-frame or subframe request falls under.
+
+    Every other request costs one resource-type check.
+    """
+    if hashes is None or resource_type_name(resource_type) not in FRAME_TYPES:
+        return None
+    return hashes.match(url_text)
+
+
+def build_url_hash_list(source: Path, directory: Path) -> tuple[Path, int]:
+    """Import the list at *source* into a new file in *directory*.
+
+    *source* holds one URL expression (``evil.example/`` or
+    ``evil.example/phish/login.html``) or hex SHA-256 digest per line; ``#``
+    and ``!`` start comments.  Returns the new file and its entry count.
+    Older imports are removed unless they are still mapped.  Raises
+    ``OSError`` if *source* cannot be read or the result cannot be written.
+    """
+    with source.open(encoding="utf-8", errors="replace") as handle:
+        hashes = UrlHashList.from_hashes(
+            value for value in map(list_entry_hash, handle) if value is not None
+        )
+    data = hashes.to_bytes()
+    path = directory / f"urls-{hashlib.sha256(data).hexdigest()[:16]}.bin"
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    for stale in directory.glob("urls-*.bin"):
+        if stale != path:
+            try:
+                stale.unlink()
+            except OSError:
+                # Still mapped by the active list; removed after a later import.
+                pass
+    return path, len(hashes)
+
+
+def load_url_hash_list(directory: Path) -> UrlHashList | None:
+    """Open the most recent usable import in *directory*, if any."""
+    try:
+        candidates = sorted(directory.glob("urls-*.bin"), key=lambda path: path.stat().st_mtime, reverse=True)
+    except OSError:
+        return None
+    for path in candidates:
+        hashes = UrlHashList.open(path)
+        if hashes is not None:
+            return hashes
+    return None
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import html
+import random
+import re
+import unicodedata
 import unittest
+from dataclasses import replace
 
 from octobrowse.ai_context import (
     MAX_CONTEXT_CHAR_BUDGET,
+    ChunkIndex,
     SourceChunk,
     build_qa_prompt,
     build_summary_prompt,
@@ -13,10 +19,76 @@ from octobrowse.ai_context import (
     lexical_relevance_score,
     select_context_chunks,
     split_page_text,
+    _broad_coverage_order,
+    _fit_chunk_to_budget,
+)
+
+
+def reference_clean_page_text(text: str) -> str:
+    """The per-character implementation ``clean_page_text`` must reproduce."""
+    normalized = unicodedata.normalize("NFKC", str(text)).replace("\r\n", "\n").replace("\r", "\n")
+    normalized = "".join(
+        character
+        for character in normalized
+        if character in {"\n", "\t"} or unicodedata.category(character) not in {"Cc", "Cf"}
+    )
+    paragraphs: list[str] = []
+    current_lines: list[str] = []
+    for raw_line in normalized.split("\n"):
+        line = re.sub(r"[^\S\n]+", " ", raw_line).strip()
+        if line:
+            current_lines.append(line)
+        elif current_lines:
+            paragraphs.append(" ".join(current_lines))
+            current_lines = []
+    if current_lines:
+        paragraphs.append(" ".join(current_lines))
+    return "\n\n".join(paragraphs)
+
+
+def reference_escape_untrusted_content(value: str) -> str:
+    safe_value = "".join(
+        character
+        for character in str(value)
+        if character in {"\n", "\t"} or unicodedata.category(character) not in {"Cc", "Cf"}
+    )
+    return html.escape(safe_value, quote=True)
+
+
+# Whitespace, controls, format characters, NFKC-changing forms, and markup.
+ASCII_ALPHABET = "ab  \t\n\n\r\x00\x0b\x0c\x1c\x1f\x7f<>&\"'."
+UNICODE_ALPHABET = ASCII_ALPHABET + (
+    "\x85\xa0\xad\u200b\u200e\u2028\u2029\u3000\ufeff\ufb01\u2460\uff21\u00e9e\u0301"
+    "\u0600\U000e0001\U0001d173\U0001f600\ud800"
 )
 
 
 class CleanPageTextTests(unittest.TestCase):
+    def test_fast_paths_match_per_character_cleaning_exactly(self) -> None:
+        rnd = random.Random(25)
+        for alphabet in (ASCII_ALPHABET, UNICODE_ALPHABET):
+            for _ in range(1_500):
+                text = "".join(rnd.choice(alphabet) for _ in range(rnd.randrange(0, 60)))
+                self.assertEqual(
+                    clean_page_text(text).encode("utf-8", "surrogatepass"),
+                    reference_clean_page_text(text).encode("utf-8", "surrogatepass"),
+                    repr(text),
+                )
+                self.assertEqual(
+                    escape_untrusted_content(text).encode("utf-8", "surrogatepass"),
+                    reference_escape_untrusted_content(text).encode("utf-8", "surrogatepass"),
+                    repr(text),
+                )
+
+    def test_control_table_covers_every_control_and_format_character(self) -> None:
+        removable = "".join(
+            chr(code)
+            for code in range(0x110000)
+            if code not in {0x09, 0x0A} and unicodedata.category(chr(code)) in {"Cc", "Cf"}
+        )
+        self.assertEqual(escape_untrusted_content(removable + "x\t\n"), "x\t\n")
+
+
     def test_normalizes_whitespace_controls_and_paragraphs(self) -> None:
         raw = "  First\t line\x00\nsecond   line\n\n\n Third\u200b paragraph  "
         self.assertEqual(clean_page_text(raw), "First line second line\n\nThird paragraph")
@@ -77,6 +149,32 @@ class SelectionTests(unittest.TestCase):
         )
         self.assertEqual([chunk.label for chunk in selected], ["[S2]"])
 
+    def test_chunk_index_weights_rare_terms_and_exact_phrases(self) -> None:
+        chunks = [
+            SourceChunk(1, "Page", "https://example.test/page", "Browser browser browser tabs and more browser."),
+            SourceChunk(2, "Page", "https://example.test/page", "The browser saves memory by tab hibernation."),
+            SourceChunk(3, "Page", "https://example.test/page", "Browser updates ship weekly."),
+            SourceChunk(4, "Page", "https://example.test/page", "Hibernation browser notes."),
+        ]
+        index = ChunkIndex(chunks)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.rank("browser hibernation")[0].label, "[S4]")
+        self.assertEqual(index.rank("tab hibernation")[0].label, "[S2]")
+        scores = index.scores("browser hibernation")
+        self.assertGreater(scores[1], scores[0])
+        self.assertEqual(index.scores("?!"), [0.0, 0.0, 0.0, 0.0])
+        self.assertEqual(ChunkIndex([]).rank("anything"), [])
+
+    def test_qa_selection_reuses_a_matching_index_only(self) -> None:
+        index = ChunkIndex(self.chunks)
+        for query in ("octopus camouflage", "camera permissions", "release"):
+            self.assertEqual(
+                select_context_chunks(self.chunks, mode="qa", query=query, max_chunks=2, index=index),
+                select_context_chunks(self.chunks, mode="qa", query=query, max_chunks=2),
+            )
+        with self.assertRaises(ValueError):
+            select_context_chunks(self.chunks[:3], mode="qa", query="release", index=index)
+
     def test_summary_samples_broad_page_coverage(self) -> None:
         selected = select_context_chunks(
             self.chunks,
@@ -87,6 +185,28 @@ class SelectionTests(unittest.TestCase):
         labels = [chunk.label for chunk in selected]
         self.assertEqual(labels, ["[S1]", "[S3]", "[S5]"])
 
+    def test_broad_coverage_order_matches_farthest_point_sampling(self) -> None:
+        def farthest_point_order(count: int) -> list[int]:
+            if count < 2:
+                return list(range(count))
+            chosen = [0, count - 1]
+            while len(chosen) < count:
+                chosen.append(
+                    max(
+                        (index for index in range(count) if index not in chosen),
+                        key=lambda index: (min(abs(index - other) for other in chosen), -index),
+                    )
+                )
+            return chosen
+
+        for count in range(0, 70):
+            chunks = [SourceChunk(index + 1, "T", "u", f"chunk {index}") for index in range(count)]
+            self.assertEqual(
+                [chunk.source_id - 1 for chunk in _broad_coverage_order(chunks)],
+                farthest_point_order(count),
+                count,
+            )
+
     def test_selection_respects_rendered_character_budget(self) -> None:
         large = [SourceChunk(1, "Title", "https://example.test", "<&>" * 1_000)]
         selected = select_context_chunks(
@@ -99,6 +219,45 @@ class SelectionTests(unittest.TestCase):
         self.assertLessEqual(len(rendered), 700)
         self.assertIn("[truncated]", selected[0].text)
 
+    def test_budget_fitting_matches_a_search_over_rendered_truncations(self) -> None:
+        def search_fit(chunk: SourceChunk, budget: int) -> SourceChunk | None:
+            if budget <= 0:
+                return None
+            if len(delimit_untrusted_content(chunk)) <= budget:
+                return chunk
+            best = replace(chunk, text="")
+            if len(delimit_untrusted_content(best)) > budget:
+                return None
+            low, high = 0, len(chunk.text)
+            while low <= high:
+                midpoint = (low + high) // 2
+                text = chunk.text[:midpoint].rstrip()
+                if midpoint < len(chunk.text):
+                    text += "\n[truncated]"
+                candidate = replace(chunk, text=text)
+                if len(delimit_untrusted_content(candidate)) <= budget:
+                    best = candidate
+                    low = midpoint + 1
+                else:
+                    high = midpoint - 1
+            return best
+
+        rnd = random.Random(24)
+        alphabet = "abc  \n\t&<>\"'\x00\x1f\u200b\u00e9\u3000\U0001f600"
+        for _ in range(120):
+            text = "".join(rnd.choice(alphabet) for _ in range(rnd.randrange(0, 120)))
+            chunk = SourceChunk(1, rnd.choice(["T", "<T&>"]), "https://e.test/?a=1&b=2", text)
+            for budget in range(0, 360, 9):
+                expected = search_fit(chunk, budget)
+                fitted = _fit_chunk_to_budget(chunk, budget)
+                if expected is None:
+                    self.assertIsNone(fitted)
+                    continue
+                self.assertIsNotNone(fitted)
+                assert fitted is not None
+                self.assertEqual(fitted[0], expected)
+                self.assertEqual(fitted[1], len(delimit_untrusted_content(expected)))
+
     def test_rejects_duplicate_labels_and_excessive_budget(self) -> None:
         duplicate = [self.chunks[0], SourceChunk(1, "Other", "url", "text")]
         with self.assertRaises(ValueError):
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+from octobrowse import filter_cache
+from octobrowse.filter_cache import (
+    filter_list_key,
+    read_filter_shards,
+    read_ruleset_cache,
+    ruleset_cache_key,
+    stream_filter_rules,
+    write_ruleset_cache,
+)
+from octobrowse.filtering import FilterRuleSet
+from octobrowse.parse_pool import filter_parse_pool
+
+
+LIST_TEXT = "\n".join(
+    [
+        "||ads.example^",
+        "||metrics.example^$third-party,~image",
+        "/banner/*/ad.js$script",
+        "@@||ads.example/allowed.js$script",
+        "##.ad-slot",
+        "news.example##.sponsored",
+    ]
+)
+
+
+def parse(text: str) -> FilterRuleSet:
+    rules = FilterRuleSet()
+    rules.parse_text(text)
+    return rules
+
+
+def load(paths: list[Path], *args: object, **kwargs: object) -> tuple[FilterRuleSet, list]:
+    """Return the complete result of ``stream_filter_rules``."""
+    *_snapshots, (rules, segments) = stream_filter_rules(paths, *args, **kwargs)
+    return rules, segments
+
+
+class FilterCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "filter-rules.cache"
+        self.key = ruleset_cache_key([LIST_TEXT])
+        self.rules = FilterRuleSet()
+        self.rules.parse_text(LIST_TEXT)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_round_trip_preserves_matching_and_counts(self) -> None:
+        self.assertTrue(write_ruleset_cache(self.path, self.key, self.rules))
+        restored = read_ruleset_cache(self.path, self.key)
+
+        self.assertIsNotNone(restored)
+        assert restored is not None
+        self.assertEqual(restored.to_state(), self.rules.to_state())
+        url = "https://cdn.example/banner/x/ad.js"
+        self.assertTrue(restored.should_block(url, "cdn.example", "script", "site.example"))
+        self.assertFalse(restored.should_block(url, "cdn.example", "image", "site.example"))
+        self.assertFalse(
+            restored.should_block(
+                "https://ads.example/allowed.js", "ads.example", "script", "news.example"
+            )
+        )
+        self.assertIn(".sponsored", restored.cosmetic_css_for("news.example"))
+
+    def test_key_tracks_list_contents_and_order(self) -> None:
+        self.assertNotEqual(self.key, ruleset_cache_key([LIST_TEXT + "\n||more.example^"]))
+        self.assertNotEqual(ruleset_cache_key(["a", "b"]), ruleset_cache_key(["b", "a"]))
+
+    def test_stale_or_corrupt_cache_is_a_miss(self) -> None:
+        write_ruleset_cache(self.path, self.key, self.rules)
+        self.assertIsNone(read_ruleset_cache(self.path, ruleset_cache_key(["||other.example^"])))
+
+        data = bytearray(self.path.read_bytes())
+        data[-1] ^= 0xFF
+        self.path.write_bytes(bytes(data))
+        self.assertIsNone(read_ruleset_cache(self.path, self.key))
+
+        self.path.write_bytes(bytes(data[:20]))
+        self.assertIsNone(read_ruleset_cache(self.path, self.key))
+        self.path.write_bytes(b"")
+        self.assertIsNone(read_ruleset_cache(self.path, self.key))
+
+    def test_missing_cache_is_a_miss(self) -> None:
+        self.assertIsNone(read_ruleset_cache(self.path, self.key))
+
+    def test_unchanged_list_segment_is_reused(self) -> None:
+        path = Path(self.tmp.name) / "easylist.txt"
+        path.write_text(LIST_TEXT, encoding="utf-8")
+        cache_dir = Path(self.tmp.name) / "segments"
+        _rules, (first,) = load([path], None, cache_dir)
+        self.assertEqual(len(list(cache_dir.glob("easylist-*.cache"))), 1)
+        self.assertEqual(load([path], {first.name: first}, cache_dir)[1], [first])
+
+        _rules, (restored,) = load([path], None, cache_dir)
+        self.assertIsNot(restored.rules, first.rules)
+        self.assertEqual(restored.rules.to_state(), first.rules.to_state())
+
+        path.write_text(LIST_TEXT + "\n||more.example^", encoding="utf-8")
+        _rules, (changed,) = load([path], {first.name: first}, cache_dir)
+        self.assertNotEqual(changed.digest, first.digest)
+        self.assertIn("more.example", changed.rules.blocked_domains)
+        self.assertEqual(len(list(cache_dir.glob("easylist-*.cache"))), 1)
+
+    def test_caches_from_another_format_version_are_removed(self) -> None:
+        path = Path(self.tmp.name) / "easylist.txt"
+        path.write_text(LIST_TEXT, encoding="utf-8")
+        cache_dir = Path(self.tmp.name) / "segments"
+        cache_dir.mkdir()
+        (cache_dir / "format-version").write_text("1\n", encoding="ascii")
+        (cache_dir / "removed-list-0123456789abcdef.cache").write_bytes(b"old")
+        _rules, (segment,) = load([path], None, cache_dir)
+        self.assertEqual([cache.name for cache in cache_dir.glob("*.cache")], [f"easylist-{segment.digest.hex()[:16]}.cache"])
+        self.assertEqual((cache_dir / "format-version").read_text(encoding="ascii"), f"{filter_cache.CACHE_FORMAT_VERSION}\n")
+        self.assertEqual(load([path], None, cache_dir)[1][0].rules.to_state(), segment.rules.to_state())
+        self.assertEqual(len(list(cache_dir.glob("*.cache"))), 1)
+
+    def test_process_pool_parse_matches_serial_parse(self) -> None:
+        lists = Path(self.tmp.name) / "lists"
+        lists.mkdir()
+        (lists / "easylist.txt").write_text(LIST_TEXT, encoding="utf-8")
+        (lists / "extra.txt").write_text("||tracker.example^\n-promo.\nexample.org##.banner", encoding="utf-8")
+        paths = sorted(lists.glob("*.txt"))
+        serial, serial_segments = load(paths)
+        with filter_parse_pool(2) as pool, mock.patch.multiple(
+            filter_cache, PARALLEL_MIN_CHARS=0, PARALLEL_SHARD_CHARS=30
+        ):
+            sharded, segments = load(paths, executor=pool)
+            again, _segments = load(paths, executor=pool)
+
+        self.assertEqual(sharded.to_state(), again.to_state())
+        for parallel, expected in [(sharded, serial), *zip(
+            (segment.rules for segment in segments), (segment.rules for segment in serial_segments)
+        )]:
+            self.assertEqual(
+                (parallel.rule_count, parallel.cosmetic_count, parallel.skipped_count),
+                (expected.rule_count, expected.cosmetic_count, expected.skipped_count),
+            )
+            self.assertEqual(parallel.blocked_domains, expected.blocked_domains)
+        url = "https://cdn.example/banner/x/ad.js"
+        self.assertTrue(sharded.should_block(url, "cdn.example", "script", "site.example"))
+        self.assertTrue(sharded.should_block("https://a.example/x-promo.gif", "a.example"))
+
+
+    def test_streamed_key_matches_text_key(self) -> None:
+        path = Path(self.tmp.name) / "list.txt"
+        path.write_bytes(LIST_TEXT.replace("\n", "\r\n").encode() + b"\n||bad\xff.example^\n")
+        text = path.read_text(encoding="utf-8", errors="replace")
+        self.assertEqual(filter_list_key(path), ruleset_cache_key([text]))
+
+    def test_shards_split_on_line_boundaries(self) -> None:
+        path = Path(self.tmp.name) / "list.txt"
+        path.write_text(LIST_TEXT, encoding="utf-8")
+        shards = list(read_filter_shards(path, 30))
+        self.assertGreater(len(shards), 1)
+        self.assertEqual("".join(shards), LIST_TEXT)
+        self.assertTrue(all(shard.endswith("\n") for shard in shards[:-1]))
+
+    def test_streamed_snapshots_grow_to_the_full_parse(self) -> None:
+        lists = Path(self.tmp.name) / "lists"
+        lists.mkdir()
+        text = LIST_TEXT + "\n0.0.0.0 hosts.example\n||popup.example^$popup\n-promo.\n" + "\n".join(
+            f"/path{index}/ad.js" for index in range(20)
+        )
+        (lists / "easylist.txt").write_text(text, encoding="utf-8")
+        (lists / "hosts.txt").write_text("0.0.0.0 one.example\n127.0.0.1 two.example\n", encoding="utf-8")
+        paths = sorted(lists.glob("*.txt"))
+        cache_dir = Path(self.tmp.name) / "segments"
+
+        snapshots = list(stream_filter_rules(paths, None, cache_dir, first_batch_lines=4))
+        self.assertGreater(len(snapshots), 3)
+        self.assertTrue(all(segments is None for _rules, segments in snapshots[:-1]))
+        counts = [rules.rule_count for rules, _segments in snapshots]
+        self.assertEqual(counts, sorted(counts))
+
+        first = snapshots[0][0]
+        banner = "https://cdn.example/banner/x/ad.js"
+        self.assertTrue(first.should_block("https://ads.example/x.js", "ads.example"))
+        self.assertIn("two.example", first.blocked_domains)
+        self.assertFalse(first.should_block(banner, "cdn.example", "script", "site.example"))
+
+        final, segments = snapshots[-1]
+        assert segments is not None
+        self.assertEqual([segment.name for segment in segments], ["easylist.txt", "hosts.txt"])
+        expected = FilterRuleSet.merge([parse(text), parse((lists / "hosts.txt").read_text())])
+        self.assertEqual(
+            (final.rule_count, final.cosmetic_count, final.skipped_count),
+            (expected.rule_count, expected.cosmetic_count, expected.skipped_count),
+        )
+        self.assertEqual(final.blocked_domains, expected.blocked_domains)
+        self.assertTrue(final.should_block(banner, "cdn.example", "script", "site.example"))
+        self.assertTrue(final.should_block("https://a.example/path19/ad.js", "a.example"))
+        self.assertIn(".sponsored", final.cosmetic_css_for("news.example"))
+        # Snapshots are independent copies, not views of the rules being built.
+        self.assertFalse(snapshots[1][0].should_block("https://a.example/path19/ad.js", "a.example"))
+
+        previous = {segment.name: segment for segment in segments}
+        (_again, again_segments), = stream_filter_rules(paths, previous, cache_dir)
+        assert again_segments is not None
+        self.assertEqual([segment.rules for segment in again_segments], [segment.rules for segment in segments])
+        (cached, _segments), = stream_filter_rules(paths, None, cache_dir)
+        self.assertEqual(cached.rule_count, final.rule_count)
+
+        (empty, no_segments), = stream_filter_rules([lists / "missing.txt"])
+        self.assertEqual((empty.rule_count, no_segments), (0, []))
+
+    def test_lists_that_become_unreadable_are_skipped(self) -> None:
+        lists = Path(self.tmp.name) / "lists"
+        lists.mkdir()
+        (lists / "easylist.txt").write_text(LIST_TEXT, encoding="utf-8")
+        (lists / "hosts.txt").write_text("0.0.0.0 one.example\n", encoding="utf-8")
+        (lists / "folder.txt").mkdir()
+        paths = sorted(lists.glob("*.txt"))
+
+        # Removed after its hostname pass, before its patterns are read.
+        stream = stream_filter_rules(paths, first_batch_lines=1)
+        first, _segments = next(stream)
+        self.assertTrue(first.should_block("https://ads.example/x.js", "ads.example"))
+        (lists / "easylist.txt").unlink()
+        final, segments = list(stream)[-1]
+        assert segments is not None
+        self.assertEqual([segment.name for segment in segments], ["hosts.txt"])
+        self.assertFalse(final.should_block("https://ads.example/x.js", "ads.example"))
+        self.assertIn("one.example", final.blocked_domains)
+
+        # Hashed, then gone before the hostname pass opens it.
+        gone = lists / "gone.txt"
+        with mock.patch("octobrowse.filter_cache.filter_list_key", return_value=self.key):
+            snapshots = list(stream_filter_rules([gone]))
+        self.assertEqual(snapshots[-1][1], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
 import unittest
+from unittest import mock
 
+from octobrowse import filtering
 from octobrowse.filtering import (
+    MAX_PATTERN_WILDCARDS,
+    QUARANTINE_STRIKES,
+    DomainIndex,
     FilterRuleSet,
+    LRUCache,
+    NetworkRule,
     domain_suffix_match,
     is_third_party_request,
+    request_block_key,
     resource_type_name,
+    url_authority,
 )
 
 
@@ -17,6 +26,42 @@ class FilteringTests(unittest.TestCase):
         self.assertEqual(domain_suffix_match("cdn.tracker.example", domains), "tracker.example")
         self.assertIsNone(domain_suffix_match("nottracker.example", domains))
 
+    def test_domain_index_matches_suffixes_in_exact_and_hashed_form(self) -> None:
+        class SmallIndex(DomainIndex):
+            EXACT_LIMIT = 2
+
+        for index in (DomainIndex(), SmallIndex()):
+            for domain in ("Tracker.example", "ads.example.co.uk", "metrics.example."):
+                index.add(domain)
+            restored = DomainIndex.from_buffer(index.to_bytes())
+            for candidate in (index, restored):
+                self.assertEqual(len(candidate), 3)
+                self.assertEqual(domain_suffix_match("cdn.tracker.example", candidate), "tracker.example")
+                self.assertEqual(domain_suffix_match("ADS.example.co.uk", candidate), "ads.example.co.uk")
+                self.assertIsNone(domain_suffix_match("nottracker.example", candidate))
+                self.assertIsNone(domain_suffix_match("example.co.uk", candidate))
+                self.assertIn("metrics.example", candidate)
+                self.assertNotIn("cdn.metrics.example", candidate)
+
+        exact, hashed = DomainIndex(["a.example"]), SmallIndex(["b.example", "c.example", "d.example"])
+        exact |= hashed
+        self.assertEqual(len(exact), 4)
+        self.assertEqual(domain_suffix_match("x.a.example", exact), "a.example")
+        self.assertEqual(domain_suffix_match("x.d.example", exact), "d.example")
+
+        # The larger hashed side is adopted, and kept unless something is added.
+        larger = DomainIndex.from_buffer(SmallIndex(["b.example", "c.example", "d.example", "e.example"]).to_bytes())
+        merged = DomainIndex()
+        merged |= larger
+        merged |= hashed
+        self.assertEqual(len(merged), 4)
+        self.assertIs(merged._hashes, larger._hashes)
+        merged |= exact
+        self.assertEqual(len(merged), 5)
+        self.assertEqual(domain_suffix_match("x.a.example", merged), "a.example")
+        self.assertEqual(domain_suffix_match("x.e.example", merged), "e.example")
+        self.assertEqual(len(larger), 4)
+
     def test_resource_type_option_is_not_applied_unconditionally(self) -> None:
         rules = FilterRuleSet()
         rules.parse_text("||ads.example^$script")
@@ -51,14 +96,466 @@ class FilteringTests(unittest.TestCase):
         self.assertTrue(is_third_party_request("cdn.other.co.uk", "www.example.co.uk"))
         self.assertIsNone(is_third_party_request("cdn.example", ""))
 
+    def test_third_party_rules_separate_tenants_of_hosting_suffixes(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text("||widgets.github.io^$third-party\n||assets.s3.amazonaws.com^$third-party")
+        self.assertTrue(
+            rules.should_block(
+                "https://widgets.github.io/w.js", "widgets.github.io", "script", "alice.github.io"
+            )
+        )
+        self.assertFalse(
+            rules.should_block(
+                "https://widgets.github.io/w.js", "widgets.github.io", "script", "widgets.github.io"
+            )
+        )
+        self.assertTrue(
+            rules.should_block(
+                "https://assets.s3.amazonaws.com/a.js",
+                "assets.s3.amazonaws.com",
+                "script",
+                "site.s3.amazonaws.com",
+            )
+        )
+
+    def test_request_block_key_orders_exceptions_blocklist_and_patterns(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text("/banner/*\n@@||tracker.example/allowed.js")
+        block_list = DomainIndex(["tracker.example"])
+        self.assertEqual(
+            request_block_key(rules, block_list, "https://cdn.tracker.example/t.js", "cdn.tracker.example"),
+            "tracker.example",
+        )
+        self.assertIsNone(
+            request_block_key(rules, block_list, "https://tracker.example/allowed.js", "tracker.example")
+        )
+        self.assertEqual(
+            request_block_key(rules, block_list, "https://news.example/banner/1.png", "news.example"),
+            "news.example",
+        )
+        self.assertIsNone(request_block_key(rules, block_list, "https://news.example/", "news.example"))
+        self.assertEqual(
+            request_block_key(None, block_list, "https://tracker.example/allowed.js", "tracker.example"),
+            "tracker.example",
+        )
+
+    def test_domain_option_applies_most_specific_first_party_domain(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text(
+            "||ads.example^$domain=news.example|~sports.news.example\n"
+            "/tracker.js$domain=~safe.example\n"
+            "@@||ads.example/ok.js$domain=news.example"
+        )
+        self.assertEqual((rules.rule_count, rules.skipped_count), (3, 0))
+        url = "https://ads.example/a.js"
+        self.assertTrue(rules.should_block(url, "ads.example", "script", "news.example"))
+        self.assertTrue(rules.should_block(url, "ads.example", "script", "www.news.example"))
+        self.assertFalse(rules.should_block(url, "ads.example", "script", "live.sports.news.example"))
+        self.assertFalse(rules.should_block(url, "ads.example", "script", "other.example"))
+        self.assertFalse(rules.should_block(url, "ads.example", "script", ""))
+        self.assertFalse(rules.should_block("https://ads.example/ok.js", "ads.example", "script", "news.example"))
+        tracker = "https://cdn.example/tracker.js"
+        self.assertTrue(rules.should_block(tracker, "cdn.example", "script", "a.example"))
+        self.assertFalse(rules.should_block(tracker, "cdn.example", "script", "www.safe.example"))
+
+    def test_domain_scoped_rules_are_indexed_by_first_party_domain(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text("/promo/*$domain=shop.example|store.example\n/banner.$domain=~shop.example")
+        rules.finalize()
+        self.assertEqual(set(rules.domain_token_buckets), {"shop.example", "store.example"})
+        self.assertNotIn("promo", rules.token_buckets)
+        self.assertIn("banner", rules.token_buckets)
+        self.assertEqual(rules.bucket_stats()["scoped_domains"], 2)
+        self.assertTrue(
+            rules.should_block("https://cdn.example/promo/1.js", "cdn.example", "script", "store.example")
+        )
+
+        restored = FilterRuleSet.from_state(rules.to_state())
+        merged = FilterRuleSet.merge([FilterRuleSet(), restored])
+        for candidate in (restored, merged):
+            self.assertTrue(
+                candidate.should_block("https://cdn.example/promo/1.js", "cdn.example", "script", "shop.example")
+            )
+            self.assertFalse(
+                candidate.should_block("https://cdn.example/promo/1.js", "cdn.example", "script", "news.example")
+            )
+
+    def test_decision_cache_separates_only_hosts_named_by_domain_options(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text("||ads.example^$domain=news.example|~sports.news.example")
+        url = "https://ads.example/pixel.gif"
+        self.assertTrue(rules.should_block(url, "ads.example", "image", "www.news.example"))
+        self.assertTrue(rules.should_block(url, "ads.example", "image", "cdn.news.example"))
+        self.assertEqual(rules.decision_cache.hits, 1)
+        self.assertFalse(rules.should_block(url, "ads.example", "image", "sports.news.example"))
+        self.assertEqual(rules.decision_cache.misses, 2)
+
+    def test_unsupported_domain_option_values_are_skipped(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text(
+            "||ads.example^$domain=example.*\n||ads.example^$domain=\n||ads.example^$domain=a.example|~a.example"
+        )
+        self.assertEqual((rules.rule_count, rules.skipped_count), (0, 3))
+
     def test_resource_type_name_accepts_qt_style_names(self) -> None:
         self.assertEqual(resource_type_name("ResourceTypeXhr"), "xmlhttprequest")
         self.assertEqual(resource_type_name("ResourceTypeMainFrame"), "document")
         self.assertEqual(resource_type_name("something-new"), "other")
 
+    def test_evaluate_reports_verdict_stage_and_rule(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text(
+            "||ads.example^\n/banner/*/ad.js$script\n@@||ads.example/allowed.js$script"
+        )
+        allowed = rules.evaluate(
+            "https://ads.example/allowed.js", "ads.example", "ResourceTypeScript", "news.example"
+        )
+        self.assertFalse(allowed.blocked)
+        self.assertEqual(allowed.reason, "exception")
+        self.assertEqual(allowed.rule, "@@||ads.example/allowed.js$script")
+
+        by_domain = rules.evaluate("https://ads.example/x.png", "ads.example", "image", "news.example")
+        self.assertEqual((by_domain.blocked, by_domain.reason, by_domain.rule), (True, "domain", "||ads.example^"))
+
+        by_pattern = rules.evaluate(
+            "https://cdn.example/banner/1/ad.js", "cdn.example", "ResourceTypeScript", "news.example"
+        )
+        self.assertEqual(
+            (by_pattern.blocked, by_pattern.reason, by_pattern.rule),
+            (True, "pattern", "/banner/*/ad.js$script"),
+        )
+        self.assertEqual(rules.evaluate("https://news.example/", "news.example").reason, "none")
+
+    def test_repeated_requests_hit_the_decision_cache(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text("||ads.example^$third-party")
+        url = "https://ads.example/pixel.gif"
+        first = rules.evaluate(url, "ads.example", "image", "www.news.example")
+        second = rules.evaluate(url, "ads.example", "image", "cdn.news.example")
+        self.assertIs(first, second)
+        self.assertEqual((rules.decision_cache.hits, rules.decision_cache.misses), (1, 1))
+
+        # A different first-party site is a separate decision.
+        self.assertFalse(rules.evaluate(url, "ads.example", "image", "ads.example").blocked)
+        self.assertEqual(rules.decision_cache.misses, 2)
+        self.assertEqual(FilterRuleSet().decision_cache.hits, 0)
+
+    def test_decision_cache_is_bounded(self) -> None:
+        rules = FilterRuleSet()
+        rules.decision_cache = LRUCache(2)
+        for index in range(4):
+            rules.evaluate(f"https://site.example/{index}", "site.example")
+        self.assertEqual(len(rules.decision_cache), 2)
+        rules.evaluate("https://site.example/0", "site.example")
+        self.assertEqual(rules.decision_cache.hits, 0)
+
+    def test_patterns_are_classified_into_specialized_matchers(self) -> None:
+        compile_pattern = FilterRuleSet._compile_pattern
+        self.assertEqual(compile_pattern("/AdBanner.")[:3], ("substring", "/adbanner.", False))
+        self.assertEqual(compile_pattern("*-ad-*")[:3], ("substring", "-ad-", False))
+        self.assertEqual(compile_pattern("|https://ads.")[:3], ("prefix", "https://ads.", False))
+        self.assertEqual(compile_pattern("||ads.example^/path|")[:3], ("host", "ads.example^/path", True))
+        self.assertEqual(compile_pattern("/banner/*/ad.js"), ("regex", "/banner/*/ad.js", False))
+
+    def test_wildcard_rules_are_prepared_on_first_evaluation(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text("/banner/*/ad.js\n/promo/*/pixel.gif")
+        rules.finalize()
+        banner, promo = sorted(
+            (rule for bucket in rules.token_buckets.values() for rule in bucket),
+            key=lambda rule: rule.text,
+        )
+        self.assertIsNone(banner.compiled)
+
+        self.assertTrue(rules.should_block("https://cdn.example/banner/x/AD.js", "cdn.example"))
+        self.assertIsNotNone(banner.wildcard)
+        self.assertIsNone(promo.wildcard)
+        self.assertIsNone(banner.compiled)
+        self.assertFalse(hasattr(banner, "__dict__"))
+
+    def test_wildcard_patterns_match_like_their_regex_without_backtracking(self) -> None:
+        compile_pattern = FilterRuleSet._compile_pattern
+        self.assertEqual(compile_pattern("/ad***.js"), ("regex", "/ad*.js", False))
+        self.assertIsNone(compile_pattern("/" + "a*" * (MAX_PATTERN_WILDCARDS + 1) + "b"))
+
+        urls = [
+            "https://cdn.ads.example:8080/x/banner.js?a=1",
+            "https://ads.example/",
+            "https://site.example/a/b/ad.js",
+            "https://site.example/ad",
+            "http://site.example/?u=ads.example/banner",
+        ]
+        for body in ["||ads.example^*banner", "|https://*/ad", "/a*^b*.js", "*/ad^*|", "ads*^|", "||*.example/*banner"]:
+            kind, source, end_anchor = compile_pattern(body)
+            rule = NetworkRule(kind, source, end_anchor=end_anchor)
+            for url in urls:
+                lowered = url.lower()
+                self.assertEqual(
+                    rule.matches(url, lowered, url_authority(lowered), "other", None),
+                    rule.pattern.search(url) is not None,
+                    (body, url),
+                )
+
+        # The ".*" regex for this rule backtracks for seconds on such a URL.
+        rule = NetworkRule("regex", "/ad*^*banner")
+        url = "https://x.example/" + "/ad?" * 500
+        self.assertFalse(rule.matches(url, url, url_authority(url), "other", None))
+        self.assertFalse(rule.quarantined)
+
+    def test_slow_wildcard_rules_are_quarantined(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text("||ads.example^*/banner\n/promo/*/pixel.gif")
+        url = "https://ads.example/x/banner"
+        reported: list[str] = []
+        with mock.patch.object(filtering, "RULE_MATCH_BUDGET", -1.0), mock.patch.object(
+            filtering, "_quarantine_listener", reported.append
+        ):
+            for _ in range(QUARANTINE_STRIKES):
+                self.assertTrue(rules.evaluate(url, "ads.example").blocked)
+                # Plain wildcard pieces are single substring searches and are not timed.
+                self.assertTrue(rules.should_block("https://cdn.example/promo/1/pixel.gif", "cdn.example"))
+                rules.decision_cache.clear()
+            self.assertFalse(rules.evaluate(url, "ads.example").blocked)
+        self.assertEqual(rules.quarantined_rules(), ["||ads.example^*/banner"])
+        self.assertEqual(reported, ["||ads.example^*/banner"])
+        self.assertTrue(FilterRuleSet.merge([rules]).evaluate(url, "ads.example").blocked)
+        self.assertEqual(rules.quarantined_rules(), [])
+
+    def test_only_consecutive_slow_matches_quarantine_a_rule(self) -> None:
+        rule = NetworkRule("regex", "||ads.example^*/banner")
+        url = "https://ads.example/x/banner"
+        for _ in range(2 * QUARANTINE_STRIKES):
+            with mock.patch.object(filtering, "RULE_MATCH_BUDGET", -1.0):
+                for _ in range(QUARANTINE_STRIKES - 1):
+                    self.assertTrue(rule.matches(url, url, url_authority(url), "other", None))
+            self.assertTrue(rule.matches(url, url, url_authority(url), "other", None))
+        self.assertFalse(rule.quarantined)
+
+    def test_literal_matchers_keep_abp_anchor_and_separator_semantics(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text("||ads.example^$script\n|https://track.\n-banner^\n.gif|")
+
+        def blocked(url: str) -> bool:
+            return rules.should_block(url, url.split("/")[2], "script", "site.example")
+
+        self.assertTrue(blocked("https://cdn.ads.example/x.js"))
+        self.assertTrue(blocked("https://ADS.example:8080/x.js"))
+        self.assertFalse(blocked("https://badads.example/x.js"))
+        self.assertFalse(blocked("https://ads.example.evil/x.js"))
+        self.assertFalse(blocked("https://site.example/?u=ads.example/x.js"))
+        self.assertTrue(blocked("https://track.site.example/a"))
+        self.assertFalse(blocked("http://track.site.example/a"))
+        self.assertTrue(blocked("https://site.example/top-banner"))
+        self.assertTrue(blocked("https://site.example/top-banner?x=1"))
+        self.assertFalse(blocked("https://site.example/top-banners"))
+        self.assertTrue(blocked("https://site.example/pixel.GIF"))
+        self.assertFalse(blocked("https://site.example/pixel.gif?x=1"))
+
+    def test_rules_are_indexed_under_their_rarest_token(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text(
+            "\n".join(
+                [
+                    "/analytics/collect-v1.",
+                    "/analytics/collect-v2.",
+                    "/analytics/beacon.",
+                    "/pixel*track/",
+                ]
+            )
+        )
+        rules.finalize()
+
+        self.assertNotIn("analytics", rules.token_buckets)
+        self.assertEqual(len(rules.token_buckets["beacon"]), 1)
+        self.assertNotIn("track", rules.token_buckets)
+        self.assertNotIn("pixel", rules.token_buckets)
+        self.assertEqual(len(rules.generic_patterns), 1)
+        self.assertEqual(rules.bucket_stats()["max"], 2)
+        self.assertTrue(
+            rules.should_block("https://cdn.example/analytics/beacon.js", "cdn.example", "script")
+        )
+        self.assertTrue(
+            rules.should_block("https://cdn.example/pixel-x-track/", "cdn.example", "image")
+        )
+
+    def test_merged_lists_decide_like_one_parsed_set(self) -> None:
+        easylist = "||ads.example^\n/banner/*/ad.js$script\n##.ad-slot"
+        custom = "@@||ads.example/allowed.js$script\n-promo.\nnews.example##.sponsored"
+        combined = FilterRuleSet()
+        combined.parse_text(easylist)
+        combined.parse_text(custom)
+        parts = []
+        for text in (easylist, custom):
+            part = FilterRuleSet()
+            part.parse_text(text)
+            parts.append(part)
+        merged = FilterRuleSet.merge(parts)
+
+        self.assertEqual(
+            (merged.rule_count, merged.cosmetic_count, merged.skipped_count),
+            (combined.rule_count, combined.cosmetic_count, combined.skipped_count),
+        )
+        for url, host, kind in [
+            ("https://ads.example/allowed.js", "ads.example", "script"),
+            ("https://ads.example/allowed.js", "ads.example", "image"),
+            ("https://cdn.example/banner/1/ad.js", "cdn.example", "script"),
+            ("https://cdn.example/x-promo.png", "cdn.example", "image"),
+            ("https://news.example/", "news.example", "document"),
+        ]:
+            self.assertEqual(
+                merged.evaluate(url, host, kind, "news.example"),
+                combined.evaluate(url, host, kind, "news.example"),
+            )
+        self.assertEqual(merged.cosmetic_css_for("news.example"), combined.cosmetic_css_for("news.example"))
+
+    def test_domain_and_pattern_sections_add_up_to_a_full_parse(self) -> None:
+        lines = [
+            "||ads.example^",
+            "@@||ok.ads.example^",
+            "0.0.0.0 hosts.example",
+            "||trailing.example^$",
+            "||popup.example^$popup",
+            "||ads.example/path",
+            "/banner/*/ad.js$script",
+            "news.example##.sponsored",
+        ]
+        full = FilterRuleSet()
+        full.parse_lines(lines)
+        full.finalize()
+        domains = FilterRuleSet()
+        self.assertEqual(domains.parse_lines(lines, section="domains"), 4)
+        self.assertEqual((domains.rule_count, domains.cosmetic_count, domains.skipped_count), (4, 0, 0))
+        self.assertEqual(domains.parse_lines(lines, section="patterns"), 4)
+        domains.finalize()
+
+        self.assertEqual(domains.to_state(), full.to_state())
+
+    def test_optimize_drops_rules_that_cannot_change_a_verdict(self) -> None:
+        easylist = "\n".join(
+            [
+                "||ads.example^",
+                "||cdn.ads.example^",
+                "||ads.example/banner.js$script",
+                "||ads.example^*/pixel.gif",
+                "||ads.examples/banner.js",
+                "||tracker.example^$third-party",
+                "/banner/*/ad.js$script",
+                "@@||ok.example/ad.js",
+                "##.ad-slot",
+                "news.example##.sponsored",
+            ]
+        )
+        privacy = "\n".join(
+            [
+                "||tracker.example^$3p",
+                "/BANNER/*/ad.js$script",
+                "@@||ok.example/ad.js$~image",
+                "@@||ok.example/ad.js",
+                "##.ad-slot",
+                "news.example##.sponsored",
+            ]
+        )
+        parts = []
+        for text in (easylist, privacy):
+            part = FilterRuleSet()
+            part.parse_text(text)
+            parts.append(part)
+        reference = FilterRuleSet.merge(parts)
+        merged = FilterRuleSet.merge(parts)
+        report = merged.optimize()
+
+        self.assertEqual(
+            (report.duplicate_rules, report.shadowed_rules, report.covered_domains, report.duplicate_selectors),
+            (3, 2, 1, 2),
+        )
+        self.assertGreater(report.bytes_saved, 0)
+        self.assertIs(merged.optimization, report)
+        self.assertEqual(merged.rule_count, reference.rule_count - report.removed_rules)
+        self.assertEqual(merged.cosmetic_count, reference.cosmetic_count - 2)
+        self.assertNotIn("cdn.ads.example", merged.blocked_domains)
+        self.assertEqual(merged.site_cosmetic_css("news.example").count(".sponsored"), 1)
+        # The parts, which stay cached as list segments, are left intact.
+        self.assertEqual(FilterRuleSet.merge(parts).to_state(), reference.to_state())
+        for url, host, kind in [
+            ("https://cdn.ads.example/banner.js", "cdn.ads.example", "script"),
+            ("https://ads.example/x/pixel.gif", "ads.example", "image"),
+            ("https://ads.examples/banner.js", "ads.examples", "script"),
+            ("https://tracker.example/p", "tracker.example", "image"),
+            ("https://cdn.example/banner/1/ad.js", "cdn.example", "script"),
+            ("https://ok.example/ad.js", "ok.example", "image"),
+            ("https://ok.example/ad.js", "ok.example", "script"),
+            ("https://news.example/", "news.example", "document"),
+        ]:
+            self.assertEqual(
+                merged.evaluate(url, host, kind, "news.example").blocked,
+                reference.evaluate(url, host, kind, "news.example").blocked,
+            )
+
+    def test_merge_applies_generic_caps_across_lists(self) -> None:
+        parts = []
+        for prefix in ("a", "b"):
+            part = FilterRuleSet()
+            part.parse_text("\n".join(f"*{prefix}{index}*x" for index in range(150)))
+            parts.append(part)
+        merged = FilterRuleSet.merge(parts)
+        self.assertEqual(len(merged.generic_patterns), FilterRuleSet.GENERIC_CAP)
+        self.assertEqual(merged.rule_count, FilterRuleSet.GENERIC_CAP)
+        self.assertEqual(merged.skipped_count, 100)
+
+    def test_site_cosmetic_css_is_separate_from_generic_and_cached(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text('##a[href*="/ads/"]\nnews.example##.sponsored\nlive.news.example##.promo')
+
+        self.assertEqual(rules.generic_cosmetic_css(), 'a[href*="/ads/"] { display: none !important; }')
+        self.assertEqual(rules.site_cosmetic_css("other.example"), "")
+        self.assertEqual(
+            rules.site_cosmetic_css("live.news.example"),
+            ".promo, .sponsored { display: none !important; }",
+        )
+        first = rules.site_cosmetic_css("www.news.example")
+        self.assertIs(rules.site_cosmetic_css("cdn.news.example"), first)
+        self.assertEqual((rules.site_css_cache.hits, len(rules.site_css_cache)), (1, 2))
+        self.assertEqual(
+            rules.cosmetic_css_for("www.news.example"), first + "\n" + rules.generic_cosmetic_css()
+        )
+
+        rules.parse_text("news.example##.extra")
+        self.assertIn(".extra", rules.site_cosmetic_css("www.news.example"))
+
+    def test_generic_selectors_are_indexed_by_id_or_class(self) -> None:
+        rules = FilterRuleSet()
+        rules.parse_text(
+            "\n".join(
+                [
+                    "##.ad-slot",
+                    "##.ad-slot > iframe",
+                    "###sponsor_box:not(.editorial)",
+                    "##div.banner",
+                    "##.one, .two",
+                    '##a[href*="/ads/"]',
+                ]
+            )
+        )
+        self.assertEqual(sorted(rules.generic_selector_index), ["#sponsor_box", ".ad-slot"])
+        self.assertEqual(rules.generic_selectors, ["div.banner", ".one, .two", 'a[href*="/ads/"]'])
+        self.assertEqual(
+            rules.generic_cosmetic_css_for([".ad-slot", ".unrelated"]),
+            ".ad-slot, .ad-slot > iframe { display: none !important; }",
+        )
+        self.assertEqual(rules.generic_cosmetic_css_for([".unrelated"]), "")
+
+    def test_indexed_generic_selectors_are_not_capped(self) -> None:
+        rules = FilterRuleSet()
+        count = FilterRuleSet.GENERIC_SELECTOR_CAP + 10
+        rules.parse_text("\n".join(f"##.ad-{index}" for index in range(count)))
+        rules.parse_text("\n".join(f"##[data-ad='{index}']" for index in range(count)))
+        self.assertEqual(len(rules.generic_selector_index), count)
+        self.assertEqual(len(rules.generic_selectors), FilterRuleSet.GENERIC_SELECTOR_CAP)
+        self.assertEqual(rules.skipped_count, 10)
+
     def test_unsupported_options_are_skipped(self) -> None:
         rules = FilterRuleSet()
-        rules.parse_text("||ads.example^$domain=example.com")
+        rules.parse_text("||ads.example^$popup")
         self.assertEqual(rules.rule_count, 0)
         self.assertEqual(rules.skipped_count, 1)
 
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import sys
+import unittest
+
+from octobrowse.page_text import PageTextCache
+
+
+PAGE = "Octopus camouflage\n\nOctopuses  change colour\tin reefs.\n"
+
+
+class PageTextCacheTests(unittest.TestCase):
+    def test_text_is_fresh_until_the_tab_navigates_or_loads(self) -> None:
+        cache = PageTextCache()
+        self.assertIsNone(cache.get(1, "https://e.test/", False))
+        entry = cache.store(1, "https://e.test/", False, PAGE)
+        self.assertEqual(entry.cleaned, "Octopus camouflage\n\nOctopuses change colour in reefs.")
+        self.assertIs(cache.get(1, "https://e.test/", False), entry)
+        self.assertIsNone(cache.get(1, "https://e.test/other", False))
+
+        chunks = entry.chunks("Reefs")
+        self.assertIs(entry.index("Reefs").chunks[0], chunks[0])
+        self.assertEqual(chunks[0].title, "Reefs")
+        self.assertIsNot(entry.chunks("Renamed"), chunks)
+
+        cache.invalidate(1)
+        self.assertIsNone(cache.get(1, "https://e.test/", False))
+        # The same content after a reload keeps its cleaned text and chunks.
+        self.assertIs(cache.store(1, "https://e.test/", False, PAGE), entry)
+        changed = cache.store(1, "https://e.test/", False, PAGE + "More text.")
+        self.assertIsNot(changed, entry)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_private_and_standard_tabs_never_share_entries(self) -> None:
+        cache = PageTextCache()
+        standard = cache.store(1, "https://e.test/", False, PAGE)
+        self.assertIsNone(cache.get(1, "https://e.test/", True))
+        private = cache.store(1, "https://e.test/", True, PAGE)
+        self.assertIsNot(private, standard)
+        cache.discard(1)
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entries_are_evicted_past_the_budget(self) -> None:
+        page = "word " * 2_000
+        cache = PageTextCache(max_bytes=3 * sys.getsizeof(page.strip()))
+        for tab in range(3):
+            cache.store(tab, f"https://e.test/{tab}", False, page)
+        self.assertEqual(len(cache), 3)
+        self.assertIsNotNone(cache.get(0, "https://e.test/0", False))
+        cache.store(3, "https://e.test/3", False, page)
+        self.assertIsNone(cache.get(1, "https://e.test/1", False))
+        self.assertIsNotNone(cache.get(0, "https://e.test/0", False))
+
+        entry = cache.get(3, "https://e.test/3", False)
+        assert entry is not None
+        entry.index("Words")
+        cache.trim()
+        self.assertLessEqual(len(cache), 2)
+        self.assertIs(cache.get(3, "https://e.test/3", False), entry)
+
+
+if __name__ == "__main__":
+    unittest.main()
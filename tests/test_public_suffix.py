@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import unittest
+
+from octobrowse.public_suffix import (
+    parse_public_suffix_rules,
+    public_suffix_length,
+    public_suffix_trie,
+    site_key,
+)
+
+
+class PublicSuffixTests(unittest.TestCase):
+    def test_bundled_list_covers_icann_and_private_suffixes(self) -> None:
+        self.assertEqual(site_key("www.bbc.co.uk"), "bbc.co.uk")
+        self.assertEqual(site_key("a.b.example.com"), "example.com")
+        self.assertEqual(site_key("alice.github.io"), "alice.github.io")
+        self.assertEqual(site_key("docs.alice.github.io"), "alice.github.io")
+        self.assertEqual(site_key("bucket.s3.amazonaws.com"), "bucket.s3.amazonaws.com")
+
+    def test_hosts_without_a_registrable_domain_are_their_own_site(self) -> None:
+        self.assertEqual(site_key("github.io"), "github.io")
+        self.assertEqual(site_key("LocalHost."), "localhost")
+        self.assertEqual(site_key("192.168.0.1"), "192.168.0.1")
+        self.assertEqual(site_key("[::1]"), "[::1]")
+        self.assertEqual(site_key(""), "")
+
+    def test_wildcard_and_exception_rules(self) -> None:
+        trie = parse_public_suffix_rules(["// comment", "", "jp", "*.kawasaki.jp", "!city.kawasaki.jp"])
+        self.assertEqual(public_suffix_length("x.bar.kawasaki.jp".split("."), trie), 3)
+        self.assertEqual(public_suffix_length("www.city.kawasaki.jp".split("."), trie), 2)
+        self.assertEqual(public_suffix_length("example.unlisted".split("."), trie), 1)
+
+    def test_internationalized_rules_match_unicode_and_ascii_hosts(self) -> None:
+        trie = parse_public_suffix_rules(["公司.cn"])
+        self.assertEqual(public_suffix_length("食狮.公司.cn".split("."), trie), 2)
+        self.assertEqual(public_suffix_length("xn--85x722f.xn--55qx5d.cn".split("."), trie), 2)
+
+    def test_trie_is_loaded_once(self) -> None:
+        self.assertIs(public_suffix_trie(), public_suffix_trie())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from octobrowse.filtering import FilterRuleSet, RuleHitStats
+from octobrowse.rule_stats import personal_filter_list, read_rule_stats, rule_report, write_rule_stats
+
+
+LIST_TEXT = "\n".join(
+    [
+        "||ads.example^",
+        "||unused.example^",
+        "@@||ok.ads.example^",
+        "/banner/*/ad.js$script",
+        "/never/*/hit.js",
+        "-promo.",
+        "||metrics.example^$third-party,domain=news.example|blog.example",
+        "##.ad-slot",
+        "news.example##.sponsored",
+    ]
+)
+
+
+class RuleStatsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.rules = FilterRuleSet()
+        self.rules.parse_text(LIST_TEXT)
+        self.stats = RuleHitStats()
+        self.rules.hit_stats = self.stats
+
+    def browse(self, rules: FilterRuleSet) -> list[bool]:
+        return [
+            rules.should_block("https://ads.example/x.js", "ads.example", "script", "news.example"),
+            rules.should_block("https://ok.ads.example/x.js", "ok.ads.example", "script", "news.example"),
+            rules.should_block("https://cdn.example/banner/1/ad.js", "cdn.example", "script", "news.example"),
+            rules.should_block("https://cdn.example/banner/1/ad.js", "cdn.example", "script", "news.example"),
+            rules.should_block("https://metrics.example/p", "metrics.example", "image", "news.example"),
+            rules.should_block("https://cdn.example/page", "cdn.example", "document", "news.example"),
+        ]
+
+    def test_hits_count_cached_decisions_and_bucket_probes(self) -> None:
+        self.browse(self.rules)
+
+        self.assertEqual(
+            self.stats.hits,
+            {
+                "||ads.example^": 1,
+                "@@||ok.ads.example^": 1,
+                "/banner/*/ad.js$script": 2,
+                "||metrics.example^$third-party,domain=news.example|blog.example": 1,
+            },
+        )
+        # The repeated banner request came from the decision cache: no scan.
+        self.assertEqual(self.stats.bucket_probes[""], 4)
+        self.assertEqual(self.stats.bucket_probes["banner"], 1)
+
+        self.rules.hit_stats = None
+        self.rules.should_block("https://ads.example/y.js", "ads.example")
+        self.assertEqual(self.stats.hits["||ads.example^"], 1)
+
+    def test_report_lists_hot_never_hit_and_regex_buckets(self) -> None:
+        self.browse(self.rules)
+        report = rule_report(self.rules, self.stats)
+
+        self.assertEqual(report.hot_rules[0], ("/banner/*/ad.js$script", 2))
+        self.assertEqual(report.never_hit, ["-promo.", "/never/*/hit.js"])
+        self.assertEqual((report.hit_network_rules, report.network_rules), (2, 4))
+        self.assertEqual((report.hit_hostname_rules, report.hostname_rules), (2, 3))
+        self.assertEqual([cost.token for cost in report.expensive_buckets], ["banner"])
+        self.assertEqual(report.expensive_buckets[0].regex_tests, 1)
+
+        self.stats.hits["||removed.example^"] = 5
+        self.assertNotIn("||removed.example^", dict(rule_report(self.rules, self.stats).hot_rules))
+
+    def test_personal_list_keeps_matched_rules_only(self) -> None:
+        self.browse(self.rules)
+        text = personal_filter_list(self.rules, self.stats)
+        self.assertNotIn("unused.example", text)
+        self.assertNotIn("/never/", text)
+        self.assertIn("news.example##.sponsored", text)
+
+        personal = FilterRuleSet()
+        personal.parse_text(text)
+        self.assertEqual(self.browse(personal), [True, False, True, True, True, False])
+        self.assertEqual(personal.rule_count, 4)
+        self.assertEqual(personal.generic_selector_index, self.rules.generic_selector_index)
+
+    def test_counters_round_trip_and_bad_files_read_empty(self) -> None:
+        self.browse(self.rules)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "filter-rule-stats.json"
+            self.assertEqual(read_rule_stats(path), (False, RuleHitStats()))
+            self.assertTrue(write_rule_stats(path, self.stats, True))
+            self.assertEqual(read_rule_stats(path), (True, self.stats))
+
+            path.write_text('{"enabled": true, "hits": {"a": "x", "b": 2}, "bucket_probes": []}', encoding="utf-8")
+            enabled, stats = read_rule_stats(path)
+            self.assertTrue(enabled)
+            self.assertEqual((dict(stats.hits), dict(stats.bucket_probes)), ({"b": 2}, {}))
+            path.write_text("[]", encoding="utf-8")
+            self.assertEqual(read_rule_stats(path), (False, RuleHitStats()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import gzip
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from octobrowse.subscriptions import (
+    Subscription,
+    SubscriptionError,
+    download_subscription,
+    read_subscriptions,
+    subscription_due,
+    subscription_file_name,
+    write_subscriptions,
+)
+
+
+LIST_TEXT = "[Adblock Plus 2.0]\n||ads.example^\n" + "/banner/*\n" * 2000
+ETAG = '"list-v1"'
+LAST_MODIFIED = "Tue, 06 Oct 2026 07:28:19 GMT"
+
+
+class ListHandler(BaseHTTPRequestHandler):
+    requests: list[dict[str, str]] = []
+
+    def do_GET(self) -> None:
+        type(self).requests.append(dict(self.headers))
+        if self.path == "/error.txt":
+            self.send_error(500)
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = LIST_TEXT.encode("utf-8")
+        if self.path in {"/short.txt", "/dropped.txt"}:
+            # The connection closes partway through the advertised body.
+            self.send_response(200)
+            if self.path == "/short.txt":
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body[:100])
+            else:
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self.wfile.write(f"{len(body):x}\r\n".encode() + body[:100])
+            return
+        if self.path == "/truncated.txt":
+            body = gzip.compress(body)[:-20]
+        elif "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body)
+        self.send_response(200)
+        if self.path == "/truncated.txt" or "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class SubscriptionTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ListHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        ListHandler.requests = []
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = Path(self.directory.name) / "easylist.txt"
+
+    def test_download_then_not_modified(self) -> None:
+        first = download_subscription(Subscription(f"{self.base_url}/easylist.txt"), self.path)
+        self.assertTrue(first.changed)
+        self.assertEqual(self.path.read_text(encoding="utf-8"), LIST_TEXT)
+        self.assertEqual(first.size, len(LIST_TEXT))
+        self.assertEqual((first.subscription.etag, first.subscription.last_modified), (ETAG, LAST_MODIFIED))
+        self.assertEqual(ListHandler.requests[0]["Accept-Encoding"], "gzip")
+        self.assertNotIn("If-None-Match", ListHandler.requests[0])
+
+        mtime = self.path.stat().st_mtime_ns
+        second = download_subscription(first.subscription, self.path)
+        self.assertFalse(second.changed)
+        self.assertEqual(ListHandler.requests[1]["If-None-Match"], ETAG)
+        self.assertEqual(ListHandler.requests[1]["If-Modified-Since"], LAST_MODIFIED)
+        self.assertEqual(self.path.stat().st_mtime_ns, mtime)
+        self.assertGreaterEqual(second.subscription.checked_at, first.subscription.checked_at)
+
+    def test_validators_are_not_sent_without_a_local_copy(self) -> None:
+        result = download_subscription(Subscription(f"{self.base_url}/easylist.txt", ETAG, LAST_MODIFIED), self.path)
+        self.assertTrue(result.changed)
+        self.assertNotIn("If-None-Match", ListHandler.requests[0])
+
+    def test_failures_keep_the_previous_list(self) -> None:
+        self.path.write_text("previous", encoding="utf-8")
+        for url, limit in (
+            (f"{self.base_url}/error.txt", 1 << 20),
+            (f"{self.base_url}/truncated.txt", 1 << 20),
+            (f"{self.base_url}/short.txt", 1 << 20),
+            (f"{self.base_url}/dropped.txt", 1 << 20),
+            (f"{self.base_url}/easylist.txt", 1000),
+            ("file:///etc/passwd", 1 << 20),
+        ):
+            with self.subTest(url=url), self.assertRaises(SubscriptionError):
+                download_subscription(Subscription(url), self.path, max_bytes=limit)
+        self.assertEqual(self.path.read_text(encoding="utf-8"), "previous")
+        self.assertEqual(sorted(path.name for path in self.path.parent.iterdir()), ["easylist.txt"])
+
+    def test_state_round_trip_and_due_checks(self) -> None:
+        state_path = Path(self.directory.name) / "subscriptions.json"
+        subscriptions = {"easylist.txt": Subscription("https://lists.example/easylist.txt", ETAG, "", 1000.0)}
+        self.assertTrue(write_subscriptions(state_path, subscriptions))
+        self.assertEqual(read_subscriptions(state_path), subscriptions)
+        state_path.write_text("{not json", encoding="utf-8")
+        self.assertEqual(read_subscriptions(state_path), {})
+
+        self.assertTrue(subscription_due(subscriptions["easylist.txt"], self.path, 60, now=2000.0))
+        self.assertFalse(subscription_due(subscriptions["easylist.txt"], self.path, 60, now=1030.0))
+        self.assertTrue(subscription_due(Subscription("https://lists.example/a.txt"), self.path, 60))
+
+    def test_subscription_file_names_are_unique(self) -> None:
+        self.assertEqual(subscription_file_name("https://easylist.to/easylist/easylist.txt"), "easylist.txt")
+        self.assertEqual(
+            subscription_file_name("https://lists.example/easylist.txt?v=2", {"easylist.txt"}), "easylist-2.txt"
+        )
+        self.assertEqual(subscription_file_name("https://lists.example/"), "lists.example.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import hashlib
+import tempfile
+import unittest
+from pathlib import Path
+
+from octobrowse.url_blocklist import (
+    UrlHashList,
+    build_url_hash_list,
+    expression_hash,
+    frame_request_match,
+    list_entry_hash,
+    load_url_hash_list,
+    url_expressions,
+)
+
+
+class UrlBlocklistTests(unittest.TestCase):
+    def test_expressions_follow_safe_browsing_host_and_path_rules(self) -> None:
+        self.assertEqual(
+            url_expressions("http://a.b.c/1/2.html?param=1"),
+            [
+                "a.b.c/1/2.html?param=1",
+                "a.b.c/1/2.html",
+                "a.b.c/",
+                "a.b.c/1/",
+                "b.c/1/2.html?param=1",
+                "b.c/1/2.html",
+                "b.c/",
+                "b.c/1/",
+            ],
+        )
+        hosts = {expression.partition("/")[0] for expression in url_expressions("http://a.b.c.d.e.f.g/1.html")}
+        self.assertEqual(hosts, {"a.b.c.d.e.f.g", "c.d.e.f.g", "d.e.f.g", "e.f.g", "f.g"})
+        self.assertEqual(url_expressions("http://1.2.3.4/1/"), ["1.2.3.4/1/", "1.2.3.4/"])
+        self.assertEqual(
+            url_expressions("HTTP://Evil..EXAMPLE.:8080/./a/../b//c/%2570ath#frag")[0],
+            "evil.example/b/c/path",
+        )
+        self.assertEqual(url_expressions("evil.example"), ["evil.example/"])
+        self.assertEqual(url_expressions("http:///nohost"), [])
+
+    def test_list_lines_hash_expressions_and_hex_digests(self) -> None:
+        digest = hashlib.sha256(b"evil.example/").hexdigest()
+        self.assertEqual(list_entry_hash(digest), expression_hash("evil.example/"))
+        self.assertEqual(list_entry_hash("http://EVIL.example"), expression_hash("evil.example/"))
+        self.assertIsNone(list_entry_hash("# comment"))
+        self.assertIsNone(list_entry_hash("   "))
+
+    def test_lookup_confirms_prefix_hits_with_the_second_half(self) -> None:
+        listed = expression_hash("evil.example/")
+        twin = (listed & ~0xFFFFFFFF) | ((listed + 1) & 0xFFFFFFFF)
+        hashes = UrlHashList.from_hashes([twin, listed, listed, expression_hash("phish.example/login/")])
+        self.assertEqual(len(hashes), 3)
+        self.assertTrue(hashes.contains_hash(listed))
+        self.assertFalse(hashes.contains_hash(listed ^ 1 << 40))
+        self.assertEqual(hashes.match("https://cdn.evil.example/x/y.js?z=1"), "evil.example/")
+        self.assertEqual(hashes.match("https://phish.example/login/index.html"), "phish.example/login/")
+        self.assertIsNone(hashes.match("https://phish.example/about"))
+        self.assertIsNone(UrlHashList().match("https://evil.example/"))
+
+    def test_only_page_loads_are_checked(self) -> None:
+        hashes = UrlHashList.from_hashes([expression_hash("evil.example/")])
+        url = "https://evil.example/landing"
+        self.assertEqual(frame_request_match(hashes, url, "document"), "evil.example/")
+        self.assertEqual(frame_request_match(hashes, url, "subdocument"), "evil.example/")
+        self.assertIsNone(frame_request_match(hashes, url, "script"))
+        self.assertIsNone(frame_request_match(None, url, "document"))
+
+    def test_imports_are_memory_mapped_and_replace_older_ones(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            source = root / "list.txt"
+            source.write_text("# test list\nevil.example\nphish.example/login/\n", encoding="utf-8")
+            first, count = build_url_hash_list(source, root / "urls")
+            self.assertEqual(count, 2)
+            source.write_text("other.example\n", encoding="utf-8")
+            second, count = build_url_hash_list(source, root / "urls")
+            self.assertEqual(count, 1)
+            self.assertFalse(first.exists())
+
+            hashes = load_url_hash_list(root / "urls")
+            self.assertIsNotNone(hashes)
+            assert hashes is not None
+            self.assertEqual(hashes.match("http://www.other.example/"), "other.example/")
+            self.assertIsNone(hashes.match("http://evil.example/"))
+            del hashes
+
+            second.write_bytes(second.read_bytes()[:-1])
+            self.assertIsNone(UrlHashList.open(second))
+            self.assertIsNone(load_url_hash_list(root / "missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()